@@ -0,0 +1,2 @@
+# pylint: disable=redefined-builtin, wildcard-import
+"""The module of the fake Merlin compiler and the DSE benchmark"""
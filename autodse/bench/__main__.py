@@ -0,0 +1,8 @@
+"""
+The benchmark entry.
+"""
+
+from autodse.bench.benchmark import main
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+The benchmark of the DSE infrastructure with the fake Merlin compiler.
+
+It runs the fast DSE flow on a Merlin project or a synthetic design space without the
+Merlin license, and reports the throughput, the worker utilization, and the time to reach
+the best quality of the run.
+"""
+import argparse
+import json
+import os
+import random
+import shlex
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from ..config import build_config
+from ..database import PickleDatabase
+from ..dsproc.dsproc import compile_design_space, partition
+from ..logger import get_default_logger
+from ..main import Main
+from ..parameter import get_default_point
+from . import fakemerlin
+
+
+def arg_parser() -> argparse.Namespace:
+    """Parse user arguments."""
+
+    parser = argparse.ArgumentParser(description='Benchmark DSE with a fake Merlin compiler')
+    parser.add_argument('--src-dir',
+                        required=False,
+                        action='store',
+                        default='',
+                        help='Merlin project directory with config.json')
+    parser.add_argument('--synthetic',
+                        required=False,
+                        action='store',
+                        type=int,
+                        default=0,
+                        help='the number of loop nests of a synthetic design space')
+    parser.add_argument('--work-dir', required=True, action='store', help='working directory')
+    parser.add_argument('--workers',
+                        required=False,
+                        action='store',
+                        type=int,
+                        default=8,
+                        help='the number of evaluation workers')
+    parser.add_argument('--time-scale',
+                        required=False,
+                        action='store',
+                        type=float,
+                        default=0.01,
+                        help='the multiplier of the fake evaluation time')
+    parser.add_argument('--exploration',
+                        required=False,
+                        action='store',
+                        type=float,
+                        default=2,
+                        help='the exploration time in minutes')
+    return parser.parse_args()
+
+
+def gen_synthetic_project(path: str, num_nests: int, seed: int = 0) -> None:
+    """Generate a Merlin project with a synthetic design space.
+
+    The kernel has the given number of 3-level loop nests. Each loop has a parallel and a
+    pipeline parameter, and each interface has a bit-width parameter.
+
+    Args:
+        path: The project directory to be created.
+        num_nests: The number of loop nests.
+        seed: The random seed of the trip counts.
+    """
+
+    rand = random.Random(seed)
+    os.makedirs(os.path.join(path, 'src'), exist_ok=True)
+    params: Dict[str, Dict[str, Any]] = {}
+    code = [
+        '#define SIZE 4096', '', '#pragma ACCEL kernel',
+        'void synthetic_kernel(float a[SIZE], float b[SIZE], float c[SIZE]) {'
+    ]
+    for var in ['a', 'b', 'c']:
+        pid = 'B_{0}'.format(var.upper())
+        code.append(
+            '#pragma ACCEL interface variable={0} depth=4096 bus_bitwidth=auto{{{1}}}'.format(
+                var, pid))
+        params[pid] = {'options': '[32, 64, 128, 256, 512]', 'ds_type': 'INTERFACE', 'default': 32}
+
+    for nest in range(num_nests):
+        indent = '    '
+        outer_pip = ''
+        for level in range(3):
+            trip = rand.choice([8, 16, 32, 64])
+            var = 'i{0}_{1}'.format(nest, level)
+            par_id = 'PAR_{0}_{1}'.format(nest, level)
+            pip_id = 'PIP_{0}_{1}'.format(nest, level)
+            factors = [f for f in [1, 2, 4, 8, 16, 32] if f <= trip]
+            pips = ['off', 'cg', 'flatten'] if level < 2 else ['off', 'on']
+            # The parameters of the sub-loops are useless if the outermost loop is flattened
+            pip_options = str(pips)
+            par_options = str(factors)
+            if outer_pip:
+                pip_options = "[x for x in {0} if x=='off' or {1}!='flatten']".format(
+                    pips, outer_pip)
+                par_options = "[x for x in {0} if x==1 or {1}!='flatten']".format(
+                    factors, outer_pip)
+            params[pip_id] = {
+                'options': pip_options,
+                'order': "0 if v == 'off' else 1",
+                'ds_type': 'PIPELINE',
+                'default': 'off'
+            }
+            params[par_id] = {'options': par_options, 'ds_type': 'PARALLEL', 'default': 1}
+            code += [
+                '#pragma ACCEL pipeline auto{{{0}}}'.format(pip_id),
+                '#pragma ACCEL parallel factor=auto{{{0}}}'.format(par_id),
+                '{0}for (int {1} = 0; {1} < {2}; {1}++) {{'.format(indent, var, trip)
+            ]
+            outer_pip = pip_id if not outer_pip else outer_pip
+            indent += '    '
+        code.append('{0}c[(i{1}_0 * 64 + i{1}_2) % SIZE] += a[i{1}_1] * b[i{1}_2];'.format(
+            indent, nest))
+        for level in range(3):
+            indent = indent[4:]
+            code.append('{0}}}'.format(indent))
+    code.append('}')
+
+    with open(os.path.join(path, 'src', 'kernel.cpp'), 'w') as filep:
+        filep.write('\n'.join(code) + '\n')
+
+    config = {
+        'project.name': 'synthetic-{0}'.format(num_nests),
+        'project.backup': 'NO_BACKUP',
+        'project.fast-output-num': 4,
+        'timeout.exploration': 2,
+        'timeout.transform': 5,
+        'timeout.hls': 60,
+        'timeout.bitgen': 480,
+        'evaluate.command.transform': 'make mcc_acc',
+        'evaluate.command.hls': 'make mcc_estimate',
+        'evaluate.command.bitgen': 'make mcc_bitgen',
+        'evaluate.worker-per-part': 2,
+        'evaluate.max-util.BRAM': 0.8,
+        'evaluate.max-util.DSP': 0.8,
+        'evaluate.max-util.LUT': 0.8,
+        'evaluate.max-util.FF': 0.8,
+        'search.algorithm.name': 'gradient',
+        'search.algorithm.gradient.latency-threshold': 64,
+        'search.algorithm.gradient.fine-grained-first': True,
+        'search.algorithm.gradient.quality-type': 'performance',
+        'design-space.max-part-num': 4,
+        'design-space.definition': params
+    }
+    with open(os.path.join(path, 'config.json'), 'w') as filep:
+        json.dump(config, filep, indent=4)
+
+
+def get_fake_commands(time_scale: float) -> Dict[str, str]:
+    """Build the evaluation commands that run the fake Merlin compiler.
+
+    Args:
+        time_scale: The multiplier of the fake evaluation time.
+
+    Returns:
+        A map from evaluation mode to command.
+    """
+
+    return {
+        mode: '{0} {1} {2} --time-scale {3}'.format(shlex.quote(sys.executable),
+                                                    shlex.quote(fakemerlin.__file__), mode,
+                                                    time_scale)
+        for mode in ['transform', 'hls', 'bitgen']
+    }
+
+
+def summarize(trace_path: str, start: float, end: float, workers: int,
+              max_util: Dict[str, float]) -> Dict[str, Optional[float]]:
+    """Compute the benchmark metrics from the evaluation trace.
+
+    Args:
+        trace_path: The trace file written by the fake Merlin compiler.
+        start: The start time of the run.
+        end: The end time of the run.
+        workers: The number of evaluation workers.
+        max_util: The maximum resource utilization of a valid design.
+
+    Returns:
+        The metrics of the run.
+    """
+
+    records: List[Dict[str, Any]] = []
+    if os.path.exists(trace_path):
+        with open(trace_path, 'r') as filep:
+            for line in filep:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record['start'] >= start:
+                    records.append(record)
+
+    elapsed = max(end - start, 1e-6)
+    busy = sum([r['end'] - r['start'] for r in records])
+    points = len([r for r in records if r['mode'] == 'transform'])
+    valids = [
+        r for r in records if r['mode'] == 'hls' and not r['critical']
+        and all([r['util'][res] < util for res, util in max_util.items()])
+    ]
+
+    best: Optional[float] = None
+    time_to_best: Optional[float] = None
+    if valids:
+        best = min([r['perf'] for r in valids])
+        time_to_best = min([r['end'] for r in valids if r['perf'] == best]) - start
+
+    return {
+        'elapsed': elapsed,
+        'points': points,
+        'hls-runs': len([r for r in records if r['mode'] == 'hls']),
+        'points-per-hour': points * 3600.0 / elapsed,
+        'worker-utilization': busy / (workers * elapsed),
+        'best-perf': best,
+        'time-to-best': time_to_best
+    }
+
+
+def run_benchmark(src_dir: str, work_dir: str, user_config: Dict[str, Any], workers: int,
+                  time_scale: float, exploration: float) -> Dict[str, Optional[float]]:
+    """Run the fast DSE flow with the fake Merlin compiler.
+
+    Args:
+        src_dir: The Merlin project directory.
+        work_dir: The working directory, which will be cleaned.
+        user_config: The user config of the project.
+        workers: The number of evaluation workers.
+        time_scale: The multiplier of the fake evaluation time.
+        exploration: The exploration time in minutes.
+
+    Returns:
+        The metrics of the run.
+    """
+
+    log = get_default_logger('Bench')
+
+    user_config = dict(user_config)
+    for mode, cmd in get_fake_commands(time_scale).items():
+        user_config['evaluate.command.{0}'.format(mode)] = cmd
+    user_config['timeout.exploration'] = exploration
+    user_config['evaluate.max-workers'] = workers
+    config = build_config(user_config)
+    if config is None:
+        raise RuntimeError('Invalid config')
+
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    trace_path = os.path.join(work_dir, 'trace.jsonl')
+    os.environ[fakemerlin.TRACE_ENV] = trace_path
+
+    start = time.time()
+    db = PickleDatabase(config['project']['name'], os.path.join(work_dir, 'result.db'))
+    db.load()
+    evaluator = Main.build_evaluator(config, os.path.abspath(src_dir),
+                                     os.path.join(work_dir, 'evaluate'), db, workers)
+
+    # The HLS run for the scope map also evaluates the default point
+    ds = compile_design_space(config['design-space']['definition'], None)
+    if ds is None:
+        raise RuntimeError('Failed to compile the design space')
+    if not evaluator.build_scope_map(get_default_point(ds)):
+        raise RuntimeError('Failed to build the scope map')
+    ds = compile_design_space(config['design-space']['definition'], evaluator.scope_map)
+    if ds is None:
+        raise RuntimeError('Failed to compile the design space')
+    ds_list = partition(ds, int(config['design-space']['max-part-num']))
+    if ds_list is None:
+        raise RuntimeError('No design space partition is available')
+    log.info('Exploring %d partitions with %d workers', len(ds_list), workers)
+
+    with ThreadPoolExecutor(max_workers=len(ds_list)) as executor:
+        wait([
+            executor.submit(Main.fast_runner,
+                            tag='part{0}'.format(idx),
+                            ds=part,
+                            db=db,
+                            evaluator=evaluator,
+                            config=config) for idx, part in enumerate(ds_list)
+        ])
+    end = time.time()
+    evaluator.set_analysis_workers(0)
+    db.persist()
+
+    metrics = summarize(trace_path, start, end, workers, config['evaluate']['max-util'])
+    with open(os.path.join(work_dir, 'bench.json'), 'w') as filep:
+        json.dump(metrics, filep, indent=4)
+    return metrics
+
+
+def main() -> None:
+    """The command line entry of the benchmark."""
+
+    args = arg_parser()
+    work_dir = os.path.abspath(args.work_dir)
+    if args.synthetic > 0:
+        src_dir = work_dir + '_src'
+        gen_synthetic_project(src_dir, args.synthetic)
+    elif args.src_dir:
+        src_dir = os.path.abspath(args.src_dir)
+    else:
+        print('Error: Either --src-dir or --synthetic is required')
+        sys.exit(1)
+
+    cfg_path = os.path.join(src_dir, 'config.json')
+    if not os.path.exists(cfg_path):
+        print('Error: Config JSON file not found:', cfg_path)
+        sys.exit(1)
+    with open(cfg_path, 'r') as filep:
+        user_config = json.load(filep)
+
+    # Keep the logs out of the project
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(os.path.dirname(work_dir))
+    metrics = run_benchmark(src_dir, work_dir, user_config, args.workers, args.time_scale,
+                            args.exploration)
+
+    log = get_default_logger('Bench')
+    for key, val in metrics.items():
+        log.info('%-20s: %s', key, 'N/A' if val is None else '{0:.2f}'.format(val))
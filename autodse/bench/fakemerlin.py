@@ -0,0 +1,822 @@
+"""
+The fake Merlin compiler for benchmarking the DSE infrastructure.
+
+It parses the applied pragmas of the kernels in the current directory, estimates the QoR
+with a synthetic performance model, sleeps for a design point dependent duration, and
+writes the logs and reports in the same formats as the Merlin compiler. This module only
+depends on the standard library so it can also be launched as a script, e.g.:
+
+    python fakemerlin.py hls --time-scale 0.01
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# The default evaluation time of each mode in seconds
+DEFAULT_DELAY = {'transform': 2.0, 'hls': 20.0, 'bitgen': 120.0}
+
+# The trace file path to append a record of each evaluation for benchmarking
+TRACE_ENV = 'AUTODSE_BENCH_TRACE'
+
+# The paths of the Merlin outputs
+LC_PATH = '.merlin_prj/run/implement/export/lc'
+REPORT_PATH = '.merlin_prj/run/implement/exec/hls/report_merlin/final_report'
+
+# The trip count of a loop if it cannot be inferred from the source code
+DEFAULT_TRIP = 32
+
+# The available resources of the target device (Intel Arria 10 GX)
+AVAILABLE = {'LUT': 788860, 'FF': 1577720, 'BRAM': 2713, 'DSP': 1518}
+
+# The resources of the board support package
+BSP_RES = {'LUT': 82000, 'FF': 164000, 'BRAM': 320, 'DSP': 0}
+
+# The resources of each kernel besides its loops
+KERNEL_RES = {'LUT': 12000, 'FF': 18000, 'BRAM': 16, 'DSP': 0}
+
+# The resources of each statement
+OP_RES = {'LUT': 180, 'FF': 260, 'BRAM': 0, 'DSP': 0}
+
+# The DSPs of each multiplication
+MUL_DSP = 4
+
+# The latency of each statement in cycles
+OP_LATENCY = 3
+
+# The maximum number of duplicated coarse-grained loop bodies
+MAX_CG_PARALLEL = 4096
+
+PRAGMA_RE = re.compile(r'^\s*#\s*pragma\s+ACCEL\s+(\w+)(.*)$', re.IGNORECASE)
+DEFINE_RE = re.compile(r'^\s*#\s*define\s+(\w+)\s+(.+?)\s*$')
+FOR_RE = re.compile(r'^\s*for\s*\((.*)\)')
+FUNC_RE = re.compile(r'^\s*(?:[\w\*&]+\s+)+\**\s*(\w+)\s*\(')
+ATTR_RE = re.compile(r'(\w+)\s*=\s*([^\s]+)')
+
+
+class Loop():
+    """A loop in the kernel.
+
+    Attributes:
+        line: The line number of the loop.
+        trip: The trip count.
+        pragmas: The attributes of the loop pragmas, e.g., {'parallel': {'factor': '4'}}.
+        pragma_lines: The line numbers of the loop pragmas.
+        childs: The sub-loops.
+        ops: The number of statements in the loop body (excluding sub-loops).
+        muls: The number of multiplications in the loop body (excluding sub-loops).
+        topo_id: The topology ID in the reports.
+    """
+
+    def __init__(self, line: int, trip: int, pragmas: Dict[str, Dict[str, str]],
+                 pragma_lines: List[int]):
+        self.line = line
+        self.trip = trip
+        self.pragmas = pragmas
+        self.pragma_lines = pragma_lines
+        self.childs: List['Loop'] = []
+        self.ops = 0
+        self.muls = 0
+        self.topo_id = ''
+
+    def get_factor(self) -> int:
+        """Get the valid parallel factor of the loop."""
+
+        try:
+            factor = int(self.pragmas.get('parallel', {}).get('factor', '1'))
+        except ValueError:
+            factor = 1
+        return max(1, min(factor, self.trip))
+
+    def get_pipeline(self) -> str:
+        """Get the pipeline mode (off, on, cg, or flatten) of the loop."""
+
+        if 'pipeline' not in self.pragmas:
+            return 'off'
+        mode = self.pragmas['pipeline'].get('mode', 'on')
+        return mode if mode in ['off', 'cg', 'flatten'] else 'on'
+
+    def iter_loops(self) -> List['Loop']:
+        """List this loop and all its sub-loops in the source code order."""
+
+        loops = [self]
+        for child in self.childs:
+            loops += child.iter_loops()
+        return loops
+
+
+class Kernel():
+    """A kernel function.
+
+    Attributes:
+        name: The function name.
+        file_name: The source file name.
+        line: The line number of the function.
+        lines: The source code of the function.
+        interfaces: The attributes of the interface pragmas.
+        loops: The top-level loops.
+        stmts: The pragmas and loops in the source code order as (line, loop or None).
+        topo_id: The topology ID in the reports.
+    """
+
+    def __init__(self, name: str, file_name: str, line: int):
+        self.name = name
+        self.file_name = file_name
+        self.line = line
+        self.lines: List[Tuple[int, str]] = []
+        self.interfaces: List[Dict[str, str]] = []
+        self.loops: List[Loop] = []
+        self.stmts: List[Tuple[int, Optional[Loop]]] = []
+        self.topo_id = ''
+
+
+def eval_expr(expr: str, defines: Dict[str, str]) -> Optional[float]:
+    """Evaluate a constant arithmetic expression with macros.
+
+    Args:
+        expr: The expression.
+        defines: The macro definitions.
+
+    Returns:
+        The value, or None if the expression is not a constant.
+    """
+
+    for _ in range(16):
+        new_expr = re.sub(r'[A-Za-z_]\w*', lambda m: '({0})'.format(defines[m.group(0)])
+                          if m.group(0) in defines else m.group(0), expr)
+        if new_expr == expr:
+            break
+        expr = new_expr
+    if not re.fullmatch(r'[\d\s\+\-\*/\(\)\.]+', expr):
+        return None
+    try:
+        return float(eval(expr, {'__builtins__': {}}))  # pylint:disable=eval-used
+    except (SyntaxError, ZeroDivisionError, TypeError):
+        return None
+
+
+def get_trip_count(header: str, defines: Dict[str, str]) -> int:
+    """Infer the trip count of a loop from its header.
+
+    Args:
+        header: The loop header in the parentheses.
+        defines: The macro definitions.
+
+    Returns:
+        The trip count.
+    """
+
+    parts = header.split(';')
+    if len(parts) != 3:
+        return DEFAULT_TRIP
+
+    init = re.search(r'=\s*(.+)$', parts[0])
+    cond = re.search(r'[<>]=?\s*(.+)$', parts[1])
+    step = re.search(r'[\+\-]=\s*(.+)$', parts[2])
+    start = eval_expr(init.group(1), defines) if init else 0.0
+    bound = eval_expr(cond.group(1), defines) if cond else None
+    stride = eval_expr(step.group(1), defines) if step else 1.0
+    if start is None or bound is None or not stride:
+        return DEFAULT_TRIP
+    if parts[1].find('=') != -1:
+        bound += 1
+    return max(1, int(math.ceil(abs(bound - start) / abs(stride))))
+
+
+def parse_pragma(kind: str, attrs: str) -> Dict[str, str]:
+    """Parse the attributes of a pragma.
+
+    Args:
+        kind: The pragma type.
+        attrs: The string after the pragma type.
+
+    Returns:
+        The attributes. The single keyword of a pipeline pragma is named "mode".
+    """
+
+    ret = {key: val for key, val in ATTR_RE.findall(attrs)}
+    if kind == 'pipeline':
+        words = [w for w in attrs.split() if w.find('=') == -1]
+        if words:
+            ret['mode'] = words[0]
+    return ret
+
+
+def strip_comments(lines: List[str]) -> List[str]:
+    """Remove comments from the source code while keeping the line numbers.
+
+    Args:
+        lines: The source code lines.
+
+    Returns:
+        The source code lines without comments.
+    """
+
+    code = re.sub(r'/\*.*?\*/', lambda m: '\n' * m.group(0).count('\n'), ''.join(lines),
+                  flags=re.DOTALL)
+    return [re.sub(r'//.*$', '', line) for line in code.split('\n')]
+
+
+def parse_kernels(file_path: str, defines: Dict[str, str]) -> List[Kernel]:
+    """Parse the kernels and their loops in a source file.
+
+    Args:
+        file_path: The source file.
+        defines: The macro definitions.
+
+    Returns:
+        A list of kernels.
+    """
+
+    with open(file_path, 'r', errors='replace') as filep:
+        org_lines = filep.readlines()
+    lines = strip_comments(org_lines)
+    file_name = os.path.basename(file_path)
+
+    kernels: List[Kernel] = []
+    kernel: Optional[Kernel] = None
+    is_kernel = False
+    depth = 0
+    loop_stack: List[Tuple[Loop, int]] = []
+    pending: Dict[str, Dict[str, str]] = {}
+    pending_lines: List[int] = []
+    for idx, line in enumerate(lines):
+        line_num = idx + 1
+        code = line.strip()
+        if kernel is not None:
+            kernel.lines.append((line_num, org_lines[idx].rstrip('\n')))
+
+        pragma = PRAGMA_RE.match(line)
+        if pragma:
+            kind = pragma.group(1).lower()
+            if kind == 'kernel':
+                is_kernel = True
+            elif kernel is not None and kind == 'interface':
+                kernel.interfaces.append(parse_pragma(kind, pragma.group(2)))
+                kernel.stmts.append((line_num, None))
+            elif kernel is not None:
+                pending[kind] = parse_pragma(kind, pragma.group(2))
+                pending_lines.append(line_num)
+            continue
+
+        new_loop = None
+        header = FOR_RE.match(line)
+        if kernel is not None and header:
+            new_loop = Loop(line_num, get_trip_count(header.group(1), defines), pending,
+                            pending_lines)
+            if loop_stack:
+                loop_stack[-1][0].childs.append(new_loop)
+            else:
+                kernel.loops.append(new_loop)
+            for pragma_line in pending_lines:
+                kernel.stmts.append((pragma_line, None))
+            kernel.stmts.append((line_num, new_loop))
+            loop_stack.append((new_loop, depth))
+            pending = {}
+            pending_lines = []
+        elif kernel is None and depth == 0 and is_kernel and FUNC_RE.match(line) and \
+                not code.endswith(';'):
+            kernel = Kernel(FUNC_RE.match(line).group(1), file_name, line_num)  # type: ignore
+            kernel.lines.append((line_num, org_lines[idx].rstrip('\n')))
+            is_kernel = False
+        elif loop_stack and code.endswith(';'):
+            loop_stack[-1][0].ops += 1
+            if re.search(r'=.*\*', code):
+                loop_stack[-1][0].muls += code.count('*')
+
+        depth += code.count('{') - code.count('}')
+
+        # Close the loops whose bodies end at this line. A loop without braces ends at its
+        # first statement.
+        if new_loop is None or code.endswith(';'):
+            while loop_stack and depth <= loop_stack[-1][1] and (code.endswith(';')
+                                                                 or code.endswith('}')):
+                loop_stack.pop()
+
+        if kernel is not None and depth == 0 and code.find('}') != -1:
+            kernels.append(kernel)
+            kernel = None
+            loop_stack = []
+    return kernels
+
+
+def find_sources(path: str) -> List[str]:
+    """Find the source files in a directory, skipping hidden directories.
+
+    Args:
+        path: The directory.
+
+    Returns:
+        A sorted list of source file paths.
+    """
+
+    files = []
+    for root, dirs, file_names in os.walk(path):
+        dirs[:] = sorted([d for d in dirs if not d.startswith('.')])
+        for file_name in sorted(file_names):
+            if os.path.splitext(file_name)[1] in ['.c', '.cpp', '.cc', '.cl', '.h', '.hpp']:
+                files.append(os.path.join(root, file_name))
+    return files
+
+
+def parse_project(path: str) -> List[Kernel]:
+    """Parse all kernels in a project.
+
+    Args:
+        path: The project directory.
+
+    Returns:
+        A list of kernels.
+    """
+
+    files = find_sources(path)
+    defines: Dict[str, str] = {}
+    for file_path in files:
+        with open(file_path, 'r', errors='replace') as filep:
+            for line in filep:
+                define = DEFINE_RE.match(line)
+                if define:
+                    defines[define.group(1)] = re.sub(r'//.*$', '', define.group(2)).strip()
+
+    kernels: List[Kernel] = []
+    for file_path in files:
+        kernels += parse_kernels(file_path, defines)
+    for kidx, kernel in enumerate(kernels):
+        kernel.topo_id = 'F_{0}'.format(kidx)
+        lidx = 0
+        for top_loop in kernel.loops:
+            for loop in top_loop.iter_loops():
+                loop.topo_id = 'L_{0}_{1}'.format(kidx, lidx)
+                lidx += 1
+    return kernels
+
+
+class Estimation():
+    """The estimated QoR of a loop or a kernel.
+
+    Attributes:
+        cycle: The total latency in cycles.
+        unit: The latency of one iteration (or the whole kernel) in cycles.
+        burst: The memory transfer latency in cycles.
+        res: The resource usage.
+        flatten: The topology ID of the loop this loop is flattened into.
+    """
+
+    def __init__(self):
+        self.cycle = 0
+        self.unit = 0
+        self.burst = 0
+        self.res = {res: 0.0 for res in AVAILABLE}
+        self.flatten = ''
+
+
+def get_ops(loop: Loop) -> Tuple[int, int]:
+    """Count the fully unrolled statements and multiplications of a loop body.
+
+    Args:
+        loop: The loop.
+
+    Returns:
+        The number of statements and multiplications of one iteration.
+    """
+
+    ops, muls = loop.ops, loop.muls
+    for child in loop.childs:
+        child_ops, child_muls = get_ops(child)
+        ops += child.trip * child_ops
+        muls += child.trip * child_muls
+    return ops, muls
+
+
+def get_op_res(ops: int, muls: int, copies: int) -> Dict[str, float]:
+    """Compute the resource of statements.
+
+    Args:
+        ops: The number of statements.
+        muls: The number of multiplications.
+        copies: The number of duplicated statements.
+
+    Returns:
+        The resource usage.
+    """
+
+    res = {key: float(val * ops * copies) for key, val in OP_RES.items()}
+    res['DSP'] += float(MUL_DSP * muls * copies)
+    return res
+
+
+def estimate_loop(loop: Loop, flatten_id: str, ests: Dict[str, Estimation],
+                  criticals: List[str]) -> Estimation:
+    """Estimate the QoR of a loop with its sub-loops.
+
+    Args:
+        loop: The loop.
+        flatten_id: The topology ID of the loop this loop is flattened into, if any.
+        ests: The estimations of all loops to be updated.
+        criticals: The critical messages to be updated.
+
+    Returns:
+        The estimation of the loop.
+    """
+
+    est = Estimation()
+    ests[loop.topo_id] = est
+    if flatten_id:
+        # Fully unrolled by the outer pipelined loop
+        est.flatten = flatten_id
+        for child in loop.childs:
+            estimate_loop(child, flatten_id, ests, criticals)
+        return est
+
+    factor = loop.get_factor()
+    iters = int(math.ceil(float(loop.trip) / factor))
+    mode = loop.get_pipeline()
+    if mode == 'on' and not loop.childs:
+        mode = 'flatten'
+
+    if mode == 'flatten':
+        ops, muls = get_ops(loop)
+        depth = len(loop.iter_loops())
+        est.unit = OP_LATENCY * depth + int(math.log2(factor * max(ops, 1)))
+        est.cycle = iters + est.unit
+        est.res = get_op_res(ops, muls, factor)
+        for child in loop.childs:
+            estimate_loop(child, loop.topo_id, ests, criticals)
+        return est
+
+    child_ests = [estimate_loop(child, '', ests, criticals) for child in loop.childs]
+    body = OP_LATENCY * (1 if loop.ops else 0) + sum([e.cycle for e in child_ests])
+    est.res = get_op_res(loop.ops, loop.muls, factor)
+    for child_est in child_ests:
+        for key in est.res:
+            est.res[key] += child_est.res[key] * factor * (2 if mode == 'cg' else 1)
+
+    if mode == 'cg' and child_ests:
+        # Overlap the sub-loops of different iterations
+        est.unit = max([e.cycle for e in child_ests])
+        est.cycle = iters * est.unit + body
+    else:
+        est.unit = body
+        est.cycle = iters * body
+
+    if factor > 1 and loop.childs and factor * sum([c.trip for c in loop.childs]) > \
+            MAX_CG_PARALLEL:
+        criticals.append('WARNING: [CGPAR-201] Coarse-grained parallelization NOT applied '
+                         'on loop {0} (line {1}): too many duplicated loop bodies'.format(
+                             loop.topo_id, loop.line))
+    return est
+
+
+def estimate_kernel(kernel: Kernel, ests: Dict[str, Estimation],
+                    criticals: List[str]) -> Estimation:
+    """Estimate the QoR of a kernel.
+
+    Args:
+        kernel: The kernel.
+        ests: The estimations of all loops and kernels to be updated.
+        criticals: The critical messages to be updated.
+
+    Returns:
+        The estimation of the kernel.
+    """
+
+    est = Estimation()
+    ests[kernel.topo_id] = est
+    est.res = {key: float(val) for key, val in KERNEL_RES.items()}
+    for loop in kernel.loops:
+        loop_est = estimate_loop(loop, '', ests, criticals)
+        est.cycle += loop_est.cycle
+        for key in est.res:
+            est.res[key] += loop_est.res[key]
+
+    # Memory transfer through the interfaces
+    for intf in kernel.interfaces:
+        try:
+            depth = int(intf.get('depth', '1024'))
+        except ValueError:
+            depth = 1024
+        try:
+            bitwidth = int(intf.get('bus_bitwidth', '32'))
+        except ValueError:
+            bitwidth = 32
+        est.burst += int(math.ceil(depth * 32.0 / bitwidth))
+        est.res['BRAM'] += math.ceil(depth * 32.0 / 20480) + bitwidth // 32
+        est.res['LUT'] += 40 * bitwidth
+        est.res['FF'] += 80 * bitwidth
+    est.cycle += est.burst
+    est.unit = est.cycle
+    return est
+
+
+def get_lc_code(kernel: Kernel, ests: Dict[str, Estimation]) -> str:
+    """Generate the transformed kernel code. The pragmas that have no effect are removed
+    so that equivalent design points result in the same code.
+
+    Args:
+        kernel: The kernel.
+        ests: The estimations of all loops.
+
+    Returns:
+        The transformed code.
+    """
+
+    code = ['// Generated by the fake Merlin compiler', '#pragma ACCEL kernel']
+    for line_num, line in kernel.lines:
+        if PRAGMA_RE.match(line) and not loop_pragma_kept(line, kernel, ests, line_num):
+            continue
+        code.append(line)
+    return '\n'.join(code) + '\n'
+
+
+def loop_pragma_kept(line: str, kernel: Kernel, ests: Dict[str, Estimation],
+                     line_num: int) -> bool:
+    """Check if a loop pragma still has effects.
+
+    Args:
+        line: The pragma line.
+        kernel: The kernel.
+        ests: The estimations of all loops.
+        line_num: The line number of the pragma.
+
+    Returns:
+        True if the pragma should be kept in the transformed code.
+    """
+
+    for top_loop in kernel.loops:
+        for loop in top_loop.iter_loops():
+            if line_num not in loop.pragma_lines:
+                continue
+            if ests[loop.topo_id].flatten:
+                return False
+            kind = PRAGMA_RE.match(line).group(1).lower()  # type: ignore
+            if kind == 'parallel':
+                return loop.get_factor() > 1
+            if kind == 'pipeline':
+                return loop.get_pipeline() != 'off'
+    return True
+
+
+def get_duration(mode: str, delay: float, kernels: List[Kernel],
+                 ests: Dict[str, Estimation]) -> float:
+    """Compute the evaluation time of a design point. Larger designs take longer, and the
+    time has a deterministic jitter so that the same design point always takes the same time.
+
+    Args:
+        mode: The evaluation mode.
+        delay: The evaluation time of the smallest design in seconds.
+        kernels: The kernels.
+        ests: The estimations of all loops and kernels.
+
+    Returns:
+        The evaluation time in seconds.
+    """
+
+    util = max([ests[k.topo_id].res[res] / AVAILABLE[res] for k in kernels for res in AVAILABLE])
+    digest = hashlib.sha256()
+    for kernel in kernels:
+        digest.update('\n'.join([line for _, line in kernel.lines]).encode('utf-8'))
+    jitter = 0.9 + 0.2 * int(digest.hexdigest()[:8], 16) / float(0xffffffff)
+    scale = {'transform': 1.0, 'hls': 1.0 + 4.0 * min(util, 1.0), 'bitgen': 1.0 + 8.0 * util}
+    return delay * scale[mode] * jitter
+
+
+def write_reports(kernels: List[Kernel], ests: Dict[str, Estimation]) -> None:
+    """Write the HLS reports in the current directory.
+
+    Args:
+        kernels: The kernels.
+        ests: The estimations of all loops and kernels.
+    """
+
+    def get_loop_topo(loop: Loop) -> Dict[str, Any]:
+        return {
+            'topo_id': loop.topo_id,
+            'type': 'loop',
+            'name': loop.topo_id,
+            'line': loop.line,
+            'childs': [get_loop_topo(child) for child in loop.childs]
+        }
+
+    perf_est: Dict[str, Dict[str, Any]] = {}
+    topo_info: List[Dict[str, Any]] = []
+    hierarchy: List[Dict[str, Any]] = []
+    for kernel in kernels:
+        est = ests[kernel.topo_id]
+        perf_est[kernel.topo_id] = {
+            'CYCLE_TOT': str(est.cycle),
+            'CYCLE_UNIT': str(est.unit),
+            'CYCLE_BURST': str(est.burst),
+            'org_identifier': kernel.topo_id,
+            'line': str(kernel.line)
+        }
+        for res, avail in AVAILABLE.items():
+            perf_est[kernel.topo_id]['total-{0}'.format(res)] = str(int(est.res[res]))
+            perf_est[kernel.topo_id]['util-{0}'.format(res)] = '{0:.2f}'.format(
+                100.0 * est.res[res] / avail)
+
+        for top_loop in kernel.loops:
+            for loop in top_loop.iter_loops():
+                loop_est = ests[loop.topo_id]
+                perf_est[loop.topo_id] = {
+                    'CYCLE_TOT': str(loop_est.cycle),
+                    'CYCLE_UNIT': str(loop_est.unit),
+                    'CYCLE_BURST': str(est.burst if loop in kernel.loops else 0),
+                    'org_identifier': loop.topo_id,
+                    'line': str(loop.line)
+                }
+                if loop_est.flatten:
+                    perf_est[loop.topo_id]['flatten'] = 'yes'
+                    perf_est[loop.topo_id]['flatten-id'] = loop_est.flatten
+
+        topo_info.append({
+            'topo_id': kernel.topo_id,
+            'type': 'kernel',
+            'name': kernel.name,
+            'source': '__merlinkernel_{0}.cpp'.format(kernel.name),
+            'line': kernel.line,
+            'childs': [get_loop_topo(loop) for loop in kernel.loops],
+            'sub_functions': []
+        })
+
+        stmts: List[Dict[str, Any]] = []
+        for line_num, stmt_loop in sorted(kernel.stmts, key=lambda s: s[0]):
+            stmt: Dict[str, Any] = {'src_filename': kernel.file_name, 'src_line': line_num}
+            if stmt_loop is not None:
+                stmt['src_topo_id'] = stmt_loop.topo_id
+                stmt['type'] = 'loop'
+            else:
+                stmt['type'] = 'pragma'
+            stmts.append(stmt)
+        hierarchy.append({
+            'src_filename': kernel.file_name,
+            'src_line': kernel.line,
+            'src_topo_id': kernel.topo_id,
+            'type': 'kernel',
+            'name': kernel.name,
+            'stmts': stmts
+        })
+
+    perf_est['TOP_res_info'] = {}
+    for res, avail in AVAILABLE.items():
+        perf_est['TOP_res_info']['total-{0}'.format(res)] = str(BSP_RES[res])
+        perf_est['TOP_res_info']['util-{0}'.format(res)] = '{0:.2f}'.format(
+            100.0 * BSP_RES[res] / avail)
+
+    os.makedirs(REPORT_PATH, exist_ok=True)
+    for file_name, data in [('perf_est.json', perf_est), ('topo_info.json', topo_info),
+                            ('hierarchy.json', hierarchy)]:
+        with open(os.path.join(REPORT_PATH, file_name), 'w') as filep:
+            json.dump(data, filep, indent=4)
+
+
+def get_bitgen_log(kernels: List[Kernel],
+                   ests: Dict[str, Estimation]) -> Tuple[List[str], float]:
+    """Generate the resource and frequency messages of bitgen.
+
+    Args:
+        kernels: The kernels.
+        ests: The estimations of all loops and kernels.
+
+    Returns:
+        The log lines and the frequency in MHz (0 if the design cannot fit the device).
+    """
+
+    total = {res: sum([ests[k.topo_id].res[res] for k in kernels]) * 1.1 for res in AVAILABLE}
+    util = {res: total[res] / AVAILABLE[res] for res in AVAILABLE}
+    if any([u >= 1.0 for u in util.values()]):
+        return (['ERROR: [MERCC-3012] Hardware generation failed: the design does not fit '
+                 'the device'], 0.0)
+
+    order = ['LUT', 'FF', 'BRAM', 'DSP']
+    sep = '|----------|' + '|'.join(['-' * 20 for _ in order]) + '|'
+    lines = [
+        'Resource utilization summary:', sep,
+        '|          |' + '|'.join(['{0:^20}'.format(res) for res in order]) + '|', sep,
+        '| Available|' + '|'.join(['{0:>20}'.format(AVAILABLE[res]) for res in order]) + '|',
+        '|  Kernel  |' + '|'.join([
+            '{0:>20}'.format('{0} ({1}%)'.format(int(total[res]), int(100 * util[res])))
+            for res in order
+        ]) + '|', sep, ''
+    ]
+    freq = max(50.0, 320.0 - 220.0 * max(util.values()))
+    lines.append('Kernel Frequency: {0:.2f} MHz'.format(freq))
+    return (lines, freq)
+
+
+def run(mode: str, delay: float, trace_path: str = '') -> int:
+    """Run the fake Merlin compiler in the current directory.
+
+    Args:
+        mode: The evaluation mode (transform, hls, or bitgen).
+        delay: The evaluation time of the smallest design in seconds.
+        trace_path: The file to append the evaluation record. Empty means no trace.
+
+    Returns:
+        The exit code.
+    """
+
+    start = time.time()
+    header = [
+        '*' * 84, ' Merlin Compiler (TM) Version 2019.2.fake (AutoDSE benchmark)', '*' * 84,
+        'INFO: [MERCC-1099] Directory - {0}'.format(os.getcwd()), ''
+    ]
+
+    def write_log(lines: List[str]) -> None:
+        with open('merlin.log', 'a') as filep:
+            filep.write('\n'.join(lines) + '\n')
+            filep.flush()
+
+    kernels = parse_project('.')
+    if not kernels:
+        write_log(header + ['ERROR: [MERCC-1009] No kernel found'])
+        return 1
+
+    ests: Dict[str, Estimation] = {}
+    criticals: List[str] = []
+    for kernel in kernels:
+        estimate_kernel(kernel, ests, criticals)
+    duration = get_duration(mode, delay, kernels, ests)
+
+    # Critical messages are reported at the beginning so that they can be caught early.
+    # The estimation also compiles the kernel from the source code like Merlin does.
+    if mode in ['transform', 'hls']:
+        write_log(header + ['INFO: [MERCC-1033] Syntax checking...'] + criticals)
+    else:
+        write_log(header)
+    time.sleep(max(0.0, duration - (time.time() - start)))
+
+    freq = 0.0
+    if mode in ['transform', 'hls']:
+        os.makedirs(LC_PATH, exist_ok=True)
+        for kernel in kernels:
+            with open(os.path.join(LC_PATH, '__merlinkernel_{0}.cpp'.format(kernel.name)),
+                      'w') as filep:
+                filep.write(get_lc_code(kernel, ests))
+        with open('kernel_top.mco', 'w') as filep:
+            filep.write('fake merlin object\n')
+        lines = ['INFO: [MERCC-1040] Compilation finished successfully.']
+        if mode == 'hls':
+            write_reports(kernels, ests)
+            lines += [
+                'INFO: [MERCC-1026] Estimating performance and resource...',
+                'INFO: [MERCC-1041] Estimation successfully.'
+            ]
+    else:
+        lines = ['INFO: [MERCC-1022] Generating hardware configuration file...', '']
+        util_lines, freq = get_bitgen_log(kernels, ests)
+        lines += util_lines
+        if freq > 0:
+            with open('kernel_top.aocx', 'w') as filep:
+                filep.write('fake bitstream\n')
+            lines += ['', 'INFO: [MERCC-1032] Hardware configuration file generated successfully.']
+    elapsed = time.time() - start
+    write_log(lines + ['', 'Total time: {0:.2f} seconds'.format(elapsed), ''])
+
+    if trace_path:
+        record = {
+            'mode': mode,
+            'start': start,
+            'end': time.time(),
+            'perf': max([ests[k.topo_id].cycle for k in kernels]),
+            'util': {
+                res: max([ests[k.topo_id].res[res] / AVAILABLE[res] for k in kernels])
+                for res in AVAILABLE
+            },
+            'critical': bool(criticals),
+            'freq': freq
+        }
+        # A short line appended in one write is atomic among concurrent evaluations
+        with open(trace_path, 'a') as filep:
+            filep.write(json.dumps(record) + '\n')
+    return 0 if mode != 'bitgen' or freq > 0 else 1
+
+
+def main() -> None:
+    """The command line entry of the fake Merlin compiler."""
+
+    parser = argparse.ArgumentParser(description='Fake Merlin compiler for benchmarking')
+    parser.add_argument('mode', choices=sorted(DEFAULT_DELAY.keys()), help='evaluation mode')
+    parser.add_argument('--delay',
+                        type=float,
+                        default=None,
+                        help='evaluation time of the smallest design in seconds')
+    parser.add_argument('--time-scale',
+                        type=float,
+                        default=1.0,
+                        help='the multiplier of the evaluation time')
+    parser.add_argument('--trace',
+                        default=os.environ.get(TRACE_ENV, ''),
+                        help='the file to append evaluation records')
+    args = parser.parse_args()
+
+    delay = args.delay if args.delay is not None else DEFAULT_DELAY[args.mode]
+    sys.exit(run(args.mode, delay * args.time_scale, args.trace))
+
+
+if __name__ == '__main__':
+    main()
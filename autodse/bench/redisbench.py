@@ -0,0 +1,174 @@
+"""
+The benchmark of the Redis database.
+
+It measures the latency and the number of round trips to Redis of each database operation
+with synthetic HLS results. A local Redis server is required.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from ..database import RedisDatabase
+from ..logger import get_default_logger
+from ..result import HierPathNode, HLSResult
+
+
+def arg_parser() -> argparse.Namespace:
+    """Parse user arguments."""
+
+    parser = argparse.ArgumentParser(description='Benchmark the Redis database')
+    parser.add_argument('--num',
+                        required=False,
+                        action='store',
+                        type=int,
+                        default=100000,
+                        help='the number of results')
+    parser.add_argument('--batch-size',
+                        required=False,
+                        action='store',
+                        type=int,
+                        default=1000,
+                        help='the maximum number of fields in a Redis command')
+    parser.add_argument('--host', required=False, action='store', default='localhost')
+    parser.add_argument('--port', required=False, action='store', type=int, default=6379)
+    return parser.parse_args()
+
+
+def get_counting_pool(host: str, port: int) -> Tuple[Any, Dict[str, int]]:
+    """Create a Redis connection pool that counts the round trips.
+
+    A round trip is counted when a command or a pipeline is sent to the server.
+
+    Args:
+        host: The Redis host.
+        port: The Redis port.
+
+    Returns:
+        The connection pool and the counter.
+    """
+
+    import redis
+
+    counter = {'round-trips': 0}
+
+    class CountingConnection(redis.Connection):
+        """The connection that counts the packed commands sent to the server."""
+
+        def send_packed_command(self, command: Any, check_health: bool = True) -> None:
+            counter['round-trips'] += 1
+            super(CountingConnection, self).send_packed_command(command, check_health)
+
+    pool = redis.ConnectionPool(host=host, port=port, connection_class=CountingConnection)
+    return pool, counter
+
+
+def gen_results(num: int, seed: int = 0) -> List[Tuple[str, HLSResult]]:
+    """Generate synthetic HLS results.
+
+    Args:
+        num: The number of results.
+        seed: The random seed.
+
+    Returns:
+        A list of key-result pairs.
+    """
+
+    rand = random.Random(seed)
+    options: List[Union[int, str]] = [1, 2, 4, 8, 'off', 'cg', 'flatten']
+    pairs = []
+    for idx in range(num):
+        result = HLSResult()
+        result.point = {'P{0}'.format(pid): rand.choice(options) for pid in range(32)}
+        result.valid = rand.random() < 0.5
+        result.perf = float(rand.randint(1000, 100000))
+        result.quality = 1.0 / result.perf
+        for res in ['BRAM', 'DSP', 'LUT', 'FF']:
+            result.res_util['util-{0}'.format(res)] = rand.random()
+            result.res_util['total-{0}'.format(res)] = float(rand.randint(0, 10000))
+        kernel = HierPathNode('F_0', result.perf, False)
+        result.ordered_paths = [[
+            HierPathNode('L_0_{0}_{1}'.format(path, level), result.perf / (level + 2), True)
+            for level in range(3)
+        ] + [kernel] for path in range(16)]
+        pairs.append(('lv2:{0}'.format(idx), result))
+    return pairs
+
+
+def run_redis_benchmark(num: int,
+                        batch_size: int = 1000,
+                        host: str = 'localhost',
+                        port: int = 6379) -> Dict[str, Dict[str, float]]:
+    """Run each database operation and measure its cost.
+
+    Args:
+        num: The number of results.
+        batch_size: The maximum number of fields in a Redis command.
+        host: The Redis host.
+        port: The Redis port.
+
+    Returns:
+        The number of operations, the round trips per operation, and the milliseconds per
+        operation of each database operation.
+    """
+
+    pool, counter = get_counting_pool(host, port)
+    pairs = gen_results(num)
+    keys = [key for key, _ in pairs]
+    num_singles = min(num, 100)
+    metrics: Dict[str, Dict[str, float]] = {}
+
+    def measure(name: str, num_ops: int, func: Callable[[], Any]) -> None:
+        trips = counter['round-trips']
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        metrics[name] = {
+            'ops': num_ops,
+            'round-trips-per-op': (counter['round-trips'] - trips) / num_ops,
+            'ms-per-op': elapsed * 1000.0 / num_ops
+        }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        db = RedisDatabase('bench-redis', db_path, pool, batch_size)
+
+        def commit_singles() -> None:
+            for key, result in pairs[:num_singles]:
+                db.commit(key, result)
+
+        measure('commit', num_singles, commit_singles)
+        measure('batch_commit', 1, lambda: db.batch_commit(pairs))
+        measure('query', num_singles, lambda: [db.query(key) for key in keys[:num_singles]])
+        measure('query-missing', num_singles,
+                lambda: [db.query('missing:{0}'.format(idx)) for idx in range(num_singles)])
+        measure('batch_query', 1, lambda: db.batch_query(keys))
+        measure('count', 1, db.count)
+        measure('query_keys', 1, db.query_keys)
+        measure('persist', 1, db.persist)
+
+        loaded_db = RedisDatabase('bench-redis-load', db_path, pool, batch_size)
+        measure('load', 1, loaded_db.load)
+        assert loaded_db.count() == num
+        del loaded_db
+        del db
+    return metrics
+
+
+def main() -> None:
+    """The command line entry of the Redis benchmark."""
+
+    args = arg_parser()
+    metrics = run_redis_benchmark(args.num, args.batch_size, args.host, args.port)
+
+    log = get_default_logger('Bench')
+    log.info('%-15s %8s %12s %12s', 'operation', 'ops', 'trips/op', 'ms/op')
+    for name, metric in metrics.items():
+        log.info('%-15s %8d %12.2f %12.3f', name, metric['ops'], metric['round-trips-per-op'],
+                 metric['ms-per-op'])
+
+
+if __name__ == '__main__':
+    main()
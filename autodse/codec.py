@@ -0,0 +1,324 @@
+"""
+The compact binary codec of evaluation results.
+
+A result is encoded as a header, a string table, and the fields packed with struct. All
+strings of a result, such as design parameter IDs, option values, and the scope IDs of
+hierarchy paths, are stored once in the string table and referred by their indices. The
+decoded strings are interned so that the results loaded by the database share them.
+
+Other values (e.g., the scope map and the evaluation time sketches) and the results of other
+classes are pickled. Values without the header are read by pickle as well, so the databases
+written before the codec are still readable.
+"""
+import pickle
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from .result import BitgenResult, HLSResult, HierPathNode, MerlinResult, ResourceUsage, Result
+
+# The header of encoded results. Pickle data never starts with it.
+MAGIC = b'\xadR'
+
+# The codec version, which is bumped when the format is changed
+VERSION = 1
+
+# The class of each result kind
+RESULT_KINDS = [Result, MerlinResult, HLSResult, BitgenResult]
+
+# The fields of a new result of each kind
+DEFAULT_STATES = [cls().__getstate__() for cls in RESULT_KINDS]
+
+HEADER = struct.Struct('<2sBB')
+U8 = struct.Struct('<B')
+U32 = struct.Struct('<I')
+I32 = struct.Struct('<i')
+F64 = struct.Struct('<d')
+BASE_FIELDS = struct.Struct('<b?ddd')
+UTIL = struct.Struct('<Id')
+PARAM = struct.Struct('<IBq')
+USAGE = struct.Struct('<ddddqq')
+NODE = struct.Struct('<Id?')
+
+# The type tags of design parameter values
+TAG_STR = 0
+TAG_INT = 1
+TAG_OTHER = 2
+
+
+class Encoder():
+    """The encoder of a result.
+
+    Attributes:
+        strs: The string table.
+        str_index: The index of each string in the table.
+        body: The encoded fields.
+    """
+
+    def __init__(self):
+        self.strs: List[bytes] = []
+        self.str_index: Dict[str, int] = {}
+        self.body: List[bytes] = []
+
+    def add_str(self, val: str) -> int:
+        """Add a string to the string table if not added yet.
+
+        Args:
+            val: The string.
+
+        Returns:
+            The index of the string.
+        """
+
+        idx = self.str_index.get(val)
+        if idx is None:
+            idx = len(self.strs)
+            self.str_index[val] = idx
+            self.strs.append(val.encode('utf-8', errors='surrogatepass'))
+        return idx
+
+    def put_opt_str(self, val: Optional[str]) -> None:
+        """Encode a string or None."""
+        self.body.append(I32.pack(-1 if val is None else self.add_str(val)))
+
+    def put_blob(self, val: bytes) -> None:
+        """Encode a byte string."""
+        self.body.append(U32.pack(len(val)))
+        self.body.append(val)
+
+    def put_array(self, fmt: struct.Struct, rows: List[Tuple[Any, ...]]) -> None:
+        """Encode an array of structs."""
+        self.body.append(U32.pack(len(rows)))
+        self.body += [fmt.pack(*row) for row in rows]
+
+    def put_u32s(self, vals: List[int]) -> None:
+        """Encode an array of unsigned integers."""
+        self.body.append(U32.pack(len(vals)))
+        self.body.append(struct.pack('<{0}I'.format(len(vals)), *vals))
+
+    def encode(self, result: Result, kind: int) -> bytes:
+        """Encode a result.
+
+        Args:
+            result: The result.
+            kind: The index of the result class in RESULT_KINDS.
+
+        Returns:
+            The encoded result.
+        """
+
+        # Results loaded from old databases may miss the fields added later
+        state = dict(DEFAULT_STATES[kind])
+        state.update(result.__getstate__())
+        self.body.append(
+            BASE_FIELDS.pack(state.pop('ret_code').value, state.pop('valid'),
+                             state.pop('quality'), state.pop('perf'), state.pop('eval_time')))
+        self.put_opt_str(state.pop('path'))
+        self.put_array(UTIL, [(self.add_str(k), v) for k, v in state.pop('res_util').items()])
+
+        # The values other than strings and integers are pickled together
+        point = state.pop('point')
+        params: List[Tuple[int, int, int]] = []
+        others: List[Any] = []
+        for key, val in (point or {}).items():
+            if isinstance(val, str):
+                params.append((self.add_str(key), TAG_STR, self.add_str(val)))
+            elif isinstance(val, int) and not isinstance(val, bool) and -2**63 <= val < 2**63:
+                params.append((self.add_str(key), TAG_INT, val))
+            else:
+                params.append((self.add_str(key), TAG_OTHER, len(others)))
+                others.append(val)
+        self.body.append(U8.pack(point is not None))
+        self.put_array(PARAM, params)
+        self.put_blob(pickle.dumps(others, pickle.HIGHEST_PROTOCOL) if others else b'')
+
+        usage = state.pop('usage')
+        self.body.append(U8.pack(usage is not None))
+        if usage is not None:
+            self.body.append(USAGE.pack(*usage))
+
+        if kind == RESULT_KINDS.index(MerlinResult):
+            self.put_u32s([self.add_str(msg) for msg in state.pop('criticals')])
+            self.put_opt_str(state.pop('code_hash'))
+            self.put_opt_str(state.pop('src_hash'))
+        elif kind == RESULT_KINDS.index(HLSResult):
+            # Paths share most of their nodes, so the nodes are stored once in a table
+            paths = state.pop('ordered_paths')
+            nodes: Dict[HierPathNode, int] = {}
+            path_nodes = [[nodes.setdefault(node, len(nodes)) for node in path]
+                          for path in paths or []]
+            self.put_array(NODE, [(self.add_str(node.nid), node.latency, node.is_compute_bound)
+                                  for node in nodes])
+            self.body.append(U8.pack(paths is not None))
+            self.put_u32s([len(path) for path in path_nodes])
+            self.put_u32s([idx for path in path_nodes for idx in path])
+        elif kind == RESULT_KINDS.index(BitgenResult):
+            self.body.append(F64.pack(state.pop('freq')))
+
+        # The fields that this codec version does not know
+        self.put_blob(pickle.dumps(state, pickle.HIGHEST_PROTOCOL) if state else b'')
+
+        table = [U32.pack(len(self.strs))]
+        table.append(struct.pack('<{0}I'.format(len(self.strs)), *[len(s) for s in self.strs]))
+        return b''.join([HEADER.pack(MAGIC, VERSION, kind)] + table + self.strs + self.body)
+
+
+class Decoder():
+    """The decoder of a result.
+
+    Attributes:
+        data: The encoded result.
+        offset: The current position in the data.
+        strs: The string table.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = HEADER.size
+        self.strs: List[str] = []
+
+    def get(self, fmt: struct.Struct) -> Tuple[Any, ...]:
+        """Decode a struct."""
+        vals = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return vals
+
+    def get_opt_str(self) -> Optional[str]:
+        """Decode a string or None."""
+        idx = self.get(I32)[0]
+        return None if idx < 0 else self.strs[idx]
+
+    def get_blob(self) -> bytes:
+        """Decode a byte string."""
+        size = self.get(U32)[0]
+        self.offset += size
+        return bytes(self.data[self.offset - size:self.offset])
+
+    def get_array(self, fmt: struct.Struct) -> List[Tuple[Any, ...]]:
+        """Decode an array of structs."""
+        size = self.get(U32)[0] * fmt.size
+        self.offset += size
+        return list(fmt.iter_unpack(self.data[self.offset - size:self.offset]))
+
+    def get_u32s(self) -> Tuple[int, ...]:
+        """Decode an array of unsigned integers."""
+        num = self.get(U32)[0]
+        vals = struct.unpack_from('<{0}I'.format(num), self.data, self.offset)
+        self.offset += num * U32.size
+        return vals
+
+    def decode(self, kind: int) -> Result:
+        """Decode a result.
+
+        Args:
+            kind: The index of the result class in RESULT_KINDS.
+
+        Returns:
+            The decoded result.
+        """
+
+        sizes = self.get_u32s()
+        offset = self.offset
+        for size in sizes:
+            self.strs.append(
+                sys.intern(str(self.data[offset:offset + size], 'utf-8', 'surrogatepass')))
+            offset += size
+        self.offset = offset
+        strs = self.strs
+
+        state: Dict[str, Any] = {}
+        ret_code, state['valid'], state['quality'], state['perf'], state['eval_time'] = self.get(
+            BASE_FIELDS)
+        state['ret_code'] = Result.RetCode(ret_code)
+        state['path'] = self.get_opt_str()
+        state['res_util'] = {strs[idx]: val for idx, val in self.get_array(UTIL)}
+
+        has_point = self.get(U8)[0]
+        params = self.get_array(PARAM)
+        others = self.get_blob()
+        other_vals = pickle.loads(others) if others else []
+        point: Optional[Dict[str, Any]] = None
+        if has_point:
+            point = {}
+            for key, tag, val in params:
+                if tag == TAG_STR:
+                    point[strs[key]] = strs[val]
+                elif tag == TAG_INT:
+                    point[strs[key]] = val
+                else:
+                    point[strs[key]] = other_vals[val]
+        state['point'] = point
+
+        has_usage = self.get(U8)[0]
+        state['usage'] = ResourceUsage(*self.get(USAGE)) if has_usage else None
+
+        if kind == RESULT_KINDS.index(MerlinResult):
+            state['criticals'] = [strs[idx] for idx in self.get_u32s()]
+            state['code_hash'] = self.get_opt_str()
+            state['src_hash'] = self.get_opt_str()
+        elif kind == RESULT_KINDS.index(HLSResult):
+            nodes = [HierPathNode(strs[idx], latency, bound)
+                     for idx, latency, bound in self.get_array(NODE)]
+            has_paths = self.get(U8)[0]
+            path_lens = self.get_u32s()
+            node_ids = self.get_u32s()
+            paths: Optional[List[List[HierPathNode]]] = None
+            if has_paths:
+                paths = []
+                start = 0
+                for path_len in path_lens:
+                    paths.append([nodes[idx] for idx in node_ids[start:start + path_len]])
+                    start += path_len
+            state['ordered_paths'] = paths
+        elif kind == RESULT_KINDS.index(BitgenResult):
+            state['freq'] = self.get(F64)[0]
+
+        extra = self.get_blob()
+        if extra:
+            state.update(pickle.loads(extra))
+
+        result = RESULT_KINDS[kind].__new__(RESULT_KINDS[kind])
+        result.__setstate__(state)
+        return result
+
+
+def encode_value(value: Any) -> bytes:
+    """Encode a value to be stored in the database.
+
+    Args:
+        value: The value.
+
+    Returns:
+        The encoded result, or the pickled value if it is not a result.
+    """
+
+    kind = RESULT_KINDS.index(type(value)) if type(value) in RESULT_KINDS else -1
+    if kind < 0:
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return Encoder().encode(value, kind)
+
+
+def decode_value(data: bytes) -> Any:
+    """Decode a value from the database.
+
+    Args:
+        data: The encoded result or the pickled value.
+
+    Returns:
+        The value.
+
+    Raises:
+        ValueError: The data was encoded by a newer codec or is corrupted.
+    """
+
+    if data[:len(MAGIC)] != MAGIC:
+        # Legacy pickled results and other values
+        return pickle.loads(data)
+
+    _, version, kind = HEADER.unpack_from(data)
+    if version > VERSION or kind >= len(RESULT_KINDS):
+        raise ValueError('Unsupported result codec version {0} or kind {1}'.format(version, kind))
+    try:
+        return Decoder(data).decode(kind)
+    except (struct.error, IndexError, UnicodeDecodeError) as err:
+        raise ValueError('Corrupted result data: {0}'.format(str(err))) from err
@@ -24,6 +24,10 @@ CONFIG_SETTING: Dict[str, Dict[str, Any]] = {
         'require': False,
         'default': 4
     },
+    'project.speculative-bitgen': {
+        'require': False,
+        'default': False
+    },
     'design-space.definition': {
         'require': True
     },
@@ -35,6 +39,63 @@ CONFIG_SETTING: Dict[str, Dict[str, Any]] = {
         'require': False,
         'default': 2
     },
+    'evaluate.max-workers': {
+        'require': False,
+        'default': 0
+    },
+    'evaluate.analysis-workers': {
+        'require': False,
+        'default': 0
+    },
+    'evaluate.workspace': {
+        'require': False,
+        'default': 'HARDLINK',
+        'options': ['COPY', 'HARDLINK', 'REFLINK']
+    },
+    'evaluate.admission.enable': {
+        'require': False,
+        'default': False
+    },
+    'evaluate.admission.min-free-mem': {
+        'require': False,
+        'default': 1024
+    },
+    'evaluate.admission.max-load': {
+        'require': False,
+        'default': 1.5
+    },
+    'evaluate.adaptive-timeout.enable': {
+        'require': False,
+        'default': False
+    },
+    'evaluate.adaptive-timeout.multiple': {
+        'require': False,
+        'default': 3.0
+    },
+    'evaluate.adaptive-timeout.min-samples': {
+        'require': False,
+        'default': 10
+    },
+    'evaluate.cache.path': {
+        'require': False,
+        'default': ''
+    },
+    'evaluate.cache.size': {
+        'require': False,
+        'default': 10240
+    },
+    'evaluate.cache.tool-version': {
+        'require': False,
+        'default': ''
+    },
+    'evaluate.code-hash.normalize': {
+        'require': False,
+        'default': False
+    },
+    'evaluate.hotspot.top-k': {
+        'require': False,
+        'default': 64
+    },
     'evaluate.command.transform': {
         'require': True,
     },
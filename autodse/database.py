@@ -9,6 +9,7 @@ from threading import Lock
 from time import time
 from typing import Any, Dict, List, Optional, Tuple, Union
 
+from .codec import decode_value, encode_value
 from .logger import get_default_logger
 from .parameter import gen_key_from_design_point
 from .result import HLSResult, MerlinResult, Result
@@ -23,6 +24,7 @@ class Database():
         db_file_path: Path to persist the database.
         best_cache: A priority queue for best results.
         code_hash_map: A dictionary to map code hash to the corresponding HLS result.
+        src_hash_map: A dictionary to map applied source hash to the corresponding point key.
     """
 
     def __init__(self, name: str, db_file_path: Optional[str] = None):
@@ -59,6 +61,11 @@ class Database():
         # HLS code generated by Merlin.
         self.code_hash_map: Dict[str, str] = {}
 
+        # Source hash set
+        # The purpose of the set is to avoid transforming two points that result in the same
+        # source code after applying design parameters.
+        self.src_hash_map: Dict[str, str] = {}
+
     def init_best_cache(self) -> None:
         """Initialize the best cache using the loaded data."""
 
@@ -70,7 +77,7 @@ class Database():
                 self.best_cache.put((result.quality, time(), result), timeout=0.1)
 
     def init_code_hash_map(self) -> None:
-        """Initialize the code hash set using the loaded data."""
+        """Initialize the code hash and source hash sets using the loaded data."""
 
         if self.count() == 0:
             return
@@ -79,6 +86,9 @@ class Database():
             if result.code_hash is not None and result.ret_code != Result.RetCode.DUPLICATED:
                 assert result.point is not None
                 self.code_hash_map[result.code_hash] = gen_key_from_design_point(result.point)
+            src_hash = getattr(result, 'src_hash', None)
+            if src_hash is not None and result.point is not None:
+                self.src_hash_map.setdefault(src_hash, gen_key_from_design_point(result.point))
 
     def add_code_hash(self, code_hash: str, key: str) -> Optional[str]:
         """Add a new code hash to the map and check if it already exists.
@@ -96,6 +106,22 @@ class Database():
         self.code_hash_map[code_hash] = key
         return None
 
+    def add_src_hash(self, src_hash: str, key: str) -> Optional[str]:
+        """Add a new applied source hash to the map and check if it already exists.
+
+        Args:
+            src_hash: The source hash to be added.
+            key: The key of the design point.
+
+        Returns:
+            None if the source hash is new; otherwise the key with the same source hash.
+        """
+
+        if src_hash in self.src_hash_map:
+            return self.src_hash_map[src_hash]
+        self.src_hash_map[src_hash] = key
+        return None
+
     def update_best(self, result: Result) -> None:
         """Check if the new result has the best QoR and update it if so.
 
@@ -230,27 +256,42 @@ class Database():
 class RedisDatabase(Database):
     """The database implementation using Redis database.
 
+    Results are stored with the compact binary codec and other values are pickled. Each
+    operation takes one round trip to Redis, and large batches are split into chunks that are
+    sent in one pipeline so that no single command blocks the server for long.
+
     Attributes:
+        batch_size: The maximum number of fields in a command.
+        pool: The connection pool shared by all threads.
         database: The Redis database.
     """
 
-    def __init__(self, name: str, db_file_path: Optional[str] = None):
+    def __init__(self,
+                 name: str,
+                 db_file_path: Optional[str] = None,
+                 connection_pool: Optional[Any] = None,
+                 batch_size: int = 1000):
         """Constructor
 
         Args:
             name: The database name.
             db_file_path: Path to persist the database.
+            connection_pool: The Redis connection pool. None means connecting to the local
+                             Redis server.
+            batch_size: The maximum number of fields in a command.
         """
         super(RedisDatabase, self).__init__(name, db_file_path)
 
         import redis
 
         #TODO: scale-out
-        self.database = redis.StrictRedis(host='localhost', port=6379)
+        self.batch_size = batch_size
+        self.pool = connection_pool or redis.ConnectionPool(host='localhost', port=6379)
+        self.database = redis.StrictRedis(connection_pool=self.pool)
 
         # Check the connection
         try:
-            self.database.client_list()
+            self.database.ping()
         except redis.ConnectionError as err:
             print('Error: Failed to connect to Redis database: {}'.format(str(err)))
             sys.exit(1)
@@ -259,7 +300,8 @@ class RedisDatabase(Database):
         #pylint:disable=missing-docstring
 
         # Load existing data
-        # Note that the dumped data for RedisDatabase should be in pickle format
+        # Note that the dumped data for RedisDatabase is a pickled dictionary of the encoded
+        # values, and the values pickled by the older versions are still readable
         if os.path.exists(self.db_file_path):
             with open(self.db_file_path, 'rb') as filep:
                 try:
@@ -268,26 +310,44 @@ class RedisDatabase(Database):
                     print('Failed to initialize the database: {}'.format(str(err)))
                     sys.exit(1)
             self.log.info('Load %d data from an existing database', len(data))
-            self.database.hmset(self.db_id, data)
+            self.batch_set(list(data.items()))
 
         self.init_best_cache()
         self.init_code_hash_map()
 
     def __del__(self):
         """Delete the data we generated in Redis database"""
-        if self.database:
-            self.database.delete(self.db_id)
+
+        # The constructor may fail before connecting to the database
+        database = getattr(self, 'database', None)
+        if database is None:
+            return
+
+        import redis
+        try:
+            database.delete(self.db_id)
+        except redis.RedisError:
+            pass
+
+    def batch_set(self, pairs: List[Tuple[str, bytes]]) -> None:
+        """Set the encoded values in one round trip.
+
+        Args:
+            pairs: A list of key-value pairs.
+        """
+
+        with self.database.pipeline(transaction=False) as pipe:
+            for idx in range(0, len(pairs), self.batch_size):
+                pipe.hset(self.db_id, mapping=dict(pairs[idx:idx + self.batch_size]))
+            pipe.execute()
 
     def query(self, key: str) -> Optional[Any]:
         #pylint:disable=missing-docstring
 
-        if not self.database.hexists(self.db_id, key):
-            return None
-
-        pickled_obj = self.database.hget(self.db_id, key)
-        if pickled_obj:
+        encoded_obj = self.database.hget(self.db_id, key)
+        if encoded_obj:
             try:
-                return pickle.loads(pickled_obj)
+                return decode_value(encoded_obj)
             except ValueError as err:
                 self.log.error('Failed to deserialize the result of %s: %s', key, str(err))
         return None
@@ -298,12 +358,16 @@ class RedisDatabase(Database):
         if not keys:
             return []
 
-        data = []
+        with self.database.pipeline(transaction=False) as pipe:
+            for idx in range(0, len(keys), self.batch_size):
+                pipe.hmget(self.db_id, keys[idx:idx + self.batch_size])
+            encoded_objs = [obj for chunk in pipe.execute() for obj in chunk]
 
-        for key, pickled_obj in zip(keys, self.database.hmget(self.db_id, keys)):
-            if pickled_obj:
+        data: List[Optional[Any]] = []
+        for key, encoded_obj in zip(keys, encoded_objs):
+            if encoded_obj:
                 try:
-                    data.append(pickle.loads(pickled_obj))
+                    data.append(decode_value(encoded_obj))
                 except ValueError as err:
                     self.log.error('Failed to deserialize the result of %s: %s', key, str(err))
                     data.append(None)
@@ -318,28 +382,24 @@ class RedisDatabase(Database):
     def commit_impl(self, key: str, result: Any) -> bool:
         #pylint:disable=missing-docstring
 
-        pickled_result = pickle.dumps(result)
-        self.database.hset(self.db_id, key, pickled_result)
+        self.database.hset(self.db_id, key, encode_value(result))
         return True
 
     def batch_commit_impl(self, pairs: List[Tuple[str, Any]]) -> int:
         #pylint:disable=missing-docstring
 
-        data = {key: pickle.dumps(result) for key, result in pairs}
-        self.database.hmset(self.db_id, data)
-        return len(data)
+        self.batch_set([(key, encode_value(result)) for key, result in pairs])
+        return len(pairs)
 
     def count(self) -> int:
         #pylint:disable=missing-docstring
-        return len(self.database.hkeys(self.db_id))
+        return self.database.hlen(self.db_id)
 
     def persist(self) -> bool:
         #pylint:disable=missing-docstring
 
-        dump_db = {
-            key: self.database.hget(self.db_id, key)
-            for key in self.database.hgetall(self.db_id)
-        }
+        # Stream the encoded values without decoding them
+        dump_db = dict(self.database.hscan_iter(self.db_id, count=self.batch_size))
         with open(self.db_file_path, 'wb') as filep:
             pickle.dump(dump_db, filep, pickle.HIGHEST_PROTOCOL)
 
@@ -0,0 +1,149 @@
+"""
+The module of machine resource aware job admission.
+"""
+import os
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from ..logger import get_eval_logger
+
+
+class AdmissionController():
+    """Decide if a new job can be launched without overloading the machine.
+
+    The controller samples the available memory and the system load from /proc, and learns
+    the peak resident memory of each command (i.e., each evaluation level) from finished jobs.
+    A job is admitted only when its predicted memory footprint fits the available memory and
+    the load is below the limit. Since a launched job takes a while to reach its peak memory
+    and to be reflected in the load average, the predicted footprint of recently launched jobs
+    is reserved until the ramp-up time elapses. A job is always admitted when no job launched
+    by this controller is running so that the exploration never stalls.
+
+    Attributes:
+        log: The logger.
+        min_free_mem: The memory in MB that should be kept free.
+        max_load: The maximum system load per CPU core. 0 means no limit.
+        ramp_time: The time in seconds to reserve resources for a newly launched job.
+        lock: The lock of the controller status.
+        peak_mem: The learned peak memory in MB of each command.
+        recent: The command and launch time of recently launched jobs.
+        running: The number of running jobs launched by this controller.
+    """
+
+    def __init__(self, min_free_mem: float = 1024, max_load: float = 0,
+                 ramp_time: float = 60):
+        self.log = get_eval_logger('Admission')
+        self.min_free_mem = min_free_mem
+        self.max_load = max_load
+        self.ramp_time = ramp_time
+        self.lock = Lock()
+        self.peak_mem: Dict[str, float] = {}
+        self.recent: List[Tuple[str, float]] = []
+        self.running = 0
+
+    @staticmethod
+    def get_available_mem() -> Optional[float]:
+        """Sample the available memory of the machine.
+
+        Returns:
+            The available memory in MB, or None if it is not available on this platform.
+        """
+
+        try:
+            with open('/proc/meminfo', 'r') as filep:
+                for line in filep:
+                    if line.startswith('MemAvailable:'):
+                        return float(line.split()[1]) / 1024.0
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+
+    @staticmethod
+    def get_load() -> Optional[float]:
+        """Sample the system load per CPU core.
+
+        Returns:
+            The 1-minute load average divided by the number of cores, or None if it is not
+            available on this platform.
+        """
+
+        try:
+            with open('/proc/loadavg', 'r') as filep:
+                load = float(filep.read().split()[0])
+        except (OSError, ValueError, IndexError):
+            return None
+        return load / (os.cpu_count() or 1)
+
+    def get_reserved(self, now: float) -> Tuple[float, int]:
+        """Compute the resources reserved by recently launched jobs. The caller must hold
+        the lock.
+
+        Args:
+            now: The current time.
+
+        Returns:
+            The reserved memory in MB and the number of recently launched jobs.
+        """
+
+        self.recent = [(cmd, start) for cmd, start in self.recent if now - start < self.ramp_time]
+        return sum([self.peak_mem.get(cmd, 0) for cmd, _ in self.recent]), len(self.recent)
+
+    def reserve(self, cmd: str) -> bool:
+        """Admit a job of the given command if the machine can afford it.
+
+        The resources of an admitted job are reserved immediately, so the caller must either
+        launch the job or call cancel.
+
+        Args:
+            cmd: The command of the job.
+
+        Returns:
+            True if the job is admitted.
+        """
+
+        with self.lock:
+            now = time.time()
+            reserved_mem, num_recent = self.get_reserved(now)
+            if self.running > 0:
+                mem = self.get_available_mem()
+                if mem is not None and (mem - reserved_mem - self.peak_mem.get(cmd, 0) <
+                                        self.min_free_mem):
+                    return False
+
+                load = self.get_load()
+                if self.max_load > 0 and load is not None and (
+                        load + float(num_recent) / (os.cpu_count() or 1) >= self.max_load):
+                    return False
+
+            self.running += 1
+            self.recent.append((cmd, now))
+            return True
+
+    def cancel(self, cmd: str) -> None:
+        """Release the reservation of a job that was admitted but not launched.
+
+        Args:
+            cmd: The command of the job.
+        """
+
+        with self.lock:
+            self.running -= 1
+            for idx in range(len(self.recent) - 1, -1, -1):
+                if self.recent[idx][0] == cmd:
+                    del self.recent[idx]
+                    break
+
+    def finish(self, cmd: str, peak_mem: Optional[float] = None) -> None:
+        """Record a finished job and learn its peak memory.
+
+        Args:
+            cmd: The command of the job.
+            peak_mem: The peak resident memory of the job in MB. None means unknown.
+        """
+
+        with self.lock:
+            self.running -= 1
+            if peak_mem is not None and peak_mem > self.peak_mem.get(cmd, 0):
+                self.log.debug('Peak memory of "%s" is updated to %.2f MB', cmd, peak_mem)
+                self.peak_mem[cmd] = peak_mem
@@ -2,14 +2,16 @@
 The main module of analyzer.
 """
 import glob
-import json
+import hashlib
+import itertools
 import os
 import re
 from logging import Logger
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from ..logger import get_eval_logger
 from ..result import BitgenResult, HLSResult, HierPathNode, Job, MerlinResult, Result
+from .report import HIERARCHY_FIELDS, PERF_EST_FIELDS, TOPO_INFO_FIELDS, load_report
 
 
 class Analyzer():
@@ -47,6 +49,207 @@ class Analyzer():
         """
         raise NotImplementedError()
 
+    @staticmethod
+    def reject_patterns(mode: str) -> Optional[Tuple[str, List[str]]]:
+        """Return the log file and the messages that indicate a running job will be rejected
+        by the analysis, so that the job can be aborted early.
+
+        Args:
+            mode: The customized mode for analysis.
+
+        Returns:
+            The log file name in the working directory and a list of messages, or None if
+            early rejection is not supported.
+        """
+        #pylint:disable=unused-argument
+        return None
+
+
+class MerlinLogSummary():
+    """The summary of merlin.log produced by a single pass over the log.
+
+    Attributes:
+        markers: The names of the flow steps that were finished successfully (transform, hls)
+                 or started (bitgen).
+        eval_time: The total runtime in seconds of all flow steps in the log.
+        time_error: Indicate if any runtime in the log cannot be parsed.
+        criticals: The lines that have critical messages.
+        res_util: The resource utilization in the resource utilization summary table.
+        res_error: Indicate if the resource utilization summary table cannot be parsed.
+        freq: The kernel frequency in MHz. 0 means not found.
+        has_error: Indicate if the log has any errors.
+    """
+
+    def __init__(self):
+        self.markers: Set[str] = set()
+        self.eval_time = 0.0
+        self.time_error = False
+        self.criticals: List[str] = []
+        self.res_util: Dict[str, float] = {}
+        self.res_error = False
+        self.freq = 0.0
+        self.has_error = False
+
+
+class HotspotGraph():
+    """The kernel hierarchy in the Merlin report as a DAG for critical path queries.
+
+    Each scope (e.g., function, loop, etc) is converted only once with its latency and
+    boundedness, and the scopes of a sub-function are shared by all its call sites, so
+    building the graph takes linear time to the report size. Hierarchy paths are then
+    enumerated lazily in the order of their latencies.
+
+    Attributes:
+        cycles: A dictionary to map scope to its latency from the perf_est report.
+        roots: The IDs of the kernel nodes.
+        nodes: The path node of each scope, or None if the scope should not be in paths.
+        childs: The child IDs of each scope, sorted by their latencies.
+        has_paths: Indicate if any path goes through each scope.
+    """
+
+    def __init__(self, cycles: Dict[str, Any], hier: List[Dict[str, Any]]):
+        self.cycles = cycles
+        self.roots: List[str] = []
+        self.nodes: Dict[str, Optional[HierPathNode]] = {}
+        self.childs: Dict[str, List[str]] = {}
+        self.has_paths: Dict[str, bool] = {}
+
+        for kernel in hier:
+            sub_funcs = {func['name']: func for func in kernel['sub_functions']}
+            self.roots.append(self.add_node(kernel, sub_funcs))
+
+    @staticmethod
+    def float_or_zero(string: str) -> float:
+        """Cast the input string to a float point or 0 otherwise."""
+        try:
+            return float(string)
+        except ValueError:
+            return 0
+
+    def get_cycle(self, topo_id: str) -> int:
+        """Get the total latency of a scope, or 0 if not available."""
+
+        if topo_id not in self.cycles or 'CYCLE_TOT' not in self.cycles[topo_id]:
+            return 0
+        try:
+            return int(self.cycles[topo_id]['CYCLE_TOT'])
+        except ValueError:
+            return 0
+
+    def get_path_node(self, topo_id: str) -> Optional[HierPathNode]:
+        """Create the path node of a scope with its latency and boundedness.
+
+        Args:
+            topo_id: The topology ID of the scope.
+
+        Returns:
+            The path node, or None if we should not spend time on the scope.
+        """
+
+        if topo_id not in self.cycles:
+            log = Analyzer.get_analyzer_logger()
+            log.warning('Hierarchy node %s has no cycle info', topo_id)
+            return None
+
+        info = self.cycles[topo_id]
+        org_id = info['org_identifier']
+        if info.get('flatten') == 'yes' and 'flatten-id' in info:
+            info = self.cycles[info['flatten-id']]
+        total = self.float_or_zero(info['CYCLE_TOT']) if 'CYCLE_TOT' in info else 0
+        unit = self.float_or_zero(info['CYCLE_UNIT']) if 'CYCLE_UNIT' in info else 0
+        comm = self.float_or_zero(info['CYCLE_BURST']) if 'CYCLE_BURST' in info else 0
+
+        if total == 0:
+            return None  # No data
+        if comm == 0:
+            is_compute_bound = True
+        else:
+            # This is a heuristic since BURST cycle is from
+            # model but unit cycle is from vendor report.
+            # FIXME we should have a better way to judge it.
+            is_compute_bound = (comm / unit) < 0.8
+
+        # Fitler out the components that we should not spend time on
+        if org_id.startswith('X'):
+            return None
+        if org_id.startswith('BuiltIn') and is_compute_bound:
+            # Keep Merlin generated memcpy functions only when they are bounded by bandwidth
+            # since we will try memory coalescing no matter what this scope can be mapped to
+            # pragma or not.
+            return None
+        return HierPathNode(org_id, total, is_compute_bound)
+
+    def add_node(self, node: Dict[str, Any], sub_funcs: Dict[str, Any]) -> str:
+        """Recursively add a scope and its sub-scopes to the graph if not added yet.
+
+        Args:
+            node: The scope in the hierarchy.
+            sub_funcs: A dictionary to map sub-function names to their hierarchy properties.
+
+        Returns:
+            The ID of the scope.
+        """
+
+        topo_id = node['topo_id']
+        if topo_id in self.nodes:
+            return topo_id
+
+        # Mark the scope as added before visiting sub-scopes to break recursive calls
+        self.nodes[topo_id] = None
+        self.has_paths[topo_id] = False
+
+        if not node['childs']:
+            if node['type'] == 'callfunction' and node['name'] in sub_funcs:
+                # Traverse functions by its function call
+                childs = [self.add_node(sub_funcs[node['name']], sub_funcs)]
+            else:
+                # Innermost component
+                childs = []
+        else:
+            childs = [self.add_node(child, sub_funcs) for child in node['childs']]
+            childs.sort(key=self.get_cycle, reverse=True)
+
+        self.childs[topo_id] = childs
+        self.nodes[topo_id] = self.get_path_node(topo_id)
+        self.has_paths[topo_id] = (self.nodes[topo_id] is not None
+                                   or any([self.has_paths[child] for child in childs]))
+        return topo_id
+
+    def iter_paths(self, topo_id: str,
+                   ancestors: List[HierPathNode]) -> Iterator[List[HierPathNode]]:
+        """Enumerate the paths through a scope in the order of their latencies.
+
+        Args:
+            topo_id: The ID of the scope.
+            ancestors: The path nodes from the root to the parent of the scope.
+
+        Returns:
+            An iterator of paths from the innermost scope to the root.
+        """
+
+        node = self.nodes[topo_id]
+        if node is not None:
+            ancestors.append(node)
+        childs = [child for child in self.childs[topo_id] if self.has_paths[child]]
+        if childs:
+            for child in childs:
+                yield from self.iter_paths(child, ancestors)
+        elif node is not None:
+            yield list(reversed(ancestors))
+        if node is not None:
+            ancestors.pop()
+
+    def iter_all_paths(self) -> Iterator[List[HierPathNode]]:
+        """Enumerate the paths of all kernels in the order of their latencies.
+
+        Returns:
+            An iterator of paths from the innermost scope to the kernel.
+        """
+
+        for root in self.roots:
+            if self.has_paths[root]:
+                yield from self.iter_paths(root, [])
+
 
 class MerlinAnalyzer(Analyzer):
     """"The analyzer especially for Merlin projects"""
@@ -58,6 +261,22 @@ class MerlinAnalyzer(Analyzer):
 
     resource_types = ['BRAM', 'FF', 'LUT', 'DSP']
 
+    # The numbering of Merlin generated identifiers (e.g., __merlin_tmp_12 and merlinL3)
+    merlin_id_re = re.compile(r'\b(_*merlin\w*?)_?\d+\b', re.IGNORECASE)
+
+    # The alternation of all messages we are looking for in merlin.log, so that each line
+    # is scanned only once
+    log_token_re = re.compile('|'.join([
+        r'(?P<transform>Compilation finished successfully)',
+        r'(?P<hls>Estimation successfully\.)',
+        r'(?P<bitgen>Generating hardware configuration file)',
+        r'Total time: (?P<time>.*?)seconds',
+        r'(?P<critical>{0})'.format('|'.join([re.escape(msg) for msg in critical_msgs])),
+        r'(?P<util>Resource utilization summary:)',
+        r'Kernel Frequency: (?P<freq>[0-9|.]+) MHz',
+        r'(?P<error>ERROR)'
+    ]))
+
     @staticmethod
     def build_scope_map(hier: Union[Dict[str, Any], List[Any]], auto_map: Dict[str, List[str]],
                         scope_map: Dict[str, List[str]]) -> None:
@@ -97,7 +316,7 @@ class MerlinAnalyzer(Analyzer):
         """Analyze the corresponding scope to each design parameter.
 
         Args:
-            job: The job of the Merlin project with no design point applied after HLS.
+            job: The job of the Merlin project after HLS, which may have a design point applied.
             auto_map: A map that maps source code filename:line to a list of design parameter IDs.
 
         Returns:
@@ -112,12 +331,11 @@ class MerlinAnalyzer(Analyzer):
             log.error('Cannot find hierarchy file from Merlin report for analysis')
             return None
 
-        with open(hier_path, 'r') as filep:
-            try:
-                hier_info = json.load(filep)
-            except ValueError as err:
-                log.debug('Failed to read Merlin report %s: %s', hier_path, str(err))
-                return None
+        try:
+            hier_info = load_report(hier_path, HIERARCHY_FIELDS)
+        except (OSError, ValueError) as err:
+            log.debug('Failed to read Merlin report %s: %s', hier_path, str(err))
+            return None
 
         # Build a map of auto to scope
         scope_map: Dict[str, List[str]] = {}
@@ -137,94 +355,176 @@ class MerlinAnalyzer(Analyzer):
         return scope_map
 
     @staticmethod
-    def analyze_merlin_log(job: Job, success_msg) -> Tuple[bool, float]:
-        """Analyze merlin.log to check if Merlin flow encounters any issues.
+    def parse_merlin_log(job: Job) -> Optional[MerlinLogSummary]:
+        """Scan merlin.log once and summarize the messages for all analysis modes.
 
         Args:
             job: The job to be analyzed.
-            success_msg: A string in the log file to indicate the flow was success.
 
         Returns:
-            Indicate if the flow was success and the total runtime if success.
+            The log summary, or None if merlin.log does not exist.
         """
         log = Analyzer.get_analyzer_logger()
 
         merlin_log_path = os.path.join(job.path, 'merlin.log')
         if not os.path.exists(merlin_log_path):
             log.debug('Cannot find merlin.log for analysis')
-            return (False, -1)
+            return None
 
-        success = False
-        eval_time = 0.0
-        with open(merlin_log_path, 'r') as log_file:
+        summary = MerlinLogSummary()
+        parsing_util = False
+        res_types: List[str] = []
+        with open(merlin_log_path, 'r', errors='replace') as log_file:
             for line in log_file:
-                if line.find(success_msg) != -1:
-                    success = True
-                elif line.find('Total time: ') != -1:
-                    try:
-                        eval_time += float(line[12:line.find('seconds')])
-                    except ValueError:
-                        log.error('Failed to convert runtime %s to float',
-                                  line[12:line.find('seconds')])
-                        return (False, -1)
-        return (success, eval_time)
+                if parsing_util:
+                    # Parse the resource utilization summary table
+                    if line.find('LUT') != -1:
+                        res_types = re.findall(r'(\w+)', line)
+                        if len(res_types) != 4:
+                            log.error('Failed to fetch 4 resource types from %s', line)
+                            summary.res_error = True
+                            parsing_util = False
+                        continue
+                    if line.find('Kernel') != -1:
+                        utils = re.findall(r'(\d+) \((\d+)%\)', line)
+                        if res_types and len(utils) == 4:
+                            for idx, res in enumerate(res_types):
+                                summary.res_util['total-{0}'.format(res)] = float(utils[idx][0])
+                                summary.res_util['util-{0}'.format(res)] = float(
+                                    utils[idx][1]) / 100.0
+                        parsing_util = False
+                        continue
+
+                is_critical = False
+                for match in MerlinAnalyzer.log_token_re.finditer(line):
+                    token = match.lastgroup
+                    if token in ['transform', 'hls', 'bitgen']:
+                        summary.markers.add(token)
+                    elif token == 'time':
+                        try:
+                            summary.eval_time += float(match.group('time'))
+                        except ValueError:
+                            log.error('Failed to convert runtime %s to float',
+                                      match.group('time'))
+                            summary.time_error = True
+                    elif token == 'critical':
+                        is_critical = True
+                    elif token == 'util':
+                        parsing_util = True
+                    elif token == 'freq':
+                        summary.freq = float(match.group('freq'))
+                    elif token == 'error':
+                        summary.has_error = True
+                if is_critical:
+                    summary.criticals.append(line.replace('\n', ''))
+        return summary
 
     @staticmethod
-    def analyze_merlin_transform(job: Job) -> Optional[MerlinResult]:
+    def analyze_merlin_transform(job: Job,
+                                 summary: Optional[MerlinLogSummary] = None,
+                                 normalize: bool = False) -> Optional[MerlinResult]:
         """Analyze the Merlin transformation result and fetch critical messages.
 
         Args:
             job: The job to be analyzed.
+            summary: The summary of merlin.log. It will be parsed if not provided.
+            normalize: Normalize the transformed code before computing the code hash.
 
         Returns:
             The analysis result.
         """
 
-        log = Analyzer.get_analyzer_logger()
-        merlin_log_path = os.path.join(job.path, 'merlin.log')
-        if not os.path.exists(merlin_log_path):
-            log.debug('Cannot find merlin.log for analysis')
-            return None
-
-        success, eval_time = MerlinAnalyzer.analyze_merlin_log(
-            job, 'Compilation finished successfully')
-        if not success:
+        if summary is None:
+            summary = MerlinAnalyzer.parse_merlin_log(job)
+        if summary is None or summary.time_error or 'transform' not in summary.markers:
             return None
 
         result = MerlinResult()
         result.valid = True
-        result.eval_time = eval_time
-        with open(merlin_log_path, 'r') as log_file:
-            for line in log_file:
-                if any(line.find(msg) != -1 for msg in MerlinAnalyzer.critical_msgs):
-                    result.criticals.append(line.replace('\n', ''))
+        result.eval_time = summary.eval_time
+        result.criticals = list(summary.criticals)
 
         # Result is invalid if it has critical messages
         if result.criticals:
-            # print("Has Critical Invalid Messages")
-            # print(result.criticals)
             result.valid = False
             return result
 
-        # Parse transformed kernel code and generate hash code
-        code_hash = ''
+        # Digest the transformed kernel code
+        result.code_hash = MerlinAnalyzer.digest_kernel_code(job, normalize)
+        return result
+
+    @staticmethod
+    def digest_kernel_code(job: Job, normalize: bool = False) -> Optional[str]:
+        """Compute the digest of the transformed kernel code to identify duplicated design
+        points.
+
+        The code is streamed into the digest line by line with all spaces and comment lines
+        removed, so the memory and the size of the digest do not depend on the kernel size.
+
+        Args:
+            job: The job to be analyzed.
+            normalize: Also remove all comments and the numbering of Merlin generated
+                       identifiers, which may differ between equivalent transformations.
+
+        Returns:
+            The hex digest, or None if no code is available.
+        """
+
         merlin_lc_path = os.path.join(job.path,
                                       '.merlin_prj/run/implement/export/lc/__merlinkernel*')
-        for src_file in glob.glob(merlin_lc_path):
-            with open(src_file, 'r') as filep:
+        digest = hashlib.blake2b(digest_size=32)
+        has_code = False
+        for src_file in sorted(glob.glob(merlin_lc_path)):
+            with open(src_file, 'r', errors='replace') as filep:
+                in_comment = False
                 for _line in filep:
-                    line = _line.replace(' ', '').replace('\n', '')
-                    if line.startswith('//'):
+                    if normalize:
+                        _line, in_comment = MerlinAnalyzer.strip_comment(_line, in_comment)
+                        _line = MerlinAnalyzer.merlin_id_re.sub(r'\1', _line)
+                    line = _line.replace(' ', '').replace('\t', '').replace('\n', '')
+                    if not line or line.startswith('//'):
                         # Skip comments
                         continue
-                    code_hash += line
-        if code_hash:
-            result.code_hash = code_hash
+                    digest.update(line.encode('utf-8', errors='replace') + b'\n')
+                    has_code = True
+        return digest.hexdigest() if has_code else None
 
-        return result
+    @staticmethod
+    def strip_comment(line: str, in_comment: bool) -> Tuple[str, bool]:
+        """Remove C/C++ comments from a line of code.
+
+        Args:
+            line: The line of code.
+            in_comment: Indicate if the line starts in a block comment.
+
+        Returns:
+            The line without comments and if the next line starts in a block comment.
+        """
+
+        code = ''
+        pos = 0
+        while pos < len(line):
+            if in_comment:
+                end = line.find('*/', pos)
+                if end == -1:
+                    return (code, True)
+                pos = end + 2
+                in_comment = False
+                continue
+            begin_block = line.find('/*', pos)
+            begin_line = line.find('//', pos)
+            if begin_line != -1 and (begin_block == -1 or begin_line < begin_block):
+                return (code + line[pos:begin_line], False)
+            if begin_block == -1:
+                return (code + line[pos:], False)
+            code += line[pos:begin_block]
+            pos = begin_block + 2
+            in_comment = True
+        return (code, in_comment)
 
     @staticmethod
-    def analyze_merlin_bitgen(job: Job) -> Optional[BitgenResult]:
+    def analyze_merlin_bitgen(
+            job: Job, summary: Optional[MerlinLogSummary] = None) -> Optional[BitgenResult]:
         """Analyze the Merlin bitgen result for QoR.
 
         Since we do not perform onboard execution, we cannot get the actual runtime
@@ -234,84 +534,55 @@ class MerlinAnalyzer(Analyzer):
 
         Args:
             job: The job to be analyzed.
+            summary: The summary of merlin.log. It will be parsed if not provided.
 
         Returns:
             The analysis result.
         """
 
         log = Analyzer.get_analyzer_logger()
-        success, eval_time = MerlinAnalyzer.analyze_merlin_log(
-            job, 'Generating hardware configuration file')
-        if not success:
+        if summary is None:
+            summary = MerlinAnalyzer.parse_merlin_log(job)
+        if summary is None or summary.time_error or 'bitgen' not in summary.markers:
             log.debug('Merlin P&R did not start. No analysis result')
             return None
+        if summary.res_error:
+            return None
 
         result = BitgenResult()
-        result.eval_time = eval_time
-
-        # Parse Merlin log for resource and frequency
-        parsing_util = False
-        with open(os.path.join(job.path, 'merlin.log'), 'r') as filep:
-            res_types: List[str] = []
-            for line in filep:
-                # Try to match the resource info
-                if line.find('Resource utilization summary:') != -1:
-                    parsing_util = True
-                    continue
-                elif parsing_util and line.find('LUT') != -1:
-                    res_types = re.findall(r'(\w+)', line)
-                    if len(res_types) != 4:
-                        log.error('Failed to fetch 4 resource types from %s', line)
-                        return None
-                    continue
-                elif parsing_util and line.find('Kernel') != -1:
-                    assert len(res_types) == 4
-                    utils = re.findall(r'(\d+) \((\d+)%\)', line)
-                    if utils and len(utils) == 4:
-                        try:
-                            for idx, res in enumerate(res_types):
-                                result.res_util['total-{0}'.format(res)] = float(utils[idx][0])
-                                result.res_util['util-{0}'.format(res)] = float(
-                                    utils[idx][1]) / 100.0
-                        except ValueError:
-                            log.error('Resource values %s are not a float number', utils[idx])
-                            result.res_util['total-{0}'.format(res)] = float('inf')
-                            result.res_util['util-{0}'.format(res)] = float('inf')
-                    parsing_util = False
-                    continue
-
-                # Try to match the frequency info
-                freq_line = re.search(r'Kernel Frequency: ([0-9|.]+) MHz', line)
-                if freq_line and freq_line.lastindex == 1:
-                    result.freq = float(freq_line.group(1))
-                    continue
-
-                # Try to match ERROR
-                if line.find('ERROR') != -1:
-                    result.ret_code = Result.RetCode.UNAVAILABLE
+        result.eval_time = summary.eval_time
+        result.res_util.update(summary.res_util)
+        result.freq = summary.freq
+        if summary.has_error:
+            result.ret_code = Result.RetCode.UNAVAILABLE
 
         result.valid = bool(result.freq != 0)
         return result
 
     @staticmethod
-    def analyze_merlin_hls(job: Job, config: Dict[str, Any]) -> Optional[HLSResult]:
+    def analyze_merlin_hls(job: Job,
+                           config: Dict[str, Any],
+                           summary: Optional[MerlinLogSummary] = None) -> Optional[HLSResult]:
         """Analyze the Merlin HLS result for QoR and performance bottleneck.
 
         Args:
             job: The job to be analyzed.
+            config: The DSE configure.
+            summary: The summary of merlin.log. It will be parsed if not provided.
 
         Returns:
             The analysis result.
         """
 
         log = Analyzer.get_analyzer_logger()
-        success, eval_time = MerlinAnalyzer.analyze_merlin_log(job, 'Estimation successfully.')
-        if not success:
+        if summary is None:
+            summary = MerlinAnalyzer.parse_merlin_log(job)
+        if summary is None or summary.time_error or 'hls' not in summary.markers:
             log.debug('Merlin estimation failure, no analysis result')
             return None
 
         result = HLSResult()
-        result.eval_time = eval_time
+        result.eval_time = summary.eval_time
 
         # Merlin HLS report analysis
         report_path = os.path.join(job.path, '.merlin_prj/run/implement/exec/hls/report_merlin/final_report/')
@@ -321,12 +592,11 @@ class MerlinAnalyzer(Analyzer):
             log.debug('Cannot find Merlin report files for analysis')
             return None
 
-        with open(info_path, 'r') as filep:
-            try:
-                hls_info = json.load(filep)
-            except ValueError as err:
-                log.debug('Failed to read Merlin report %s: %s', info_path, str(err))
-                return None
+        try:
+            hls_info = load_report(info_path, PERF_EST_FIELDS)
+        except (OSError, ValueError) as err:
+            log.debug('Failed to read Merlin report %s: %s', info_path, str(err))
+            return None
 
         # Fetch total cycle and resource util as performance QoR
         top_res_info = {}
@@ -381,117 +651,27 @@ class MerlinAnalyzer(Analyzer):
         utils = {k[5:]: u for k, u in result.res_util.items() if k.startswith('util-')}
         result.valid = all([utils[res] < max_utils[res] for res in max_utils])
 
-        # Hotspot analysis
-        result.ordered_paths = MerlinAnalyzer.analyze_hotspot(topo_path, info_path)
+        # Hotspot analysis with the loaded report
+        # The config may not be built from the full config setting
+        top_k = int(config.get('hotspot', {}).get('top-k', 64))
+        result.ordered_paths = MerlinAnalyzer.analyze_hotspot(topo_path, info_path, hls_info,
+                                                              top_k)
 
         return result
 
     @staticmethod
-    def find_all_hier_paths(cycles: Dict[str, Any], sub_funcs: Dict[str, Any],
-                            node: Dict[str, Any]) -> List[List[HierPathNode]]:
-        """Recursively traverse the kernel hierarchy and generate hierarchy paths.
-
-        For each path node we traversed, we retrieve its latency from Merlin HLS report
-        so that we can analyze the most critical path and node.
-
-        Args:
-            cycles: A dictionary to map scope (e.g., function, loop, etc) to its latency.
-            sub_funcs: A dictionary to map sub-function names to their hierarchy properties.
-            node: The node being visited.
-
-        Returns:
-            A list of paths sorted by their latencies.
-        """
-
-        def int_or_zero(string: str) -> int:
-            """Cast the input string to an integer or 0 otherwise."""
-            try:
-                return int(string)
-            except ValueError:
-                return 0
-
-        def float_or_zero(string: str) -> float:
-            """Cast the input string to a float point or 0 otherwise."""
-            try:
-                return float(string)
-            except ValueError:
-                return 0
-
-        if not node['childs']:
-            if node['type'] == 'callfunction' and node['name'] in sub_funcs:
-                # Traverse functions by its function call
-                paths = MerlinAnalyzer.find_all_hier_paths(cycles, sub_funcs,
-                                                           sub_funcs[node['name']])
-            else:
-                # Innermost component, terminate
-                paths = []
-        else:
-            # Sort child based on cycle count
-            sorted_child = sorted(
-                [child for child in node['childs']],
-                key=lambda c: int_or_zero(cycles[c['topo_id']]['CYCLE_TOT'])
-                if c['topo_id'] in cycles and 'CYCLE_TOT' in cycles[c['topo_id']] else 0,
-                reverse=True)
-            paths = []
-            for child in sorted_child:
-                paths += MerlinAnalyzer.find_all_hier_paths(cycles, sub_funcs, child)
-
-        if node['topo_id'] in cycles:
-            org_id = cycles[node['topo_id']]['org_identifier']
-            if 'flatten' in cycles[node['topo_id']] and    \
-               'flatten-id' in cycles[node['topo_id']] and \
-                cycles[node['topo_id']]['flatten'] == 'yes':
-                flatten_id = cycles[node['topo_id']]['flatten-id']
-                total = (float_or_zero(cycles[flatten_id]['CYCLE_TOT'])
-                         if 'CYCLE_TOT' in cycles[flatten_id] else 0)
-                unit = (float_or_zero(cycles[flatten_id]['CYCLE_UNIT'])
-                        if 'CYCLE_UNIT' in cycles[flatten_id] else 0)
-                comm = (float_or_zero(cycles[flatten_id]['CYCLE_BURST'])
-                        if 'CYCLE_BURST' in cycles[flatten_id] else 0)
-            else:
-                total = (float_or_zero(cycles[node['topo_id']]['CYCLE_TOT'])
-                         if 'CYCLE_TOT' in cycles[node['topo_id']] else 0)
-                unit = (float_or_zero(cycles[node['topo_id']]['CYCLE_UNIT'])
-                        if 'CYCLE_UNIT' in cycles[node['topo_id']] else 0)
-                comm = (float_or_zero(cycles[node['topo_id']]['CYCLE_BURST'])
-                        if 'CYCLE_BURST' in cycles[node['topo_id']] else 0)
-
-            is_compute_bound = None
-            if total == 0:
-                pass  # No data, set to an invalid value
-            elif comm == 0:
-                is_compute_bound = True
-            else:
-                # This is a heuristic since BURST cycle is from
-                # model but unit cycle is from vendor report.
-                # FIXME we should have a better way to judge it.
-                is_compute_bound = (comm / unit) < 0.8
-
-            # Fitler out the components that we should not spend time on
-            if (is_compute_bound is not None and not org_id.startswith('X')):
-                if not org_id.startswith('BuiltIn') or is_compute_bound is False:
-                    # Cover Merlin generated memcpy functions
-                    # since we will try memory coalescing when
-                    # bounded by bandwidth no matter what this
-                    # scope can be mapped to pragma or not.
-                    if paths:
-                        for path in paths:
-                            path.append(HierPathNode(org_id, total, is_compute_bound))
-                    else:
-                        paths = [[HierPathNode(org_id, total, is_compute_bound)]]
-        else:
-            log = Analyzer.get_analyzer_logger()
-            log.warning('Hierarchy node %s has no cycle info', node['topo_id'])
-
-        return paths
-
-    @staticmethod
-    def analyze_hotspot(hier_path: str, rpt_path: str) -> List[List[HierPathNode]]:
-        """Analyze all critical hierarchy paths in the kernel using Merlin report.
+    def analyze_hotspot(hier_path: str,
+                        rpt_path: str,
+                        cycles: Optional[Dict[str, Any]] = None,
+                        top_k: int = 0) -> List[List[HierPathNode]]:
+        """Analyze the most critical hierarchy paths in the kernel using Merlin report.
 
         Args:
             hier_path: The path to the hierarhcy JSON file generated by Merlin.
             rpt_path: The path to the perf_est JSON file generated by Merlin.
+            cycles: The loaded perf_est report. It will be loaded from rpt_path if not
+                    provided.
+            top_k: The maximum number of paths to be returned. 0 means all paths.
 
         Returns:
             A list of hierarchy paths ordered by their latencies.
@@ -500,33 +680,28 @@ class MerlinAnalyzer(Analyzer):
         log = Analyzer.get_analyzer_logger()
 
         # Check and load necessary reports
-        if not os.path.exists(hier_path) or not os.path.exists(rpt_path):
+        if not os.path.exists(hier_path) or (cycles is None and not os.path.exists(rpt_path)):
             log.debug('Cannot find Merlin report files for hotspot analysis: %s and %s', hier_path,
                       rpt_path)
             return []
 
-        with open(rpt_path, 'r') as filep:
+        if cycles is None:
             try:
-                cycles = json.load(filep)
-            except ValueError as err:
+                cycles = load_report(rpt_path, PERF_EST_FIELDS)
+            except (OSError, ValueError) as err:
                 log.error('Failed to read Merlin report %s: %s', rpt_path, str(err))
                 return []
 
-        with open(hier_path, 'r') as filep:
-            try:
-                hier = json.load(filep)
-            except ValueError as err:
-                log.error('Failed to read hierarchy info %s: %s', hier_path, str(err))
-                return []
-
-        # Find all critical paths
-        crit_paths: List[List[HierPathNode]] = []
-        for kernel in hier:
-            sub_funcs = {func['name']: func for func in kernel['sub_functions']}
-            for path in MerlinAnalyzer.find_all_hier_paths(cycles, sub_funcs, kernel):
-                crit_paths.append(path)
+        try:
+            hier = load_report(hier_path, TOPO_INFO_FIELDS)
+        except (OSError, ValueError) as err:
+            log.error('Failed to read hierarchy info %s: %s', hier_path, str(err))
+            return []
 
-        return crit_paths
+        # Find the critical paths
+        graph = HotspotGraph(cycles, hier)  # type: ignore
+        paths = graph.iter_all_paths()
+        return list(itertools.islice(paths, top_k) if top_k > 0 else paths)
 
     @staticmethod
     def analyze(job: Job, mode: str, config: Dict[str, Any]) -> Optional[Result]:
@@ -534,15 +709,24 @@ class MerlinAnalyzer(Analyzer):
 
         log = Analyzer.get_analyzer_logger()
 
+        if mode not in ['transform', 'hls', 'bitgen']:
+            log.error('Unrecognized analysis target %s', mode)
+            return None
+
+        # All analysis modes share the summary of one pass over merlin.log
+        summary = MerlinAnalyzer.parse_merlin_log(job)
+        if summary is None:
+            return None
+
         if mode == 'transform':
-            result: Optional[Result] = MerlinAnalyzer.analyze_merlin_transform(job)
+            # The config may not be built from the full config setting
+            normalize = bool(config.get('code-hash', {}).get('normalize', False))
+            result: Optional[Result] = MerlinAnalyzer.analyze_merlin_transform(
+                job, summary, normalize)
         elif mode == 'hls':
-            result = MerlinAnalyzer.analyze_merlin_hls(job, config)
-        elif mode == 'bitgen':
-            result = MerlinAnalyzer.analyze_merlin_bitgen(job)
+            result = MerlinAnalyzer.analyze_merlin_hls(job, config, summary)
         else:
-            log.error('Unrecognized analysis target %s', mode)
-            return None
+            result = MerlinAnalyzer.analyze_merlin_bitgen(job, summary)
 
         # QoR computation
         if result and result.perf != 0.0:
@@ -556,7 +740,8 @@ class MerlinAnalyzer(Analyzer):
 
         log = Analyzer.get_analyzer_logger()
         if mode == 'transform':
-            return ['merlin.log', '.merlin_prj/run/implement/export/lc']
+            # Keep the Merlin object file so that HLS can resume from it
+            return ['merlin.log', '*.mco', '.merlin_prj/run/implement/export/lc']
         if mode == 'hls':
             return [
                 'merlin.log',
@@ -570,3 +755,13 @@ class MerlinAnalyzer(Analyzer):
 
         log.error('Unrecognized analysis target %s', mode)
         return []
+
+    @staticmethod
+    def reject_patterns(mode: str) -> Optional[Tuple[str, List[str]]]:
+        #pylint:disable=missing-docstring
+
+        # The transform result is rejected if it has any critical messages, and the HLS
+        # result is not available if Merlin reports errors. Bitgen errors are still analyzed.
+        if mode in ['transform', 'hls']:
+            return ('merlin.log', MerlinAnalyzer.critical_msgs + ['ERROR'])
+        return None
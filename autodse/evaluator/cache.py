@@ -0,0 +1,266 @@
+"""
+The module of the persistent evaluation cache.
+"""
+import glob
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+from threading import Lock
+from typing import List, Optional, Set, Tuple
+
+from ..logger import get_eval_logger
+from ..result import Result
+
+# The file name of the pickled result in a cache entry
+RESULT_FILE = 'result.pkl'
+
+# The folder name of the artifact files in a cache entry
+ARTIFACT_DIR = 'files'
+
+
+def digest_tree(path: str, excludes: Optional[Set[str]] = None) -> str:
+    """Compute the digest of the file names and contents in a directory.
+
+    Args:
+        path: The directory.
+        excludes: The relative file paths to be skipped.
+
+    Returns:
+        The hex digest.
+    """
+
+    excludes = set([os.path.normpath(f) for f in excludes or []])
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path, followlinks=True):
+        dirs.sort()
+        for file_name in sorted(files):
+            file_path = os.path.join(root, file_name)
+            rel_path = os.path.relpath(file_path, path)
+            if os.path.normpath(rel_path) in excludes or not os.path.isfile(file_path):
+                continue
+            digest.update(rel_path.encode('utf-8', errors='replace') + b'\0')
+            with open(file_path, 'rb') as filep:
+                chunk = filep.read(1 << 20)
+                while chunk:
+                    digest.update(chunk)
+                    chunk = filep.read(1 << 20)
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def replace_file(src: str, dest: str) -> str:
+    """Copy a file by replacing the destination file instead of writing into it.
+
+    Files in a job directory may be hard links of the user source project, so writing into
+    them would change the source project as well.
+
+    Args:
+        src: The source file.
+        dest: The destination file.
+
+    Returns:
+        The destination file.
+    """
+
+    fd, temp_path = tempfile.mkstemp(prefix='.restore-', dir=os.path.dirname(dest))
+    os.close(fd)
+    try:
+        shutil.copy2(src, temp_path)
+        os.replace(temp_path, dest)
+    except OSError:
+        os.remove(temp_path)
+        raise
+    return dest
+
+
+class EvalCache():
+    """The on-disk content-addressable cache of evaluation results.
+
+    An entry is addressed by the digest of everything that determines the evaluation outcome:
+    the applied source tree, the evaluation command, the tool version, and the evaluation
+    mode. It contains the pickled result and the artifact files the analyzer wants, so the
+    cache can be shared by different DSE runs, projects, and users. Entries are evicted in
+    the least recently used order once the cache size exceeds the limit.
+
+    Attributes:
+        log: The logger.
+        path: The root directory of the cache.
+        max_size: The maximum cache size in MB.
+        tool_version: The version of the evaluation tool.
+        lock: The lock of the cache size.
+        size: The estimated cache size in bytes.
+    """
+
+    def __init__(self, path: str, max_size: float = 10240, tool_version: str = ''):
+        self.log = get_eval_logger('Cache')
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_size = max_size
+        self.tool_version = tool_version
+        self.lock = Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self.size = sum([size for _, _, size in self.scan()])
+
+    @staticmethod
+    def get_dir_size(path: str) -> int:
+        """Compute the total file size in a directory.
+
+        Args:
+            path: The directory.
+
+        Returns:
+            The size in bytes.
+        """
+
+        size = 0
+        for root, _, files in os.walk(path):
+            for file_name in files:
+                try:
+                    size += os.lstat(os.path.join(root, file_name)).st_size
+                except OSError:
+                    pass
+        return size
+
+    def scan(self) -> List[Tuple[str, float, int]]:
+        """List all cache entries.
+
+        Returns:
+            The path, the last access time, and the size in bytes of each entry.
+        """
+
+        entries = []
+        for entry_path in glob.glob(os.path.join(self.path, '??', '*')):
+            try:
+                atime = os.stat(entry_path).st_mtime
+            except OSError:  # Evicted by others
+                continue
+            entries.append((entry_path, atime, self.get_dir_size(entry_path)))
+        return entries
+
+    def get_digest(self, tree_digest: str, cmd: str, mode: str) -> str:
+        """Compute the cache digest of an evaluation.
+
+        Args:
+            tree_digest: The digest of the applied source tree.
+            cmd: The evaluation command.
+            mode: The evaluation mode.
+
+        Returns:
+            The hex digest.
+        """
+
+        digest = hashlib.sha256()
+        for field in [tree_digest, cmd, self.tool_version, mode]:
+            digest.update(field.encode('utf-8', errors='replace') + b'\0')
+        return digest.hexdigest()
+
+    def get_entry_path(self, digest: str) -> str:
+        """Get the directory of a cache entry.
+
+        Args:
+            digest: The digest of the entry.
+
+        Returns:
+            The path of the entry.
+        """
+
+        return os.path.join(self.path, digest[:2], digest)
+
+    def lookup(self, digest: str, job_path: str) -> Optional[Result]:
+        """Look up the result of an evaluation and restore its artifact files.
+
+        Args:
+            digest: The digest of the evaluation.
+            job_path: The job directory to restore the artifact files.
+
+        Returns:
+            The cached result, or None if the cache misses.
+        """
+
+        entry_path = self.get_entry_path(digest)
+        try:
+            with open(os.path.join(entry_path, RESULT_FILE), 'rb') as filep:
+                result = pickle.load(filep)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as err:
+            if os.path.exists(entry_path):
+                self.log.warning('Failed to load cache entry %s: %s', digest, str(err))
+            return None
+
+        artifact_path = os.path.join(entry_path, ARTIFACT_DIR)
+        try:
+            if os.path.exists(artifact_path):
+                shutil.copytree(artifact_path,
+                                job_path,
+                                copy_function=replace_file,
+                                dirs_exist_ok=True)
+            # Mark the entry as recently used
+            os.utime(entry_path)
+        except OSError as err:  # Evicted while restoring
+            self.log.warning('Failed to restore cache entry %s: %s', digest, str(err))
+            return None
+        return result
+
+    def store(self, digest: str, result: Result, job_path: str, files: List[str]) -> bool:
+        """Store the result and the artifact files of an evaluation.
+
+        Args:
+            digest: The digest of the evaluation.
+            result: The result.
+            job_path: The job directory that has the artifact files.
+            files: A list of artifact file names (support wildcards) in the job directory.
+
+        Returns:
+            Indicate if the entry was stored or not.
+        """
+
+        entry_path = self.get_entry_path(digest)
+        if os.path.exists(entry_path):
+            return False
+
+        # Populate the entry in a temporary directory and rename it so that others never
+        # see a partial entry
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        temp_path = tempfile.mkdtemp(prefix='.tmp_', dir=os.path.dirname(entry_path))
+        try:
+            for file_expr in files:
+                for file_path in glob.glob(os.path.join(job_path, file_expr)):
+                    dest_path = os.path.join(temp_path, ARTIFACT_DIR,
+                                             os.path.relpath(file_path, job_path))
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                    if os.path.isdir(file_path):
+                        shutil.copytree(file_path, dest_path, symlinks=True)
+                    else:
+                        shutil.copy2(file_path, dest_path)
+            with open(os.path.join(temp_path, RESULT_FILE), 'wb') as filep:
+                pickle.dump(result, filep)
+            os.rename(temp_path, entry_path)
+        except OSError as err:  # Stored by others or out of space
+            shutil.rmtree(temp_path, ignore_errors=True)
+            if not os.path.exists(entry_path):
+                self.log.warning('Failed to store cache entry %s: %s', digest, str(err))
+            return False
+
+        with self.lock:
+            self.size += self.get_dir_size(entry_path)
+            if self.size > self.max_size * 1024 * 1024:
+                self.evict()
+        return True
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits the size limit.
+        The caller must hold the lock.
+        """
+
+        entries = sorted(self.scan(), key=lambda e: e[1])
+        self.size = sum([size for _, _, size in entries])
+        limit = self.max_size * 1024 * 1024
+        num_evicted = 0
+        for entry_path, _, size in entries:
+            if self.size <= limit:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            self.size -= size
+            num_evicted += 1
+        self.log.debug('Evicted %d cache entries', num_evicted)
@@ -1,22 +1,31 @@
 """
 The main module of evaluator.
 """
+import glob
+import hashlib
+import io
+import multiprocessing
 import os
 import re
 import shutil
 import sys
 import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from copy import deepcopy
 from enum import Enum
-from typing import Any, Dict, List, Optional, Set, Type, Tuple
+from threading import Lock
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Type, Tuple
 
 from ..database import Database
 from ..logger import get_eval_logger
 from ..parameter import DesignPoint, gen_key_from_design_point
 from ..result import BitgenResult, HLSResult, Job, MerlinResult, Result
-from ..util import copy_dir
 from .analyzer import Analyzer, MerlinAnalyzer
+from .cache import EvalCache, digest_tree
 from .scheduler import Scheduler
+from .timeout import AdaptiveTimeout, P2Quantile
+from .workspace import CloneMode, clone_tree
 
 
 class BackupMode(Enum):
@@ -25,6 +34,16 @@ class BackupMode(Enum):
     BACKUP_ALL = 2
 
 
+class SourceTemplate(NamedTuple):
+    """The parsed source file with design parameters.
+
+    The file content is literals[0] + slot[0] + literals[1] + ... + literals[-1], where each
+    slot is a pair of the original auto keyword text and its design parameter ID.
+    """
+    literals: List[str]
+    slots: List[Tuple[str, str]]
+
+
 class Evaluator():
     """Base evaluator class.
 
@@ -38,10 +57,20 @@ class Evaluator():
         backup_mode: Backup mode. It is either NO_BACKUP, BACKUP_ERROR, or BACKUP_ALL.
         config: Configuration.
         analyzer: Analyzer.
+        analysis_pool: The processes to analyze finished jobs. None means analyzing jobs in
+                       the calling thread.
         timeouts: Timeout dictionary for each evaluation level (in minutes).
+        adaptive_timeout: The adaptive timeout policy. None means using the fixed timeouts.
+        eval_time_sketches: The sketch of successful evaluation time of each evaluation level.
+        sketch_lock: The lock of evaluation time sketches.
         commands: Command dictionary for each evaluation level.
+        clone_mode: The way to populate job workspaces from the user source project.
+        eval_cache: The persistent evaluation cache. None means disabled.
+        base_digest: The digest of the user source files without design parameters.
         src_files: The source files that contains design parameters.
         auto_map: A dictionary to map source file name and line to design parameters.
+        templates: The parsed template of each source file with design parameters.
+        template_params: All design parameter IDs in the templates.
     """
 
     def __init__(self,
@@ -77,8 +106,15 @@ class Evaluator():
         self.backup_mode = backup_mode
         self.config = dse_config
         self.analyzer = analyzer_cls
+        self.analysis_pool: Optional[ProcessPoolExecutor] = None
         self.timeouts: Dict[str, int] = {'transform': 0, 'hls': 0, 'bitgen': 0}
+        self.adaptive_timeout: Optional[AdaptiveTimeout] = None
+        self.eval_time_sketches: Dict[str, P2Quantile] = {}
+        self.sketch_lock = Lock()
         self.commands: Dict[str, str] = {}
+        self.clone_mode = CloneMode.HARDLINK
+        self.eval_cache: Optional[EvalCache] = None
+        self.base_digest = ''
 
         if os.path.exists(self.work_path):
             shutil.rmtree(self.work_path, ignore_errors=True)
@@ -92,24 +128,40 @@ class Evaluator():
         # in the design point, then the Merlin compiler will error out so we could let user know.
         self.src_files: List[str] = []
         self.auto_map: Dict[str, List[str]] = {}
+        self.templates: Dict[str, SourceTemplate] = {}
+        self.template_params: Set[str] = set()
         for root, _, files in os.walk(src_path, followlinks=True):
             for file_name in files:
                 file_abs_path = os.path.join(root, file_name)
-                has_auto = False
                 # "errors" is an optional string that specifies how encoding and decoding errors
                 # are to be handled. 'replace' causes a replacement marker (such as '?') to be
                 # inserted where there is malformed data.
                 with open(file_abs_path, 'r', errors='replace') as filep:
-                    for idx, line in enumerate(filep.readlines()):
-                        autos = re.findall(r'auto{(.*?)}', line, re.IGNORECASE)
-                        if autos:
-                            has_auto = True
-                            # Note
-                            # 1) The line number starts from one instead of zero.
-                            # 2) The scope for pragmas other than loop-pragmas may not be accurate.
-                            self.auto_map['{0}:{1}'.format(file_name, idx + 1)] = autos
-                if has_auto:
-                    self.src_files.append(os.path.relpath(file_abs_path, src_path))
+                    content = filep.read()
+                # Only split on newlines like reading lines from the file does, because
+                # str.splitlines also breaks on form feeds and other separators
+                for idx, line in enumerate(io.StringIO(content).readlines()):
+                    autos = re.findall(r'auto{(.*?)}', line, re.IGNORECASE)
+                    if autos:
+                        # Note
+                        # 1) The line number starts from one instead of zero.
+                        # 2) The scope for pragmas other than loop-pragmas may not be accurate.
+                        self.auto_map['{0}:{1}'.format(file_name, idx + 1)] = autos
+
+                # Parse the file into a template so that applying a design point does not
+                # need to scan the file again
+                template = SourceTemplate([], [])
+                last = 0
+                for match in re.finditer(r'auto{(.*?)}', content, re.IGNORECASE):
+                    template.literals.append(content[last:match.start()])
+                    template.slots.append((match.group(0), match.group(1)))
+                    last = match.end()
+                template.literals.append(content[last:])
+                if template.slots:
+                    rel_path = os.path.relpath(file_abs_path, src_path)
+                    self.src_files.append(rel_path)
+                    self.templates[rel_path] = template
+                    self.template_params.update([ds_id for _, ds_id in template.slots])
 
         if not self.src_files:
             print('Error: Cannot find any kernel files with auto pragma.')
@@ -129,6 +181,78 @@ class Evaluator():
         for mode, timeout in config.items():
             self.timeouts[mode] = timeout
 
+    def set_adaptive_timeout(self, policy: Optional[AdaptiveTimeout]) -> None:
+        """Set the adaptive timeout policy. The timeouts set by set_timeout become upper bounds.
+
+        Args:
+            policy: The adaptive timeout policy. None means using the fixed timeouts.
+        """
+
+        self.adaptive_timeout = policy
+
+    def get_eval_time_sketch(self, mode: str) -> Optional[P2Quantile]:
+        """Get the sketch of successful evaluation time of an evaluation mode. The caller must
+        hold the sketch lock.
+
+        Args:
+            mode: The evaluation mode.
+
+        Returns:
+            The sketch, or None if the adaptive timeout is disabled.
+        """
+
+        if self.adaptive_timeout is None:
+            return None
+        if mode not in self.eval_time_sketches:
+            # The sketch is kept in the database so that it can be reused by later runs
+            sketch = self.db.query('meta-eval-time-{0}'.format(mode))
+            if not isinstance(sketch, P2Quantile):
+                sketch = self.adaptive_timeout.create_sketch()
+            self.eval_time_sketches[mode] = sketch
+        return self.eval_time_sketches[mode]
+
+    def get_timeout(self, mode: str) -> float:
+        """Get the timeout of new jobs of an evaluation mode.
+
+        Args:
+            mode: The evaluation mode.
+
+        Returns:
+            The timeout in minutes.
+        """
+
+        if self.adaptive_timeout is None:
+            return self.timeouts[mode]
+        with self.sketch_lock:
+            return self.adaptive_timeout.get_timeout(self.timeouts[mode],
+                                                     self.get_eval_time_sketch(mode))
+
+    def update_eval_time(self, mode: str, job_n_results: List[Tuple[Job, Result]]) -> None:
+        """Learn the evaluation time from successful jobs.
+
+        Args:
+            mode: The evaluation mode.
+            job_n_results: The evaluated jobs and their results.
+        """
+
+        if self.adaptive_timeout is None:
+            return
+
+        with self.sketch_lock:
+            sketch = self.get_eval_time_sketch(mode)
+            assert sketch is not None
+            updated = False
+            for job, result in job_n_results:
+                if result.ret_code != Result.RetCode.PASS:
+                    continue
+                # Prefer the wall time of the job since it is what the timeout limits
+                eval_time = job.usage.wall_time if job.usage is not None else result.eval_time
+                if eval_time > 0:
+                    sketch.add(eval_time)
+                    updated = True
+            if updated:
+                self.db.commit('meta-eval-time-{0}'.format(mode), sketch)
+
     def set_command(self, config: Dict[str, str]) -> None:
         """Set command to a specific evaluation mode.
 
@@ -139,15 +263,100 @@ class Evaluator():
         for mode, command in config.items():
             self.commands[mode] = command
 
+    def set_clone_mode(self, mode: CloneMode) -> None:
+        """Set the way to populate job workspaces.
+
+        Args:
+            mode: The clone mode. Files with design parameters are always copied.
+        """
+
+        self.clone_mode = mode
+
+    def set_eval_cache(self, cache: Optional[EvalCache]) -> None:
+        """Set the persistent evaluation cache.
+
+        Args:
+            cache: The evaluation cache. None means disabled.
+        """
+
+        self.eval_cache = cache
+        if cache is not None:
+            # Files without design parameters are the same for all jobs, so they are only
+            # digested once
+            self.base_digest = digest_tree(self.src_path, set(self.src_files))
+
+    def set_analysis_workers(self, num: int) -> None:
+        """Set the number of processes to analyze finished jobs.
+
+        Parsing the reports of finished jobs is CPU bound, so the explorer threads serialize
+        on it when analyzing jobs in place. The analysis processes only send the results back.
+
+        Args:
+            num: The number of processes. 0 means analyzing jobs in the calling thread.
+        """
+
+        if self.analysis_pool is not None:
+            self.analysis_pool.shutdown(wait=False)
+            self.analysis_pool = None
+        if num > 0:
+            # Spawn the processes since forking a multi-threaded process is unsafe
+            self.analysis_pool = ProcessPoolExecutor(
+                max_workers=num, mp_context=multiprocessing.get_context('spawn'))
+
+    def analyze_jobs(self, jobs: List[Job], mode: str) -> Dict[str, Optional[Result]]:
+        """Analyze the finished jobs of an evaluation mode.
+
+        Args:
+            jobs: The finished jobs.
+            mode: The evaluation mode.
+
+        Returns:
+            The analysis result of each job key, or None if the analysis was failed.
+        """
+
+        pool = self.analysis_pool
+        if pool is not None and jobs:
+            try:
+                futures = {
+                    job.key: pool.submit(self.analyzer.analyze, job, mode, self.config)
+                    for job in jobs
+                }
+                return {key: future.result() for key, future in futures.items()}
+            except BrokenProcessPool as err:
+                self.log.warning('Analysis processes are broken, analyze jobs in place: %s',
+                                 str(err))
+                self.analysis_pool = None
+        return {job.key: self.analyzer.analyze(job, mode, self.config) for job in jobs}
+
+    def get_cache_digest(self, job: Job, mode: str) -> Optional[str]:
+        """Compute the evaluation cache digest of a job.
+
+        Args:
+            job: The applied job.
+            mode: The evaluation mode.
+
+        Returns:
+            The digest, or None if the job cannot be cached.
+        """
+
+        if self.eval_cache is None or job.src_hash is None or mode not in self.commands:
+            return None
+        return self.eval_cache.get_digest(self.base_digest + job.src_hash, self.commands[mode],
+                                          mode)
+
     def create_job(self) -> Optional[Job]:
         """Create a new folder and copy source code for a design point to be evaluated.
 
+        A job folder only stages the source code. Files without design parameters are shared
+        with the user source project according to the clone mode, and the files with design
+        parameters are copied since they will be rewritten.
+
         Returns:
             A created Job object.
         """
 
         path = tempfile.mkdtemp(prefix=self.temp_dir_prefix, dir='{0}/'.format(self.work_path))
-        if not copy_dir(self.src_path, path):
+        if not clone_tree(self.src_path, path, self.clone_mode, self.src_files):
             return None
         #self.log.debug('Created a new job at %s', path)
         return Job(path)
@@ -169,38 +378,41 @@ class Evaluator():
             self.log.error('Job with key %s at %s cannot be applied again', job.key, job.path)
             return False
 
-        job_path = job.path
-        applied: Set[str] = set()
-        for file_name in self.src_files:
-            with open(os.path.join(job_path, file_name), 'r', errors='replace') as src_file, \
-                 open('{0}/applier_temp.txt'.format(job_path), 'w', errors='replace') as dest_file:
-                for line in src_file:
-                    # Assume one pragma per line even though a loop here.
-                    for auto, ds_id in re.findall(r'(auto{(.*?)})', line, re.IGNORECASE):
-                        if ds_id not in point:
-                            self.log.debug('Parameter %s not found in design point', ds_id)
-                        else:
-                            # Replace "auto{?}" with a specific value
-                            # Only consider Xilinx flow. "off" means not to write out that pragma
-                            # if str(point[ds_id]) != "off":                                 
-                            line = line.replace(auto, str(point[ds_id]))
-                            # else:
-                            #    line = ""
-                            applied.add(ds_id)
-                    dest_file.write(line)
-            os.replace('{0}/applier_temp.txt'.format(job_path),
-                       '{0}/{1}'.format(job_path, file_name))
+        for ds_id in self.template_params:
+            if ds_id not in point:
+                self.log.debug('Parameter %s not found in design point', ds_id)
+
+        # Other files are the same for all jobs so the applied source files identify the code
+        src_hash = hashlib.sha256()
+        for file_name, template in self.templates.items():
+            # Replace "auto{?}" with a specific value. Parameters that are not in the design
+            # point are left as they are.
+            parts = [template.literals[0]]
+            for (auto, ds_id), literal in zip(template.slots, template.literals[1:]):
+                parts.append(str(point[ds_id]) if ds_id in point else auto)
+                parts.append(literal)
+            content = ''.join(parts)
+            src_hash.update(file_name.encode('utf-8', errors='replace') + b'\0')
+            src_hash.update(content.encode('utf-8', errors='replace') + b'\0')
+
+            # Write to a new file and replace the original one, so that the shared source file
+            # (if any) is not modified
+            temp_path = os.path.join(job.path, 'applier_temp.txt')
+            with open(temp_path, 'w', errors='replace') as dest_file:
+                dest_file.write(content)
+            os.replace(temp_path, os.path.join(job.path, file_name))
 
         # Check if all design parameters were applied
         error = 0
         for ds_id in point.keys():
-            if ds_id not in applied:
+            if ds_id not in self.template_params:
                 self.log.error('Cannot find the corresponding auto{%s} in source files', ds_id)
                 error += 1
 
         # Assign the key to the job
         job.point = point
         job.key = gen_key_from_design_point(point)
+        job.src_hash = src_hash.hexdigest()
         job.status = Job.Status.APPLIED
         return error == 0
 
@@ -224,26 +436,73 @@ class Evaluator():
         result_prefix = 'lv{}'.format(eval_lv)
         if eval_lv == 1:
             submitter = self.submit_lv1
+            mode = 'transform'
         elif eval_lv == 2:
             submitter = self.submit_lv2
+            mode = 'hls'
         elif eval_lv == 3:
             submitter = self.submit_lv3
+            mode = 'bitgen'
         else:
             self.log.error('Incorrect evaluation %d. Expect 1-3', eval_lv)
             raise RuntimeError()
 
+        # Look up the evaluation cache
+        digests: Dict[str, str] = {}
+        cached: Dict[str, Result] = {}
+        for job in jobs:
+            digest = self.get_cache_digest(job, mode)
+            if digest is None:
+                continue
+            assert self.eval_cache is not None
+            digests[job.key] = digest
+            result = self.eval_cache.lookup(digest, job.path)
+            if result is not None:
+                self.log.debug('%s:%s hits the evaluation cache', result_prefix, job.key)
+                result.usage = None
+                cached[job.key] = result
+        if cached:
+            self.log.info('%d jobs hit the evaluation cache', len(cached))
+
         # Submit jobs
-        job_n_results = submitter(jobs)
+        for job in jobs:
+            job.usage = None
+        pending = [job for job in jobs if job.key not in cached]
+        new_results = submitter(pending) if pending else []
+        for job, result in new_results:
+            result.usage = job.usage
+        self.update_eval_time(mode, new_results)
+
+        # Store new results to the evaluation cache. Results without any artifact were borrowed
+        # from other jobs so they are skipped.
+        if self.eval_cache is not None:
+            keep_files = self.analyzer.desire(mode)
+            for job, result in new_results:
+                if job.key not in digests or result.ret_code not in [
+                        Result.RetCode.PASS, Result.RetCode.EARLY_REJECT
+                ]:
+                    continue
+                if any([glob.glob(os.path.join(job.path, f)) for f in keep_files]):
+                    self.eval_cache.store(digests[job.key], result, job.path, keep_files)
+
+        new_result_map = {job.key: result for job, result in new_results}
+        job_n_results = [(job, cached[job.key] if job.key in cached else new_result_map[job.key])
+                         for job in jobs]
         for job, result in job_n_results:
             result.point = job.point
 
-        # Backup jobs if needed
-        if self.backup_mode == BackupMode.NO_BACKUP:
-            for job in jobs:
-                shutil.rmtree(job.path)
+        # Backup jobs if needed. The folders of successful jobs to be reused are always kept,
+        # and bitgen jobs are always kept since they are very time-consuming.
+        backup_mode = BackupMode.BACKUP_ALL if eval_lv == 3 else self.backup_mode
+        if backup_mode == BackupMode.NO_BACKUP:
+            for job, result in job_n_results:
+                if not (job.reuse and result.ret_code == Result.RetCode.PASS):
+                    shutil.rmtree(job.path)
         else:
-            if self.backup_mode == BackupMode.BACKUP_ERROR:
+            if backup_mode == BackupMode.BACKUP_ERROR:
                 for job, result in job_n_results:
+                    if job.reuse and result.ret_code == Result.RetCode.PASS:
+                        continue
                     if result.ret_code in [Result.RetCode.PASS, Result.RetCode.EARLY_REJECT]:
                         shutil.rmtree(job.path)
 
@@ -300,7 +559,16 @@ class Evaluator():
 
 
 class MerlinEvaluator(Evaluator):
-    """Evaluate Merlin compiler projects"""
+    """Evaluate Merlin compiler projects
+
+    Attributes:
+        scope_map: The map from design parameter ID to its scope in the source code.
+        inflight: The owner job key and the future HLS result of each code hash that is being
+                  evaluated. An entry is kept until the result of its owner is committed.
+        inflight_lock: The lock of the hash maps and the in-flight results.
+        src_inflight: The owner job key and the future transform result of each source hash
+                      that is being evaluated, which is kept like inflight.
+    """
 
     def __init__(self, src_path: str, work_path: str, db: Database, scheduler: Scheduler,
                  analyzer_cls: Type[MerlinAnalyzer], backup_mode: BackupMode,
@@ -309,15 +577,29 @@ class MerlinEvaluator(Evaluator):
                                               backup_mode, dse_config, 'merlin')
 
         self.scope_map: Optional[Dict[str, List[str]]] = None
+        self.inflight: Dict[str, Tuple[str, Future]] = {}
+        self.inflight_lock = Lock()
+        self.src_inflight: Dict[str, Tuple[str, Future]] = {}
 
-    def build_scope_map(self) -> bool:
+    def build_scope_map(self, point: Optional[DesignPoint] = None) -> bool:
         """Build the scope map that maps auto positions to the scope in source code.
 
+        The scope map is built by running HLS on the source project. When a design point
+        (usually the default point) is given, the HLS run evaluates the point as well and its
+        level 1 and level 2 results are committed so that explorers do not evaluate it again.
+        If the point cannot be applied or its HLS run fails, the scope map is built from the
+        source project without any design point instead. The scope map is cached in the
+        database by the digest of the source project.
+
+        Args:
+            point: The design point to be applied for the HLS run.
+
         Returns:
             Indicate if the build was success or not.
         """
 
-        scope_map = self.db.query('scope-map')
+        scope_key = 'scope-map:{0}'.format(digest_tree(self.src_path))
+        scope_map = self.db.query(scope_key)
         if scope_map is not None:
             self.log.info('Load the scope map from database')
             self.scope_map = scope_map
@@ -331,21 +613,109 @@ class MerlinEvaluator(Evaluator):
             self.log.error('Command for HLS is not properly set up.')
             return False
 
+        if point is not None:
+            if self.run_scope_job(scope_key, point):
+                return True
+            self.log.warning('Failed to build the scope map with the design point, '
+                             'retry without it')
+        if self.run_scope_job(scope_key):
+            return True
+
+        self.log.error('Failed to build the scope map')
+        return False
+
+    def run_scope_job(self, scope_key: str, point: Optional[DesignPoint] = None) -> bool:
+        """Run HLS on the source project and build the scope map from its report.
+
+        Args:
+            scope_key: The database key of the scope map.
+            point: The design point to be applied for the HLS run.
+
+        Returns:
+            Indicate if the build was success or not.
+        """
+
         job = self.create_job()
         assert job is not None
-        sche_rets = self.scheduler.run([job], self.analyzer.desire('hls'), self.commands['hls'],
-                                       self.timeouts['hls'])
+        if point is not None and not self.apply_design_point(job, point):
+            shutil.rmtree(job.path, ignore_errors=True)
+            return False
+
+        # Keep the files for the transform analysis as well
+        keep_files = self.analyzer.desire('hls')
+        keep_files += [f for f in self.analyzer.desire('transform') if f not in keep_files]
+        job.usage = None
+        sche_rets = self.scheduler.run([job], keep_files, self.commands['hls'],
+                                       self.get_timeout('hls'))
         assert len(sche_rets) == 1
         _, ret = sche_rets[0]
+        scope_map = None
         if ret == Result.RetCode.PASS:
             scope_map = self.analyzer.analyze_scope(job, self.auto_map)  # type: ignore
             if scope_map is not None:
                 self.scope_map = scope_map
-                self.db.commit('scope-map', scope_map)
-                return True
+                self.db.commit(scope_key, scope_map)
+                if point is not None:
+                    self.commit_scope_job(job)
 
-        self.log.error('Failed to build the scope map')
-        return False
+        # Keep the failed run for debugging unless backups are disabled
+        if (self.backup_mode == BackupMode.NO_BACKUP
+                or (scope_map is not None and self.backup_mode != BackupMode.BACKUP_ALL)):
+            shutil.rmtree(job.path, ignore_errors=True)
+        return scope_map is not None
+
+    def commit_scope_job(self, job: Job) -> None:
+        """Analyze the HLS run of the scope map as the evaluation of its design point.
+
+        Args:
+            job: The finished job with a design point applied.
+        """
+
+        lv1_result = self.analyzer.analyze(job, 'transform', self.config)
+        if lv1_result is None:
+            self.log.warning('Failed to analyze the transform result of %s', job.key)
+            return
+        assert isinstance(lv1_result, MerlinResult)
+        lv1_result.src_hash = job.src_hash
+        job_n_results: List[Tuple[str, Result]] = [('lv1:{0}'.format(job.key), lv1_result)]
+        if not lv1_result.valid:
+            lv1_result.ret_code = Result.RetCode.EARLY_REJECT
+        else:
+            lv2_result = self.analyzer.analyze(job, 'hls', self.config)
+            if lv2_result is None:
+                self.log.warning('Failed to analyze the HLS result of %s', job.key)
+                return
+            lv2_result.usage = job.usage
+            job_n_results.append(('lv2:{0}'.format(job.key), lv2_result))
+            self.update_eval_time('hls', [(job, lv2_result)])
+
+        for _, result in job_n_results:
+            result.point = job.point
+            if self.backup_mode == BackupMode.BACKUP_ALL:
+                result.path = job.path
+
+        # Register the hashes so that later duplications reuse the results
+        with self.inflight_lock:
+            if job.src_hash:
+                self.db.add_src_hash(job.src_hash, job.key)
+            if lv1_result.valid and lv1_result.code_hash:
+                self.db.add_code_hash(lv1_result.code_hash, job.key)
+        self.db.batch_commit(job_n_results)
+        self.log.info('Committed the results of %s from the scope map build', job.key)
+
+    def submit(self, jobs: List[Job], eval_lv: int) -> List[Tuple[str, Result]]:
+        #pylint:disable=missing-docstring
+
+        try:
+            return super(MerlinEvaluator, self).submit(jobs, eval_lv)
+        finally:
+            # Unregister the runs of these jobs only after their results are committed, so the
+            # duplications arriving in between borrow the results instead of running again
+            inflight = {1: self.src_inflight, 2: self.inflight}.get(eval_lv, {})
+            job_keys = set([job.key for job in jobs])
+            with self.inflight_lock:
+                for key in [h for h, (owner, _) in inflight.items() if owner in job_keys]:
+                    del inflight[key]
 
     def dup_hls_result(self, result: HLSResult) -> HLSResult:
         """Clone the given HLS result and mark as duplicated.
@@ -361,6 +731,23 @@ class MerlinEvaluator(Evaluator):
         dup_result.eval_time = 0
         return dup_result
 
+    def dup_merlin_result(self, result: Result) -> Result:
+        """Clone the given transform result of a point with the same applied source code.
+
+        The clone keeps the return code and the code hash so that the level 2 evaluation
+        finds the duplication by code hash.
+
+        Args:
+            result: The transform result to be duplicated
+
+        Returns:
+            The duplicated result.
+        """
+        dup_result = deepcopy(result)
+        dup_result.eval_time = 0
+        dup_result.usage = None
+        return dup_result
+
     def submit_lv1(self, jobs: List[Job]) -> List[Tuple[Job, Result]]:
         #pylint:disable=missing-docstring
 
@@ -372,23 +759,68 @@ class MerlinEvaluator(Evaluator):
             self.log.error('Command for transform is not properly set up.')
             return [(job, Result('UNAVAILABLE')) for job in jobs]
 
-        # Run Merlin transformations and make sure it works as expected
-        sche_rets = self.scheduler.run(jobs, self.analyzer.desire('transform'),
-                                       self.commands['transform'], self.timeouts['transform'])
-        for job_key, ret_code in sche_rets:
-            if ret_code == Result.RetCode.PASS:
-                result = self.analyzer.analyze(job_map[job_key], 'transform', self.config)
-                if not result:
-                    self.log.warning('Failed to analyze result of %s after Merlin transformation',
-                                     job_map[job_key].key)
-                    results[job_key].ret_code = Result.RetCode.ANALYZE_ERROR
-                    continue
-                if not result.valid:
-                    # Merlin failed to perform certain transformations
-                    result.ret_code = Result.RetCode.EARLY_REJECT
-                results[job_key] = result
-            else:
-                results[job_key].ret_code = ret_code
+        # Check duplications using the applied source hash
+        pending: List[Job] = []
+        owned: Dict[str, Future] = {}
+        waiting: List[Tuple[Job, Future]] = []
+        for job in jobs:
+            if job.src_hash:
+                with self.inflight_lock:
+                    dup_key = self.db.add_src_hash(job.src_hash, job.key)
+                    inflight = self.src_inflight.get(job.src_hash)
+                    if dup_key is None:
+                        owned[job.key] = Future()
+                        self.src_inflight[job.src_hash] = (job.key, owned[job.key])
+                if dup_key is not None and dup_key != job.key:
+                    self.log.debug('%s has the same source code as %s', job.key, dup_key)
+                    dup_result = self.db.query('lv1:{0}'.format(dup_key))
+                    if dup_result:
+                        results[job.key] = self.dup_merlin_result(dup_result)
+                        continue
+                    if inflight is not None:
+                        waiting.append((job, inflight[1]))
+                        continue
+            pending.append(job)
+
+        try:
+            # Run Merlin transformations and make sure it works as expected
+            sche_rets = self.scheduler.run(pending, self.analyzer.desire('transform'),
+                                           self.commands['transform'],
+                                           self.get_timeout('transform'),
+                                           self.analyzer.reject_patterns('transform'))
+            analyzed = self.analyze_jobs(
+                [job_map[k] for k, r in sche_rets if r == Result.RetCode.PASS], 'transform')
+            for job_key, ret_code in sche_rets:
+                if ret_code == Result.RetCode.PASS:
+                    result = analyzed[job_key]
+                    if not result:
+                        self.log.warning(
+                            'Failed to analyze result of %s after Merlin transformation',
+                            job_map[job_key].key)
+                        results[job_key].ret_code = Result.RetCode.ANALYZE_ERROR
+                        continue
+                    if not result.valid:
+                        # Merlin failed to perform certain transformations
+                        result.ret_code = Result.RetCode.EARLY_REJECT
+                    results[job_key] = result
+                elif ret_code == Result.RetCode.EARLY_REJECT:
+                    # The transformation was aborted once a critical message showed up
+                    result = MerlinResult('EARLY_REJECT')
+                    result.criticals = job_map[job_key].reject_msgs
+                    results[job_key] = result
+                else:
+                    results[job_key].ret_code = ret_code
+                merlin_result = results[job_key]
+                if isinstance(merlin_result, MerlinResult):
+                    merlin_result.src_hash = job_map[job_key].src_hash
+        finally:
+            # Release the waiting duplications before waiting for others
+            for job_key, future in owned.items():
+                future.set_result(deepcopy(results[job_key]))
+
+        # Borrow the results of the running transformations with the same source code
+        for job, future in waiting:
+            results[job.key] = self.dup_merlin_result(future.result())
 
         return [(job, results[job.key]) for job in jobs]
 
@@ -406,13 +838,22 @@ class MerlinEvaluator(Evaluator):
         # Check duplications using code hash
         pending_hls: List[Job] = []
         dup_list: List[Job] = []
+        owned: Dict[str, Future] = {}
+        waiting: List[Tuple[Job, Future]] = []
         lv1_results = self.db.batch_query(['lv1:{0}'.format(k) for k in job_map.keys()])
         for job, lv1_result in zip(job_map.values(), lv1_results):
             if lv1_result is not None and lv1_result.valid:
                 # Check if code hash is already exist when lv1 result is available
                 assert isinstance(lv1_result, MerlinResult)
-                if lv1_result.code_hash:
-                    dup_key = self.db.add_code_hash(lv1_result.code_hash, job.key)
+                code_hash = lv1_result.code_hash
+                if code_hash:
+                    with self.inflight_lock:
+                        dup_key = self.db.add_code_hash(code_hash, job.key)
+                        inflight = self.inflight.get(code_hash)
+                        if dup_key is None:
+                            # Let the later duplications wait for this run
+                            owned[job.key] = Future()
+                            self.inflight[code_hash] = (job.key, owned[job.key])
                     if dup_key is not None:
                         # The code hash is duplicated, borrow the HLS result if available
                         dup_lv2_key = 'lv2:{}'.format(dup_key)
@@ -421,9 +862,15 @@ class MerlinEvaluator(Evaluator):
                         dup_result = self.db.query(dup_lv2_key)
                         if dup_result:
                             results[job.key] = self.dup_hls_result(dup_result)
+                        elif inflight is not None:
+                            # The HLS of the same code is running, wait for its result
+                            self.log.debug('%s waits for the running HLS of %s', job.key,
+                                           dup_key)
+                            waiting.append((job, inflight[1]))
+                            continue
                         else:
-                            # Result may not be available at this moment so we just make
-                            # a duplicated run to simplify the flow.
+                            # The result is not available (e.g., from an interrupted run) so
+                            # we just make a duplicated run to simplify the flow.
                             self.log.debug('Add %s to duplicate list', job.key)
                             dup_list.append(job)
                     else:
@@ -432,25 +879,45 @@ class MerlinEvaluator(Evaluator):
                 # Did not find the duplicated result, pending to run HLS
                 pending_hls.append(job)
 
-        # Run HLS and analyze the Merlin report
-        sche_rets = self.scheduler.run(pending_hls, self.analyzer.desire('hls'),
-                                       self.commands['hls'], self.timeouts['hls'])
-        for job_key, ret_code in sche_rets:
-            if ret_code == Result.RetCode.PASS:
-                result = self.analyzer.analyze(job_map[job_key], 'hls', self.config)
-                if not result:
-                    self.log.warning('Failed to analyze result of %s after HLS', job_key)
-                    results[job_key].ret_code = Result.RetCode.ANALYZE_ERROR
-                    continue
-                results[job_key] = result
-                assert isinstance(result, HLSResult)
-            else:
-                results[job_key].ret_code = ret_code
+        try:
+            # A job reused from level 1 resumes from the transformed kernel, so we keep its
+            # Merlin log aside to analyze only the HLS log
+            for job in pending_hls:
+                merlin_log_path = os.path.join(job.path, 'merlin.log')
+                if os.path.exists(merlin_log_path):
+                    os.replace(merlin_log_path, os.path.join(job.path, 'merlin_transform.log'))
+
+            # Run HLS and analyze the Merlin report
+            sche_rets = self.scheduler.run(pending_hls, self.analyzer.desire('hls'),
+                                           self.commands['hls'], self.get_timeout('hls'),
+                                           self.analyzer.reject_patterns('hls'))
+            analyzed = self.analyze_jobs(
+                [job_map[k] for k, r in sche_rets if r == Result.RetCode.PASS], 'hls')
+            for job_key, ret_code in sche_rets:
+                if ret_code == Result.RetCode.PASS:
+                    result = analyzed[job_key]
+                    if not result:
+                        self.log.warning('Failed to analyze result of %s after HLS', job_key)
+                        results[job_key].ret_code = Result.RetCode.ANALYZE_ERROR
+                        continue
+                    results[job_key] = result
+                    assert isinstance(result, HLSResult)
+                else:
+                    results[job_key].ret_code = ret_code
+        finally:
+            # Release the waiting duplications. Note that the result has to be set before
+            # waiting for others to avoid deadlocks.
+            for job_key, future in owned.items():
+                future.set_result(deepcopy(results[job_key]))
 
         # Mark duplicated jobs so that it will not be considered as an output
         for job in dup_list:
             results[job.key].ret_code = Result.RetCode.DUPLICATED
 
+        # Borrow the results of the running HLS with the same code
+        for job, future in waiting:
+            results[job.key] = self.dup_hls_result(future.result())
+
         return [(job, results[job.key]) for job in jobs]
 
     def submit_lv3(self, jobs: List[Job]) -> List[Tuple[Job, Result]]:
@@ -465,10 +932,13 @@ class MerlinEvaluator(Evaluator):
             return [(job, Result('UNAVAILABLE')) for job in jobs]
 
         sche_rets = self.scheduler.run(jobs, self.analyzer.desire('bitgen'),
-                                       self.commands['bitgen'], self.timeouts['bitgen'])
+                                       self.commands['bitgen'], self.get_timeout('bitgen'),
+                                       self.analyzer.reject_patterns('bitgen'))
+        analyzed = self.analyze_jobs(
+            [job_map[k] for k, r in sche_rets if r == Result.RetCode.PASS], 'bitgen')
         for job_key, ret_code in sche_rets:
             if ret_code == Result.RetCode.PASS:
-                result = self.analyzer.analyze(job_map[job_key], 'bitgen', self.config)
+                result = analyzed[job_key]
                 if not result:
                     self.log.warning('Failed to analyze result of %s after bitgen', job_key)
                     results[job_key].ret_code = Result.RetCode.ANALYZE_ERROR
@@ -0,0 +1,136 @@
+"""
+The module of the process-wide worker pool.
+"""
+from threading import Lock
+from typing import Callable, Dict, List
+
+
+class WorkerPool():
+    """A pool of worker slots shared by all clients (e.g., design space partitions).
+
+    The pool limits the total number of running jobs. When slots are contended, a free slot
+    goes to the waiting client with the lowest weighted share (running jobs / weight), so
+    the capacity released by finished partitions flows to the partitions that still have work.
+
+    Attributes:
+        max_worker: The total number of worker slots.
+        lock: The lock of the pool status.
+        used: The number of occupied slots.
+        running: The number of occupied slots of each client.
+        weights: The priority weight of each client. The default weight is 1.
+        waiters: The wakeup callbacks of the clients that have pending jobs.
+    """
+
+    def __init__(self, max_worker: int):
+        self.max_worker = max_worker
+        self.lock = Lock()
+        self.used = 0
+        self.running: Dict[str, int] = {}
+        self.weights: Dict[str, float] = {}
+        self.waiters: Dict[str, List[Callable[[], None]]] = {}
+
+    def resize(self, max_worker: int) -> None:
+        """Change the total number of worker slots. Running jobs are not affected.
+
+        Args:
+            max_worker: The total number of worker slots.
+        """
+
+        with self.lock:
+            self.max_worker = max_worker
+        self.notify()
+
+    def share(self, client: str) -> float:
+        """Compute the weighted share of the given client. The caller must hold the lock.
+
+        Args:
+            client: The client name.
+
+        Returns:
+            The weighted share.
+        """
+        return self.running.get(client, 0) / self.weights.get(client, 1.0)
+
+    def set_weight(self, client: str, weight: float) -> None:
+        """Set the priority weight of a client. A larger weight gets more slots.
+
+        Args:
+            client: The client name.
+            weight: A positive weight.
+        """
+
+        with self.lock:
+            self.weights[client] = weight
+        self.notify()
+
+    def add_waiter(self, client: str, wakeup: Callable[[], None]) -> None:
+        """Register a client with pending jobs.
+
+        Args:
+            client: The client name.
+            wakeup: The callback to be invoked when the client should retry to acquire slots.
+                    It must be thread-safe and must not block.
+        """
+
+        with self.lock:
+            self.waiters.setdefault(client, []).append(wakeup)
+
+    def remove_waiter(self, client: str, wakeup: Callable[[], None]) -> None:
+        """Unregister a waiter once it has no pending jobs.
+
+        Args:
+            client: The client name.
+            wakeup: The callback registered by add_waiter.
+        """
+
+        with self.lock:
+            if wakeup in self.waiters.get(client, []):
+                self.waiters[client].remove(wakeup)
+                if not self.waiters[client]:
+                    del self.waiters[client]
+
+        # The fair share among the rest waiters may be changed
+        self.notify()
+
+    def acquire(self, client: str) -> bool:
+        """Try to occupy a worker slot without blocking.
+
+        Args:
+            client: The client name.
+
+        Returns:
+            True if a slot was granted.
+        """
+
+        with self.lock:
+            if self.used >= self.max_worker:
+                return False
+
+            # Yield to the waiting clients with a lower share
+            share = self.share(client)
+            if any(self.share(other) < share for other in self.waiters if other != client):
+                return False
+
+            self.running[client] = self.running.get(client, 0) + 1
+            self.used += 1
+            return True
+
+    def release(self, client: str) -> None:
+        """Release a worker slot and notify all waiters.
+
+        Args:
+            client: The client name.
+        """
+
+        with self.lock:
+            self.running[client] -= 1
+            self.used -= 1
+        self.notify()
+
+    def notify(self) -> None:
+        """Notify all waiters to retry."""
+
+        with self.lock:
+            callbacks = [cb for cbs in self.waiters.values() for cb in cbs]
+        for callback in callbacks:
+            callback()
@@ -0,0 +1,164 @@
+"""
+The module of Merlin report loading.
+"""
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+from types import ModuleType
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+orjson: Optional[ModuleType]  # pylint:disable=invalid-name
+try:
+    import orjson
+except ImportError:
+    orjson = None  # pylint:disable=invalid-name
+
+# The fields of each report read by the analyzer. A field ending with "*" matches all fields
+# with the prefix
+PERF_EST_FIELDS = ('CYCLE_TOT', 'CYCLE_UNIT', 'CYCLE_BURST', 'org_identifier', 'flatten',
+                   'flatten-id', 'util-*', 'total-*')
+TOPO_INFO_FIELDS = ('topo_id', 'type', 'name', 'childs', 'sub_functions')
+HIERARCHY_FIELDS = ('stmts', 'src_topo_id', 'src_filename', 'src_line')
+
+
+def get_json_backend() -> str:
+    """Get the name of the JSON parser in use."""
+    return 'orjson' if orjson is not None else 'json'
+
+
+class FieldFilter():
+    """The filter that drops the scalar fields not in the given field list.
+
+    Nested objects and arrays are always kept regardless of their keys, so the structure of
+    the report (e.g., perf_est indexed by topology IDs and the statements of hierarchy) is
+    preserved while the large fields we never read, such as messages, are discarded.
+
+    Attributes:
+        names: The field names to be kept.
+        prefixes: The field name prefixes to be kept.
+    """
+
+    def __init__(self, fields: Sequence[str]):
+        self.names = set([f for f in fields if not f.endswith('*')])
+        self.prefixes = tuple([f[:-1] for f in fields if f.endswith('*')])
+
+    def keep(self, key: str, val: Any) -> bool:
+        """Check if a field should be kept."""
+        return isinstance(val, (dict, list)) or key in self.names or key.startswith(self.prefixes)
+
+    def hook(self, pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        """The object hook of the stdlib JSON decoder."""
+        return {key: val for key, val in pairs if self.keep(key, val)}
+
+    def apply(self, obj: Any) -> Any:
+        """Filter a parsed JSON object in place.
+
+        Args:
+            obj: The parsed JSON object.
+
+        Returns:
+            The filtered object.
+        """
+
+        stack = [obj]
+        while stack:
+            curr = stack.pop()
+            if isinstance(curr, dict):
+                for key in [k for k, v in curr.items() if not self.keep(k, v)]:
+                    del curr[key]
+                stack += [v for v in curr.values() if isinstance(v, (dict, list))]
+            elif isinstance(curr, list):
+                stack += [v for v in curr if isinstance(v, (dict, list))]
+        return obj
+
+
+class ReportCache():
+    """The cache of parsed Merlin reports.
+
+    A report is parsed with orjson if available, or the stdlib JSON decoder otherwise. The
+    parsed reports are cached by their paths and reloaded once the files are changed, and
+    the least recently used reports are dropped when the cache is full. The cached reports
+    are shared by all callers so they must not be modified.
+
+    Attributes:
+        max_entries: The maximum number of cached reports.
+        lock: The lock of the cache.
+        entries: The parsed reports indexed by the path, the file stat, and the field list.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.entries: Dict[Tuple[str, int, int, Optional[Tuple[str, ...]]],
+                           Any] = OrderedDict()
+
+    def load(self, path: str, fields: Optional[Sequence[str]] = None) -> Any:
+        """Load a JSON report.
+
+        Args:
+            path: The path of the report.
+            fields: The fields to be kept, or None to keep all fields.
+
+        Returns:
+            The parsed report.
+
+        Raises:
+            OSError: The report cannot be read.
+            ValueError: The report is not a valid JSON file.
+        """
+
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size,
+               tuple(fields) if fields is not None else None)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)  # type: ignore
+                return self.entries[key]
+
+        with open(path, 'rb') as filep:
+            data = filep.read()
+        field_filter = FieldFilter(fields) if fields is not None else None
+        if orjson is not None:
+            report = orjson.loads(data)
+            if field_filter is not None:
+                report = field_filter.apply(report)
+        else:
+            report = json.loads(data,
+                                object_pairs_hook=field_filter.hook if field_filter else None)
+
+        with self.lock:
+            # Drop the stale versions of the report
+            for stale in [k for k in self.entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                del self.entries[stale]
+            self.entries[key] = report
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)  # type: ignore
+        return report
+
+    def clear(self) -> None:
+        """Drop all cached reports."""
+        with self.lock:
+            self.entries.clear()
+
+
+# The report cache shared by the analyzers in this process
+REPORT_CACHE = ReportCache()
+
+
+def load_report(path: str, fields: Optional[Sequence[str]] = None) -> Any:
+    """Load a JSON report with the report cache of this process.
+
+    Args:
+        path: The path of the report.
+        fields: The fields to be kept, or None to keep all fields.
+
+    Returns:
+        The parsed report, which must not be modified.
+
+    Raises:
+        OSError: The report cannot be read.
+        ValueError: The report is not a valid JSON file.
+    """
+
+    return REPORT_CACHE.load(path, fields)
@@ -1,17 +1,24 @@
 """
 The main module of job schedulers.
 """
+import asyncio
 import glob
 import os
 import shutil
 import signal
 import time
-from math import ceil
-from typing import List, Tuple, Optional
+from collections import deque
+from subprocess import DEVNULL, Popen
+from threading import Lock
+from typing import AsyncGenerator, Dict, List, Tuple, Optional
+from weakref import WeakKeyDictionary
 
 from ..logger import get_eval_logger
-from ..result import Job, Result
-from ..util import copy_dir
+from ..result import Job, ResourceUsage, Result
+from .admission import AdmissionController
+from .pool import WorkerPool
+from .watcher import LogTailer, ProcessWatcher
+from .workspace import CloneMode, clone_tree
 
 
 class Scheduler():
@@ -26,8 +33,17 @@ class Scheduler():
         self.log = get_eval_logger('Scheduler')
         self.max_worker = max_worker
 
+    def set_max_worker(self, max_worker: int) -> None:
+        """Change the maximum number of allowed workers for the jobs launched later.
+
+        Args:
+            max_worker: The maximum number of allowed workers.
+        """
+        self.max_worker = max_worker
+
     def run(self, jobs: List[Job], keep_files: List[str], cmd: str,
-            timeout: Optional[int] = None) -> List[Tuple[str, Result.RetCode]]:
+            timeout: Optional[float] = None,
+            reject: Optional[Tuple[str, List[str]]] = None) -> List[Tuple[str, Result.RetCode]]:
         """The main API of scheduling and running given jobs.
 
         Args:
@@ -37,15 +53,23 @@ class Scheduler():
             cmd: A string of command for execution. Note that we may extend this part
                  to another evaluation function instead of a single string in the future.
             timeout: The timeout in minutes of the evaluation. None means no timeout.
+            reject: A log file name in the working directory and a list of messages. A job
+                    is killed with EARLY_REJECT once any message appears in its log, and the
+                    matched lines are kept in job.reject_msgs. None means never reject.
 
         Returns:
             A list of each job key and its corresponding return code.
         """
         raise NotImplementedError()
 
+    def cancel(self, job: Job) -> None:
+        """Cancel a pending or running job. The job will not be launched or will be killed as
+        soon as possible, and its return code will be CANCELLED.
 
-class PythonSubprocessScheduler(Scheduler):
-    """The scheduler implementation using Python subprocess."""
+        Args:
+            job: The job to be cancelled.
+        """
+        job.cancelled = True
 
     @staticmethod
     def backup_files_and_rmtree(src_path: str,
@@ -82,74 +106,422 @@ class PythonSubprocessScheduler(Scheduler):
                         log.info('Failed to move %s to %s: %s', file_path, dst_path, str(err))
             shutil.rmtree(src_path)
 
-    def run(self, jobs: List[Job], keep_files: List[str], cmd: str,
-            timeout: Optional[int] = None) -> List[Tuple[str, Result.RetCode]]:
+
+class PythonSubprocessScheduler(Scheduler):
+    """The scheduler implementation using Python subprocess.
+
+    All concurrent runs (e.g., from explorer threads of different design space partitions)
+    share one worker pool of max_worker slots, which is fairly shared by job tags. If an
+    admission controller is given, a job is launched only when the machine can afford it.
+
+    Attributes:
+        pool: The worker pool.
+        admission: The admission controller. None means no admission control.
+        admission_interval: The interval in seconds to recheck the admission of pending jobs.
+        reject_interval: The interval in seconds to check the logs of running jobs.
+        watchers: The process watcher of the run of each scheduled job, keyed by job ID.
+        watcher_lock: The lock of the watcher map.
+    """
+
+    def __init__(self, max_worker: int = 8, admission: Optional[AdmissionController] = None):
+        super(PythonSubprocessScheduler, self).__init__(max_worker)
+        self.pool = WorkerPool(max_worker)
+        self.admission = admission
+        self.admission_interval = 5.0
+        self.reject_interval = 1.0
+        self.watchers: Dict[int, ProcessWatcher] = {}
+        self.watcher_lock = Lock()
+
+    def set_max_worker(self, max_worker: int) -> None:
         #pylint: disable=missing-docstring
 
-        from subprocess import Popen, DEVNULL
+        super(PythonSubprocessScheduler, self).set_max_worker(max_worker)
+        self.pool.resize(max_worker)
+
+    def cancel(self, job: Job) -> None:
+        #pylint: disable=missing-docstring
+
+        super(PythonSubprocessScheduler, self).cancel(job)
+
+        # Wake up the run that has this job
+        with self.watcher_lock:
+            watcher = self.watchers.get(id(job))
+        if watcher is not None:
+            watcher.wakeup()
+
+    def admit(self, job: Job, cmd: str) -> bool:
+        """Try to occupy a worker slot and the machine resources for the given job.
+
+        Args:
+            job: The job to be launched.
+            cmd: The command to be executed.
+
+        Returns:
+            True if the job can be launched.
+        """
+
+        if self.admission is not None and not self.admission.reserve(cmd):
+            return False
+        if not self.pool.acquire(job.tag):
+            if self.admission is not None:
+                self.admission.cancel(cmd)
+            return False
+        return True
+
+    def reap(self, job: Job, proc: Popen, cmd: str, start: float) -> int:
+        """Collect the exit status and the resource usage of a process and release its
+        resources.
+
+        Args:
+            job: The job of the process. Its usage will be updated.
+            proc: The exited (or killed) process.
+            cmd: The executed command.
+            start: The launch time of the process.
+
+        Returns:
+            The exit code of the process.
+        """
+
+        peak_mem = None
+        try:
+            # Use wait4 to get the resource usage of the process and its descendants
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            peak_mem = usage.ru_maxrss / 1024.0
+            job.usage = ResourceUsage(wall_time=time.time() - start,
+                                      cpu_user=usage.ru_utime,
+                                      cpu_sys=usage.ru_stime,
+                                      peak_rss=peak_mem,
+                                      io_read=usage.ru_inblock * 512,
+                                      io_write=usage.ru_oublock * 512)
+        except ChildProcessError:
+            # Already reaped by Popen
+            pass
+        ret = proc.wait()
+        self.pool.release(job.tag)
+        if self.admission is not None:
+            self.admission.finish(cmd, peak_mem)
+        return ret
+
+    def launch(self, job: Job, cmd: str) -> Popen:
+        """Copy the job to its working directory and launch the command in a new session.
+
+        Args:
+            job: The job to be launched.
+            cmd: The command to be executed in the working directory.
+
+        Returns:
+            The launched process.
+        """
+
+        # The command may modify files in place so the working directory cannot share files
+        # with the job directory via hard links
+        clone_tree(job.path, '{0}_work'.format(job.path), CloneMode.REFLINK)
+
+        # Since we use shell=True to launch a new bash in order to make sure the command
+        # is executed as it in the bash shell, we need to also set start_new_session=True
+        # in order to send the kill signal when timeout or interrupt because proc.kill()
+        # is not working when shell=True.
+        # See https://stackoverflow.com/questions/4789837 for details.
+        return Popen('cd {0}_work; {1}'.format(job.path, cmd),
+                     stdout=DEVNULL,
+                     stderr=DEVNULL,
+                     shell=True,
+                     start_new_session=True)
+
+    def run(self, jobs: List[Job], keep_files: List[str], cmd: str,
+            timeout: Optional[float] = None,
+            reject: Optional[Tuple[str, List[str]]] = None) -> List[Tuple[str, Result.RetCode]]:
+        #pylint: disable=missing-docstring
 
         rets = {job.key: Result.RetCode.UNAVAILABLE for job in jobs}
 
-        # Batch jobs when the number is larger than the max workers
-        num_batch = ceil(len(jobs) / self.max_worker)
-        for batch in range(num_batch):
-            procs = []
-            for offset in range(self.max_worker):
-                idx = batch * self.max_worker + offset
-                if idx >= len(jobs):
-                    break
-                copy_dir(jobs[idx].path, '{0}_work'.format(jobs[idx].path))
-
-                # Since we use shell=True to launch a new bash in order to make sure the command
-                # is executed as it in the bash shell, we need to also set start_new_session=True
-                # in order to send the kill signal when timeout or interrupt because proc.kill()
-                # is not working when shell=True.
-                # See https://stackoverflow.com/questions/4789837 for details.
-                proc = Popen('cd {0}_work; {1}'.format(jobs[idx].path, cmd),
-                             stdout=DEVNULL,
-                             stderr=DEVNULL,
-                             shell=True,
-                             start_new_session=True)
-                procs.append((idx, proc))
-
-            if not procs:
-                break
-
-            time_limit = float('inf') if timeout is None else timeout
-            self.log.info('Launching batch %d/%d with %d jobs and timeout %.2f mins', batch + 1,
-                          num_batch, len(procs), time_limit)
-            timer = time.time()
-            try:
-                while (time.time() - timer) < time_limit * 60.0 and procs:
-                    old_procs = list(procs)
-                    procs = []
-                    for idx, proc in old_procs:
-                        ret = proc.poll()
-                        # Finished, check if success, remove from list, and backup wanted files
-                        if ret is not None and ret != 0:
-                            self.log.error('Command "%s" has non-zero exit code: %d', cmd, ret)
-                            self.backup_files_and_rmtree('{0}_work'.format(jobs[idx].path),
-                                                         jobs[idx].path)
-                        elif ret is not None:
-                            rets[jobs[idx].key] = Result.RetCode.PASS
-                            self.backup_files_and_rmtree('{0}_work'.format(jobs[idx].path),
-                                                         jobs[idx].path, keep_files)
-                        else:
-                            # Still running
-                            procs.append((idx, proc))
-                    time.sleep(1)
-
-                if procs:
-                    # One or more processes are timeout.
-                    # Note that timeout is considered as a success run
-                    self.log.info('%d processes timeout (%.2f mins)', len(procs), time_limit)
-                    for idx, proc in procs:
-                        rets[jobs[idx].key] = Result.RetCode.TIMEOUT
-                        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
-            except KeyboardInterrupt:
-                self.log.warning('Received user keyboard interrupt, stopping the process.')
-                for idx, proc in procs:
+        # Jobs are launched in order whenever a worker slot in the pool is available, so a slow
+        # job only occupies its own slot. Each job has its own time limit counted from its
+        # launch time.
+        time_limit = float('inf') if timeout is None else timeout
+        self.log.info('Launching %d jobs with %d shared workers and timeout %.2f mins', len(jobs),
+                      self.max_worker, time_limit)
+
+        queue = deque(jobs)
+        procs: Dict[int, Tuple[Job, Popen, float]] = {}
+        tailers: Dict[int, LogTailer] = {}
+        watcher = ProcessWatcher()
+        tags = set([job.tag for job in jobs])
+        for tag in tags:
+            self.pool.add_waiter(tag, watcher.wakeup)
+        with self.watcher_lock:
+            for job in jobs:
+                self.watchers[id(job)] = watcher
+        try:
+            while queue or procs:
+                # Drop the cancelled jobs that are not launched yet
+                if any([job.cancelled for job in queue]):
+                    for job in [job for job in queue if job.cancelled]:
+                        self.log.info('Job %s is cancelled', job.key)
+                        rets[job.key] = Result.RetCode.CANCELLED
+                    queue = deque([job for job in queue if not job.cancelled])
+
+                # Refill idle workers
+                while queue and self.admit(queue[0], cmd):
+                    job = queue.popleft()
+                    job.usage = None
+                    job.reject_msgs = []
+                    proc = self.launch(job, cmd)
+                    procs[proc.pid] = (job, proc, time.time())
+                    watcher.watch(proc)
+                    if reject is not None:
+                        tailers[proc.pid] = LogTailer(
+                            os.path.join('{0}_work'.format(job.path), reject[0]), reject[1])
+                if not queue and tags:
+                    # Let other clients have the rest workers
+                    for tag in tags:
+                        self.pool.remove_waiter(tag, watcher.wakeup)
+                    tags = set()
+
+                # Sleep until any job exits, the earliest job reaches its time limit, or
+                # a worker in the pool is released
+                deadline = min([start for _, _, start in procs.values()] +
+                               [float('inf')]) + time_limit * 60.0
+                wait_time = None if deadline == float('inf') else max(deadline - time.time(), 0)
+                if queue and self.admission is not None:
+                    # The machine resources may be freed by others
+                    wait_time = self.admission_interval if wait_time is None else min(
+                        wait_time, self.admission_interval)
+                if procs and reject is not None:
+                    wait_time = self.reject_interval if wait_time is None else min(
+                        wait_time, self.reject_interval)
+                for proc in watcher.wait(wait_time):
+                    if proc.pid not in procs:
+                        continue
+                    job, _, start = procs.pop(proc.pid)
+                    tailers.pop(proc.pid, None)
+                    ret = self.reap(job, proc, cmd, start)
+                    # Finished, check if success and backup wanted files
+                    if ret != 0:
+                        self.log.error('Command "%s" has non-zero exit code: %d', cmd, ret)
+                        self.backup_files_and_rmtree('{0}_work'.format(job.path), job.path)
+                    else:
+                        rets[job.key] = Result.RetCode.PASS
+                        self.backup_files_and_rmtree('{0}_work'.format(job.path), job.path,
+                                                     keep_files)
+
+                # Abort the jobs that will be rejected anyway
+                for pid, tailer in list(tailers.items()):
+                    msgs = tailer.poll()
+                    if not msgs:
+                        continue
+                    job, proc, start = procs.pop(pid)
+                    del tailers[pid]
+                    self.log.info('Job %s is rejected early: %s', job.key, msgs[0])
+                    rets[job.key] = Result.RetCode.EARLY_REJECT
+                    job.reject_msgs = msgs
                     os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
-                break
+                    watcher.unwatch(proc)
+                    self.reap(job, proc, cmd, start)
+                    self.backup_files_and_rmtree('{0}_work'.format(job.path), job.path,
+                                                 keep_files)
+
+                for pid, (job, proc, start) in list(procs.items()):
+                    if job.cancelled:
+                        self.log.info('Job %s is cancelled', job.key)
+                        rets[job.key] = Result.RetCode.CANCELLED
+                        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+                        watcher.unwatch(proc)
+                        self.reap(job, proc, cmd, start)
+                        shutil.rmtree('{0}_work'.format(job.path), ignore_errors=True)
+                        del procs[pid]
+                        tailers.pop(pid, None)
+                    elif (time.time() - start) >= time_limit * 60.0:
+                        # Note that timeout is considered as a success run
+                        self.log.info('Job %s timeout (%.2f mins)', job.key, time_limit)
+                        rets[job.key] = Result.RetCode.TIMEOUT
+                        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+                        watcher.unwatch(proc)
+                        self.reap(job, proc, cmd, start)
+                        del procs[pid]
+                        tailers.pop(pid, None)
+        except KeyboardInterrupt:
+            self.log.warning('Received user keyboard interrupt, stopping the process.')
+            for job, proc, start in procs.values():
+                os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+                self.reap(job, proc, cmd, start)
+        finally:
+            for tag in tags:
+                self.pool.remove_waiter(tag, watcher.wakeup)
+            with self.watcher_lock:
+                for job in jobs:
+                    self.watchers.pop(id(job), None)
+            watcher.close()
 
         return list(rets.items())
+
+
+class AsyncSubprocessScheduler(Scheduler):
+    """The scheduler implementation using asyncio subprocesses.
+
+    Each job is an awaitable so that callers running an event loop can overlap job execution
+    with other work such as result analysis and database commits. The number of running jobs
+    in one event loop is limited by max_worker.
+
+    Attributes:
+        slots: The worker slot semaphore of each event loop.
+        lock: The lock of the semaphore map.
+        reject_interval: The interval in seconds to check the logs and the cancellation of
+                         running jobs.
+    """
+
+    def __init__(self, max_worker: int = 8):
+        super(AsyncSubprocessScheduler, self).__init__(max_worker)
+        self.slots: WeakKeyDictionary = WeakKeyDictionary()
+        self.lock = Lock()
+        self.reject_interval = 1.0
+
+    def get_slots(self) -> asyncio.Semaphore:
+        """Get the worker slot semaphore of the running event loop.
+
+        Returns:
+            The semaphore.
+        """
+
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if loop not in self.slots:
+                self.slots[loop] = asyncio.Semaphore(self.max_worker)
+            return self.slots[loop]
+
+    async def run_one(self, job: Job, keep_files: List[str], cmd: str,
+                      timeout: Optional[float] = None,
+                      reject: Optional[Tuple[str, List[str]]] = None) -> Result.RetCode:
+        """Run one job once a worker slot is available.
+
+        Args:
+            job: The job object to be run.
+            keep_files: A list of file name (support wildcards) to indicate which files
+                        should be kept for result analysis.
+            cmd: A string of command for execution.
+            timeout: The timeout in minutes of the evaluation. None means no timeout.
+            reject: The log file name and messages to reject the job early. See Scheduler.run.
+
+        Returns:
+            The return code of the job.
+        """
+
+        loop = asyncio.get_running_loop()
+        work_path = '{0}_work'.format(job.path)
+        async with self.get_slots():
+            if job.cancelled:
+                self.log.info('Job %s is cancelled', job.key)
+                return Result.RetCode.CANCELLED
+            await loop.run_in_executor(None, clone_tree, job.path, work_path, CloneMode.REFLINK)
+
+            # See PythonSubprocessScheduler.launch for the reason of using a new session
+            proc = await asyncio.create_subprocess_shell('cd {0}; {1}'.format(work_path, cmd),
+                                                         stdout=asyncio.subprocess.DEVNULL,
+                                                         stderr=asyncio.subprocess.DEVNULL,
+                                                         start_new_session=True)
+            job.reject_msgs = []
+            tailer = None if reject is None else LogTailer(os.path.join(work_path, reject[0]),
+                                                           reject[1])
+            deadline = None if timeout is None else loop.time() + timeout * 60.0
+            try:
+                while True:
+                    # Wake up periodically to check the log and the cancellation
+                    wait_time = self.reject_interval
+                    if deadline is not None:
+                        wait_time = min(self.reject_interval, max(deadline - loop.time(), 0))
+                    try:
+                        ret = await asyncio.wait_for(proc.wait(), wait_time)
+                        break
+                    except asyncio.TimeoutError:
+                        pass
+
+                    if deadline is not None and loop.time() >= deadline:
+                        # Note that timeout is considered as a success run
+                        self.log.info('Job %s timeout (%.2f mins)', job.key, timeout)
+                        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+                        await proc.wait()
+                        return Result.RetCode.TIMEOUT
+
+                    if job.cancelled:
+                        self.log.info('Job %s is cancelled', job.key)
+                        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+                        await proc.wait()
+                        await loop.run_in_executor(None, shutil.rmtree, work_path, True)
+                        return Result.RetCode.CANCELLED
+
+                    msgs = [] if tailer is None else tailer.poll()
+                    if msgs:
+                        self.log.info('Job %s is rejected early: %s', job.key, msgs[0])
+                        job.reject_msgs = msgs
+                        os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+                        await proc.wait()
+                        await loop.run_in_executor(None, self.backup_files_and_rmtree,
+                                                   work_path, job.path, keep_files)
+                        return Result.RetCode.EARLY_REJECT
+            except asyncio.CancelledError:
+                os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+                await proc.wait()
+                raise
+
+            if ret != 0:
+                self.log.error('Command "%s" has non-zero exit code: %d', cmd, ret)
+                await loop.run_in_executor(None, self.backup_files_and_rmtree, work_path,
+                                           job.path)
+                return Result.RetCode.UNAVAILABLE
+
+            await loop.run_in_executor(None, self.backup_files_and_rmtree, work_path, job.path,
+                                       keep_files)
+            return Result.RetCode.PASS
+
+    async def as_completed(self, jobs: List[Job], keep_files: List[str], cmd: str,
+                           timeout: Optional[float] = None,
+                           reject: Optional[Tuple[str, List[str]]] = None
+                           ) -> AsyncGenerator[Tuple[str, Result.RetCode], None]:
+        """Run the given jobs and yield their return codes in the order of completion.
+
+        Unfinished jobs are killed if the consumer stops iterating early.
+
+        Args:
+            jobs: A list of job objects to be scheduled.
+            keep_files: A list of file name (support wildcards) to indicate which files
+                        should be kept for result analysis.
+            cmd: A string of command for execution.
+            timeout: The timeout in minutes of each job. None means no timeout.
+            reject: The log file name and messages to reject a job early. See Scheduler.run.
+
+        Returns:
+            An async generator of each job key and its corresponding return code.
+        """
+
+        async def run_keyed(job: Job) -> Tuple[str, Result.RetCode]:
+            return (job.key, await self.run_one(job, keep_files, cmd, timeout, reject))
+
+        tasks = [asyncio.ensure_future(run_keyed(job)) for job in jobs]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run(self, jobs: List[Job], keep_files: List[str], cmd: str,
+            timeout: Optional[float] = None,
+            reject: Optional[Tuple[str, List[str]]] = None) -> List[Tuple[str, Result.RetCode]]:
+        #pylint: disable=missing-docstring
+
+        async def collect() -> Dict[str, Result.RetCode]:
+            rets = {job.key: Result.RetCode.UNAVAILABLE for job in jobs}
+            async for key, ret in self.as_completed(jobs, keep_files, cmd, timeout, reject):
+                rets[key] = ret
+            return rets
+
+        time_limit = float('inf') if timeout is None else timeout
+        self.log.info('Launching %d jobs with %d workers and timeout %.2f mins', len(jobs),
+                      self.max_worker, time_limit)
+        try:
+            return list(asyncio.run(collect()).items())
+        except KeyboardInterrupt:
+            self.log.warning('Received user keyboard interrupt, stopping the process.')
+        return [(job.key, Result.RetCode.UNAVAILABLE) for job in jobs]
@@ -0,0 +1,133 @@
+"""
+The module of adaptive evaluation timeouts.
+"""
+from typing import List, Optional
+
+
+class P2Quantile():
+    """Streaming estimation of a quantile with the P-square algorithm.
+
+    The sketch keeps only five markers regardless of the number of observations, so it can
+    be committed to the database after every update. See Jain and Chlamtac, "The P2 algorithm
+    for dynamic calculation of quantiles and histograms without storing observations", 1985.
+
+    Attributes:
+        quantile: The quantile to be estimated (0-1).
+        count: The number of observations.
+        heights: The marker heights. The middle marker estimates the quantile.
+        positions: The actual marker positions.
+        desired: The desired marker positions.
+        increments: The increments of the desired marker positions per observation.
+    """
+
+    def __init__(self, quantile: float = 0.95):
+        self.quantile = quantile
+        self.count = 0
+        self.heights: List[float] = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4]
+        self.increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    def add(self, value: float) -> None:
+        """Add an observation.
+
+        Args:
+            value: The observed value.
+        """
+
+        self.count += 1
+        if self.count <= 5:
+            self.heights.append(value)
+            self.heights.sort()
+            return
+
+        # Find the cell of the new value and adjust the extreme markers
+        heights = self.heights
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = max([idx for idx in range(4) if heights[idx] <= value])
+
+        for idx in range(cell + 1, 5):
+            self.positions[idx] += 1
+        for idx in range(5):
+            self.desired[idx] += self.increments[idx]
+
+        # Adjust the middle markers if they are off their desired positions
+        pos = self.positions
+        for idx in range(1, 4):
+            diff = self.desired[idx] - pos[idx]
+            if (diff >= 1 and pos[idx + 1] - pos[idx] > 1) or (diff <= -1
+                                                              and pos[idx - 1] - pos[idx] < -1):
+                step = 1 if diff > 0 else -1
+                height = heights[idx] + step / (pos[idx + 1] - pos[idx - 1]) * (
+                    (pos[idx] - pos[idx - 1] + step) * (heights[idx + 1] - heights[idx]) /
+                    (pos[idx + 1] - pos[idx]) + (pos[idx + 1] - pos[idx] - step) *
+                    (heights[idx] - heights[idx - 1]) / (pos[idx] - pos[idx - 1]))
+                if not heights[idx - 1] < height < heights[idx + 1]:
+                    # Fall back to linear prediction if the parabolic one is out of order
+                    height = heights[idx] + step * (heights[idx + step] - heights[idx]) / (
+                        pos[idx + step] - pos[idx])
+                heights[idx] = height
+                pos[idx] += step
+
+    def value(self) -> Optional[float]:
+        """Get the estimated quantile.
+
+        Returns:
+            The estimated quantile, or None if there is no observation.
+        """
+
+        if not self.heights:
+            return None
+        if self.count <= 5:
+            # Exact quantile of the few observations
+            return self.heights[min(int(self.quantile * self.count), self.count - 1)]
+        return self.heights[2]
+
+
+class AdaptiveTimeout():
+    """The timeout policy that caps the configured timeout with the observed evaluation time.
+
+    Attributes:
+        multiple: The timeout is this multiple of the estimated quantile.
+        min_samples: The minimum number of observations to enable the adaptive timeout.
+        quantile: The quantile of the evaluation time to be estimated.
+    """
+
+    def __init__(self, multiple: float = 3.0, min_samples: int = 10, quantile: float = 0.95):
+        self.multiple = multiple
+        self.min_samples = min_samples
+        self.quantile = quantile
+
+    def create_sketch(self) -> P2Quantile:
+        """Create an empty sketch of the evaluation time.
+
+        Returns:
+            The sketch.
+        """
+
+        return P2Quantile(self.quantile)
+
+    def get_timeout(self, limit: int, sketch: Optional[P2Quantile]) -> float:
+        """Compute the timeout of new jobs.
+
+        Args:
+            limit: The configured timeout in minutes, which is the upper bound.
+            sketch: The sketch of the evaluation time in seconds of successful jobs.
+
+        Returns:
+            The timeout in minutes.
+        """
+
+        if sketch is None or sketch.count < self.min_samples:
+            return limit
+
+        est = sketch.value()
+        if est is None:
+            return limit
+        return min(float(limit), self.multiple * est / 60.0)
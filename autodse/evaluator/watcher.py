@@ -0,0 +1,198 @@
+"""
+The module of watching running jobs.
+"""
+import os
+import selectors
+import threading
+from subprocess import Popen
+from typing import Dict, List, Optional, Set
+
+
+class ProcessWatcher():
+    """Wait for the exit of launched processes without polling them.
+
+    On Linux each process is watched through a pidfd that becomes readable when the process
+    exits. On other platforms a daemon thread blocks on waitid (or Popen.wait) for each
+    process. The owner is responsible for collecting the exit status of reported processes.
+
+    Attributes:
+        selector: The selector of pidfds and the wakeup pipe.
+        exited: A list of exited processes reported by waiter threads.
+        lock: The lock of the exited list and the wakeup pipe.
+        closed: Indicate if this watcher has been closed.
+    """
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.exited: List[Popen] = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+        # A self-pipe to interrupt the wait from other threads
+        self._rfd, self._wfd = os.pipe()
+        os.set_blocking(self._rfd, False)
+        os.set_blocking(self._wfd, False)
+        self.selector.register(self._rfd, selectors.EVENT_READ, None)
+
+        self._pidfds: Dict[int, int] = {}
+        self._waiting: Set[int] = set()
+
+    def watch(self, proc: Popen) -> None:
+        """Start watching the given process.
+
+        Args:
+            proc: The process to be watched.
+        """
+
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(proc.pid)  # type: ignore
+                self._pidfds[proc.pid] = pidfd
+                self.selector.register(pidfd, selectors.EVENT_READ, proc)
+                return
+            except OSError:
+                # The kernel does not support pidfd, fall back to a waiter thread
+                pass
+
+        with self.lock:
+            self._waiting.add(proc.pid)
+        threading.Thread(target=self._wait_exit, args=(proc, ), daemon=True).start()
+
+    def _wait_exit(self, proc: Popen) -> None:
+        """Block until the given process exits and report it.
+
+        Args:
+            proc: The process to be waited.
+        """
+
+        try:
+            if hasattr(os, 'waitid'):
+                # WNOWAIT keeps the process waitable by its owner
+                os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+            else:
+                proc.wait()
+        except ChildProcessError:
+            # Already reaped by others
+            pass
+        with self.lock:
+            if self.closed or proc.pid not in self._waiting:
+                return
+            self._waiting.remove(proc.pid)
+            self.exited.append(proc)
+        self.wakeup()
+
+    def wakeup(self) -> None:
+        """Interrupt the current or the next wait. This function is thread-safe."""
+
+        with self.lock:
+            if self.closed:
+                return
+            try:
+                os.write(self._wfd, b'\0')
+            except BlockingIOError:
+                # The pipe is full so the wait will be interrupted anyway
+                pass
+
+    def wait(self, timeout: Optional[float] = None) -> List[Popen]:
+        """Wait until any watched process exits, a wakeup, or timeout.
+
+        Args:
+            timeout: The maximum waiting time in seconds. None means no limit.
+
+        Returns:
+            A list of exited processes, which are no longer watched.
+        """
+
+        procs: List[Popen] = []
+        with self.lock:
+            if self.exited:
+                timeout = 0
+
+        for key, _ in self.selector.select(timeout):
+            if key.data is None:
+                try:
+                    while os.read(self._rfd, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            procs.append(key.data)
+            self.unwatch(key.data)
+
+        with self.lock:
+            procs += self.exited
+            self.exited = []
+        return procs
+
+    def unwatch(self, proc: Popen) -> None:
+        """Stop watching the given process.
+
+        Args:
+            proc: The process to be removed.
+        """
+
+        pidfd = self._pidfds.pop(proc.pid, None)
+        if pidfd is not None:
+            self.selector.unregister(pidfd)
+            os.close(pidfd)
+        with self.lock:
+            self._waiting.discard(proc.pid)
+
+    def close(self) -> None:
+        """Release all resources of this watcher."""
+
+        with self.lock:
+            self.closed = True
+        for pidfd in self._pidfds.values():
+            self.selector.unregister(pidfd)
+            os.close(pidfd)
+        self._pidfds = {}
+        self.selector.close()
+        os.close(self._rfd)
+        os.close(self._wfd)
+
+
+class LogTailer():
+    """Incrementally read a growing log file and match messages in new lines.
+
+    The file is read from the last offset on every poll, so each poll only costs the newly
+    written bytes. The file may not exist until the job writes it.
+
+    Attributes:
+        path: The log file path.
+        patterns: The messages to be matched.
+        offset: The offset of the first unread byte.
+        partial: The unfinished last line.
+    """
+
+    def __init__(self, path: str, patterns: List[str]):
+        self.path = path
+        self.patterns = patterns
+        self.offset = 0
+        self.partial = b''
+
+    def poll(self) -> List[str]:
+        """Read new lines and match the messages.
+
+        Returns:
+            A list of new lines that contain any of the messages.
+        """
+
+        try:
+            with open(self.path, 'rb') as filep:
+                filep.seek(self.offset)
+                data = filep.read()
+        except OSError:
+            return []
+        if not data:
+            return []
+        self.offset += len(data)
+
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        matched: List[str] = []
+        for raw_line in lines:
+            line = raw_line.decode('utf-8', errors='replace')
+            if any(line.find(msg) != -1 for msg in self.patterns):
+                matched.append(line)
+        return matched
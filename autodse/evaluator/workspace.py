@@ -0,0 +1,109 @@
+"""
+The module of job workspace creation.
+"""
+import errno
+import os
+import shutil
+from enum import Enum
+from typing import Dict, List, Optional
+
+from ..logger import get_eval_logger
+
+# The ioctl request to clone a file on Linux (FICLONE in linux/fs.h)
+FICLONE = 0x40049409
+
+# The errors indicating the file system cannot clone or link the file
+UNSUPPORTED_ERRNOS = set([
+    errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EOPNOTSUPP, errno.EPERM, errno.EMLINK,
+    getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)
+])
+
+
+class CloneMode(Enum):
+    """The way to populate files in a new workspace.
+
+    COPY: Copy the file data.
+    HARDLINK: Share the file with a hard link. Only safe when the files will be replaced
+              instead of being modified in place.
+    REFLINK: Share the file data with copy-on-write (e.g., on Btrfs and XFS).
+
+    A file is copied if the file system does not support linking or cloning it.
+    """
+    COPY = 0
+    HARDLINK = 1
+    REFLINK = 2
+
+
+def reflink(src: str, dest: str) -> None:
+    """Clone a file with copy-on-write.
+
+    Args:
+        src: The source file.
+        dest: The destination file.
+
+    Raises:
+        OSError: The platform or the file system does not support cloning.
+    """
+    try:
+        import fcntl
+    except ImportError as err:
+        raise OSError(errno.EOPNOTSUPP, 'Reflink is not supported on this platform') from err
+
+    with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+    shutil.copystat(src, dest)
+
+
+def clone_tree(src: str, dest: str, mode: CloneMode = CloneMode.REFLINK,
+               private_files: Optional[List[str]] = None) -> bool:
+    """Recursively populate a directory from the source with the given clone mode.
+
+    File modification times are preserved so that make-based flows see the same timestamps
+    as the source.
+
+    Args:
+        src: The source directory.
+        dest: The destination directory.
+        mode: The clone mode for each file.
+        private_files: The relative file paths that must be copied since they will be
+                       modified in place.
+
+    Returns:
+        Indicate if the clone was success or not.
+    """
+
+    log = get_eval_logger('Workspace')
+    if os.path.exists(dest):
+        shutil.rmtree(dest, ignore_errors=True)
+
+    privates = set([os.path.normpath(os.path.join(src, f)) for f in private_files or []])
+
+    # Stop trying to link or clone once the file system does not support it
+    supported: Dict[str, bool] = {'link': mode != CloneMode.COPY}
+
+    def clone_file(src_file: str, dest_file: str) -> str:
+        if supported['link'] and os.path.normpath(src_file) not in privates:
+            try:
+                if mode == CloneMode.HARDLINK:
+                    os.link(src_file, dest_file)
+                else:
+                    reflink(src_file, dest_file)
+                return dest_file
+            except OSError as err:
+                if err.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                log.debug('Fall back to copy files: %s', str(err))
+                supported['link'] = False
+                if os.path.exists(dest_file):
+                    os.remove(dest_file)
+        return shutil.copy2(src_file, dest_file)
+
+    try:
+        shutil.copytree(src, dest, copy_function=clone_file)
+    except shutil.Error as err:  # Directories are the same
+        log.error('Directory not cloned. Error: %s', str(err))
+        return False
+    except OSError as err:  # Any error saying that the directory doesn't exist
+        log.error('Directory not cloned. Error: %s', str(err))
+        return False
+    return True
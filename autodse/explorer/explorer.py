@@ -1,15 +1,43 @@
 """
 The main module of explorer.
 """
+import math
 import time
-from typing import Any, Dict, Generator, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from threading import Event, Lock
+from typing import Any, Dict, Generator, List, Optional, Tuple
 
 from .algorithmfactory import AlgorithmFactory
 from ..evaluator.evaluator import Evaluator
 from ..logger import get_algo_logger
 from ..database import Database
 from ..parameter import DesignPoint, DesignSpace, gen_key_from_design_point
-from ..result import Job, Result
+from ..result import HLSResult, Job, Result
+
+
+def get_top_hls_results(results: List[Result], num: int) -> List[HLSResult]:
+    """Rank the valid HLS results by 1) quality and 2) geomean of resource utilization.
+
+    Args:
+        results: The results to be ranked.
+        num: The number of results to be returned.
+
+    Returns:
+        The top results in descending order.
+    """
+
+    def geomean(seq):
+        """A simple function to compute geometric mean of a list"""
+        return math.exp(math.fsum(math.log(x) if x > 0 else 0 for x in seq) / len(seq))
+
+    hls_results: List[HLSResult] = [
+        r for r in results
+        if isinstance(r, HLSResult) and r.valid and r.ret_code != Result.RetCode.DUPLICATED
+    ]
+    hls_results.sort(key=lambda r: (r.quality, 1.0 / geomean(
+        [v for k, v in r.res_util.items() if k.startswith('util')])),
+                     reverse=True)
+    return hls_results[:num]
 
 
 class Explorer():
@@ -57,6 +85,7 @@ class Explorer():
         if job:
             if not self.evaluator.apply_design_point(job, point):
                 return None
+            job.tag = self.tag
         else:
             self.log.error('Fail to create a new job (disk space?)')
             return None
@@ -88,7 +117,8 @@ class FastExplorer(Explorer):
     """
     Fast explorer uses serach algorithm to find the best point in a large design space. For each
     explored point, it runs level 1 and level 2 evaluation to get an estimated QoR in a relative
-    short time.
+    short time. Each point goes through both levels on its own, so the level 2 evaluation of a
+    point starts as soon as its level 1 evaluation passes.
 
     Attributes:
         timeout: Timeout in seconds for each job evaluation.
@@ -110,6 +140,27 @@ class FastExplorer(Explorer):
         self.timeout = timeout * 60.0
         self.ds = ds
 
+    def evaluate_point(self, job: Job) -> Tuple[str, Result, int]:
+        """Evaluate a design point with level 1 and then level 2 if level 1 passed.
+
+        The level 2 evaluation reuses the job folder of level 1 to resume from its outputs.
+
+        Args:
+            job: The applied job of the design point.
+
+        Returns:
+            The key, the result of the last evaluated level, and the last evaluated level.
+        """
+
+        job.reuse = True
+        key, result = self.evaluator.submit([job], 1)[0]
+        job.reuse = False
+        if result.ret_code != Result.RetCode.PASS:
+            return (key, result, 1)
+
+        key, result = self.evaluator.submit([job], 2)[0]
+        return (key, result, 2)
+
     def run(self, algo_config: Dict[str, Any]) -> None:
         #pylint:disable=missing-docstring
 
@@ -147,15 +198,15 @@ class FastExplorer(Explorer):
                     keys.append(key)
 
             lv1_keys = ['lv1:{0}'.format(key) for key in keys]
-            for point, result in zip(next_points, self.db.batch_query(lv1_keys)):
-                key = gen_key_from_design_point(point)
+            point_map = {gen_key_from_design_point(point): point for point in next_points}
+            for key, result in zip(keys, self.db.batch_query(lv1_keys)):
                 if result is not None:
                     # Already has Merlin result, skip
                     self.update_best(result)
                     results[key] = result
                 else:
                     # No result in the DB, generate
-                    job = self.create_job_and_apply_point(point)
+                    job = self.create_job_and_apply_point(point_map[key])
                     if job:
                         jobs.append(job)
                     else:
@@ -168,26 +219,18 @@ class FastExplorer(Explorer):
 
             duplicated_iters = 0
 
-            # Evaluate design points using level 1 to fast check if it is suitable for HLS
-            self.log.debug('Evaluating %d design points: Level 1', len(jobs))
-            pending: List[Job] = []
-            for key, result in self.evaluator.submit(jobs, 1):
-                if result.ret_code == Result.RetCode.PASS:
-                    job = self.create_job_and_apply_point(result.point)
-                    if job:
-                        pending.append(job)
-                    else:
-                        return
-                else:
-                    results[key] = result
-
-            if pending:
-                # Evaluate design points using level 2 that runs HLS
-                self.log.debug('Evaluating %d design points: Level 2', len(pending))
-                for key, result in self.evaluator.submit(pending, 2):
+            # Evaluate design points through level 1 (fast check if it is suitable for HLS) and
+            # level 2 (HLS). The global worker pool limits the number of running jobs.
+            self.log.debug('Evaluating %d design points: Level 1 and 2', len(jobs))
+            hls_cnt = 0
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                futures = [executor.submit(self.evaluate_point, job) for job in jobs]
+                for future in as_completed(futures):
+                    key, result, eval_lv = future.result()
                     self.update_best(result)
                     results[key] = result
-            else:
+                    hls_cnt += 1 if eval_lv == 2 else 0
+            if hls_cnt == 0:
                 self.log.info('All points are stopped at level 1')
 
             self.explored_point += len(jobs)
@@ -239,6 +282,18 @@ class AccurateExplorer(Explorer):
         batch_size = int(algo_config['exhaustive']['batch-size'])
         self.log.info('Batch size is set to %d', batch_size)
 
+        # Skip the points that have been evaluated (e.g., by the speculative bitgen)
+        lv3_keys = ['lv3:{0}'.format(gen_key_from_design_point(p)) for p in self.points]
+        points = []
+        for point, result in zip(self.points, self.db.batch_query(lv3_keys)):
+            if result is not None and result.ret_code != Result.RetCode.CANCELLED:
+                self.update_best(result)
+            else:
+                points.append(point)
+        if len(points) < len(self.points):
+            self.log.info('%d points have been evaluated', len(self.points) - len(points))
+        self.points = points
+
         for points in list(chunk(self.points, batch_size)):
             # Create jobs
             jobs: List[Job] = []
@@ -258,3 +313,147 @@ class AccurateExplorer(Explorer):
             self.db.commit('meta-expr-cnt-accurate', self.explored_point)
 
         self.log.info('Explored %d points', self.explored_point)
+
+
+class SpeculativeExplorer(Explorer):
+    """
+    Speculatively evaluate the best HLS results with bitgen while the fast exploration is
+    running, so that the long P&R runs of the accurate exploration start early. The explorer
+    periodically ranks the HLS results in the database and evaluates the top ones. Bitgen jobs
+    of the points that drop out of the top are cancelled. The workers for this explorer should
+    have a lower share of the worker pool so that the fast exploration is not slowed down.
+
+    Attributes:
+        top_k: The number of the best HLS results to be evaluated.
+        interval: The interval in seconds to rank the HLS results.
+        lock: The lock of the running jobs.
+        stop_event: The event to stop launching new jobs.
+        executor: The thread pool to submit jobs.
+        running: The job and its future of each speculatively evaluated point.
+    """
+
+    def __init__(self, db: Database, evaluator: Evaluator, tag: str, top_k: int,
+                 interval: float = 60):
+        """Constructor.
+
+        Args:
+            db: Database.
+            evaluator: Evaluator.
+            tag: A unique tag.
+            top_k: The number of the best HLS results to be evaluated.
+            interval: The interval in seconds to rank the HLS results.
+        """
+        super(SpeculativeExplorer, self).__init__(db, evaluator, tag)
+        self.top_k = top_k
+        self.interval = interval
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.running: Dict[str, Tuple[Job, Future]] = {}
+
+    def collect(self, key: str, job: Job, future: Future) -> None:
+        """Wait for a bitgen job and check its result. A job that raises an error is committed
+        as a failed result.
+
+        Args:
+            key: The key of the design point.
+            job: The job.
+            future: The future of the job.
+        """
+
+        try:
+            results = [result for _, result in future.result()]
+        except Exception as err:  # pylint:disable=broad-except
+            self.log.error('Failed to evaluate %s with bitgen: %s', key, str(err))
+            result = Result('UNAVAILABLE')
+            result.point = job.point
+            self.db.commit('lv3:{0}'.format(key), result)
+            results = [result]
+        for result in results:
+            self.update_best(result)
+
+    def update(self, points: List[DesignPoint], launch: bool = True) -> None:
+        """Cancel the jobs that are not in the given points and launch the new ones.
+        The caller must hold the lock.
+
+        Args:
+            points: The points to be evaluated.
+            launch: Whether to launch the jobs of new points.
+        """
+
+        point_map = {gen_key_from_design_point(point): point for point in points}
+
+        # Cancel the jobs that drop out of the top. A cancelled job is kept in the running map
+        # until it stops so that its point will not be launched twice.
+        for key, (job, future) in list(self.running.items()):
+            if future.done():
+                del self.running[key]
+                self.collect(key, job, future)
+            elif key not in point_map and not job.cancelled:
+                self.log.info('Cancel the bitgen of %s', key)
+                self.evaluator.scheduler.cancel(job)
+
+        if not launch:
+            return
+
+        assert self.executor is not None
+        lv3_keys = ['lv3:{0}'.format(key) for key in point_map]
+        for (key, point), result in zip(point_map.items(), self.db.batch_query(lv3_keys)):
+            if key in self.running or (result is not None
+                                       and result.ret_code != Result.RetCode.CANCELLED):
+                continue
+            new_job: Optional[Job] = self.create_job_and_apply_point(point)
+            if not new_job:
+                return
+            self.log.info('Launch the bitgen of %s', key)
+            future = self.executor.submit(self.evaluator.submit, [new_job], 3)
+            self.running[key] = (new_job, future)
+            self.explored_point += 1
+
+    def finish(self, points: List[DesignPoint]) -> List[DesignPoint]:
+        """Stop launching new jobs and cancel the jobs that are not in the given points.
+
+        Args:
+            points: The final points to be evaluated.
+
+        Returns:
+            The points that are not being evaluated by this explorer.
+        """
+
+        with self.lock:
+            self.stop_event.set()
+            self.update(points, launch=False)
+
+            # The cancelled jobs of the final points are evaluated again by the accurate
+            # exploration once they stop
+            keys = set([gen_key_from_design_point(p) for p in points])
+            for key, (job, future) in list(self.running.items()):
+                if key in keys and job.cancelled:
+                    self.collect(key, job, future)
+                    del self.running[key]
+            return [p for p in points if gen_key_from_design_point(p) not in self.running]
+
+    def run(self, algo_config: Dict[str, Any]) -> None:
+        #pylint:disable=missing-docstring
+
+        if self.top_k <= 0:
+            self.log.info('No HLS result to be evaluated by speculative bitgen')
+            return
+
+        self.log.info('Launch speculative bitgen of the top %d HLS results', self.top_k)
+        with ThreadPoolExecutor(max_workers=self.top_k) as executor:
+            self.executor = executor
+            while not self.stop_event.wait(self.interval):
+                with self.lock:
+                    if self.stop_event.is_set():
+                        break
+                    results = get_top_hls_results(self.db.query_all(), self.top_k)
+                    self.update([r.point for r in results if r.point is not None])
+
+            # Wait for the jobs of the final points
+            with self.lock:
+                running = list(self.running.items())
+            for key, (job, future) in running:
+                self.collect(key, job, future)
+
+        self.log.info('Explored %d points', self.explored_point)
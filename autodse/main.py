@@ -4,14 +4,13 @@ The main DSE flow that integrates all modules
 import argparse
 import glob
 import json
-import math
 import os
 import shutil
 import sys
 import tempfile
 import time
 import traceback
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Any, Dict, List, Optional, Set
 
 from .config import build_config
@@ -19,12 +18,17 @@ from .database import Database, RedisDatabase
 from .dsproc.dsproc import compile_design_space, partition
 from .evaluator.analyzer import MerlinAnalyzer
 from .evaluator.evaluator import BackupMode, Evaluator, MerlinEvaluator
+from .evaluator.admission import AdmissionController
+from .evaluator.cache import EvalCache
 from .evaluator.scheduler import PythonSubprocessScheduler
-from .explorer.explorer import AccurateExplorer, FastExplorer
+from .evaluator.timeout import AdaptiveTimeout
+from .evaluator.workspace import CloneMode
+from .explorer.explorer import (AccurateExplorer, FastExplorer, SpeculativeExplorer,
+                                get_top_hls_results)
 from .logger import get_default_logger
-from .parameter import DesignPoint, DesignSpace
+from .parameter import DesignPoint, DesignSpace, get_default_point
 from .reporter import Reporter
-from .result import HLSResult, Result
+from .result import Result
 from .util import copy_dir
 
 
@@ -83,8 +87,13 @@ class Main():
         db: Database.
         evaluator: Evaluator.
         reporter: Reporter.
+        speculator: The explorer of speculative bitgen. None means disabled.
+        speculator_proc: The future of the running speculative bitgen explorer.
     """
 
+    # The weight of speculative bitgen jobs in the worker pool. Each partition has weight 1.
+    SPECULATIVE_WEIGHT = 0.25
+
     def __init__(self):
         """Constructor.
 
@@ -165,30 +174,76 @@ class Main():
         self.db.load()
 
         # Initialize evaluator with FAST mode
-        self.log.info('Initializing the evaluator')
-        self.evaluator = MerlinEvaluator(src_path=self.src_dir,
-                                         work_path=self.eval_dir,
-                                         db=self.db,
-                                         scheduler=PythonSubprocessScheduler(
-                                             self.config['evaluate']['worker-per-part']),
-                                         analyzer_cls=MerlinAnalyzer,
-                                         backup_mode=BackupMode[self.config['project']['backup']],
-                                         dse_config=self.config['evaluate'])
-        self.evaluator.set_timeout(self.config['timeout'])
-        self.evaluator.set_command(self.config['evaluate']['command'])
+        # All partitions share one worker pool. By default, the pool is resized to give each
+        # partition its own workers once the design space is partitioned.
+        max_workers = int(self.config['evaluate']['max-workers'])
+        if max_workers <= 0:
+            max_workers = int(self.config['evaluate']['worker-per-part'])
+        self.log.info('Initializing the evaluator with %d workers', max_workers)
+        self.evaluator = self.build_evaluator(self.config, self.src_dir, self.eval_dir, self.db,
+                                              max_workers)
 
         # Initialize reporter
         self.reporter = Reporter(self.config, self.db)
+        self.speculator: Optional[SpeculativeExplorer] = None
+        self.speculator_proc: Optional[Future] = None
 
         if self.args.mode.find('check') == -1:
+            # The HLS run for the scope map also evaluates the default point
             self.log.info('Building the scope map')
-            if not self.evaluator.build_scope_map():
+            ds = compile_design_space(self.config['design-space']['definition'], None)
+            default_point = get_default_point(ds) if ds is not None else None
+            if not self.evaluator.build_scope_map(default_point):
                 self.log.error('Failed to build the scope map. See eval.log for details')
                 sys.exit(1)
 
             # Display important configs
             self.reporter.log_config(self.args.mode)
 
+    @staticmethod
+    def build_evaluator(config: Dict[str, Any], src_path: str, work_path: str, db: Database,
+                        max_workers: int) -> MerlinEvaluator:
+        """Build the Merlin evaluator and its scheduler from the configurations.
+
+        Args:
+            config: Configuration.
+            src_path: Path of the user source project.
+            work_path: Path of the evaluation working space.
+            db: Database.
+            max_workers: The number of evaluation workers.
+
+        Returns:
+            The evaluator.
+        """
+
+        admission = None
+        if config['evaluate']['admission']['enable']:
+            admission = AdmissionController(
+                min_free_mem=float(config['evaluate']['admission']['min-free-mem']),
+                max_load=float(config['evaluate']['admission']['max-load']))
+        evaluator = MerlinEvaluator(src_path=src_path,
+                                    work_path=work_path,
+                                    db=db,
+                                    scheduler=PythonSubprocessScheduler(max_workers, admission),
+                                    analyzer_cls=MerlinAnalyzer,
+                                    backup_mode=BackupMode[config['project']['backup']],
+                                    dse_config=config['evaluate'])
+        evaluator.set_timeout(config['timeout'])
+        if config['evaluate']['adaptive-timeout']['enable']:
+            evaluator.set_adaptive_timeout(
+                AdaptiveTimeout(
+                    multiple=float(config['evaluate']['adaptive-timeout']['multiple']),
+                    min_samples=int(config['evaluate']['adaptive-timeout']['min-samples'])))
+        evaluator.set_command(config['evaluate']['command'])
+        evaluator.set_clone_mode(CloneMode[config['evaluate']['workspace']])
+        evaluator.set_analysis_workers(int(config['evaluate']['analysis-workers']))
+        if config['evaluate']['cache']['path']:
+            evaluator.set_eval_cache(
+                EvalCache(config['evaluate']['cache']['path'],
+                          max_size=float(config['evaluate']['cache']['size']),
+                          tool_version=str(config['evaluate']['cache']['tool-version'])))
+        return evaluator
+
     def init_workspace(self) -> Optional[str]:
         """Initialize the workspace.
 
@@ -277,10 +332,6 @@ class Main():
             A list of design points output by fast mode.
         """
 
-        def geomean(seq):
-            """A simple function to compute geometric mean of a list"""
-            return math.exp(math.fsum(math.log(x) if x > 0 else 0 for x in seq) / len(seq))
-
         if not os.path.exists(self.out_dir):
             os.makedirs(self.out_dir)
         out_fast_dir = os.path.join(self.out_dir, 'fast')
@@ -295,15 +346,8 @@ class Main():
         idx = 0
 
         # Sort the results by 1) quality and 2) geomean of resource util and take the first N
-        results: List[Result] = [
-            r for r in self.db.query_all()
-            if isinstance(r, HLSResult) and r.valid and r.ret_code != Result.RetCode.DUPLICATED
-        ]
-   
-        results.sort(key=lambda r: (r.quality, 1.0 / geomean(
-            [v for k, v in r.res_util.items() if k.startswith('util')])),
-                     reverse=True)
-        results = results[:int(self.config['project']['fast-output-num'])]
+        results = get_top_hls_results(self.db.query_all(),
+                                      int(self.config['project']['fast-output-num']))
         for result in results:
             job = self.evaluator.create_job()
             if not job:
@@ -352,9 +396,13 @@ class Main():
 
             self.log.info('%d explorers have been launched', len(pool))
 
-            timer: float = (time.time() - self.start_time) / 60.0  # in minutes
-            while any([not exe.done() for exe in pool]):
-                time.sleep(1)
+            # Wake up when any explorer finishes, or every second to refresh the status
+            meta_keys = ['meta-expr-cnt-part{0}'.format(idx) for idx in range(len(ds_list))]
+            running = set(pool)
+            while running:
+                _, running = wait(running, timeout=1, return_when=FIRST_COMPLETED)
+                timer = (time.time() - self.start_time) / 60.0  # in minutes
+
                 # Only keep the best result
                 while self.db.best_cache.qsize() > 1:
                     self.db.best_cache.get()
@@ -367,16 +415,15 @@ class Main():
                 else:
                     self.reporter.log_best()
 
+                    # Fetch the explored point counts of all partitions at once
                     count = 0
-                    for idx in range(len(ds_list)):
-                        part_cnt = self.db.query('meta-expr-cnt-{0}'.format('part{0}'.format(idx)))
+                    for part_cnt in self.db.batch_query(meta_keys):
                         if part_cnt:
                             try:
                                 count += int(part_cnt)
                             except ValueError:
                                 pass
                     self.reporter.print_status(timer, count)
-                timer += 0.0167
 
         if self.args.mode == 'complete-check':
             return []
@@ -445,7 +492,9 @@ class Main():
 
         # Fetch accurate results and sort by quality
         keys: List[str] = [k for k in self.db.query_keys() if k.startswith('lv3:')]
-        results: List[Result] = [r for r in self.db.batch_query(keys)]
+        results: List[Result] = [
+            r for r in self.db.batch_query(keys) if r.ret_code != Result.RetCode.CANCELLED
+        ]
         for result in results:
             assert result.point is not None
             assert result.path is not None
@@ -472,6 +521,42 @@ class Main():
         # Draw result distribution with Pareto curve
         self.reporter.draw_pareto_curve(os.path.join(out_accurate_dir, 'result_dist.pdf'), True)
 
+    def launch_speculative(self) -> None:
+        """Launch speculative bitgen of the best HLS results during the fast exploration."""
+
+        # Speculative jobs mostly use the workers that the explorers leave idle
+        if isinstance(self.evaluator.scheduler, PythonSubprocessScheduler):
+            self.evaluator.scheduler.pool.set_weight('speculative', self.SPECULATIVE_WEIGHT)
+
+        self.speculator = SpeculativeExplorer(db=self.db,
+                                              evaluator=self.evaluator,
+                                              tag='speculative',
+                                              top_k=int(self.config['project']['fast-output-num']))
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.speculator_proc = executor.submit(self.speculative_runner,
+                                               explorer=self.speculator,
+                                               config=self.config)
+        executor.shutdown(wait=False)
+        self.log.info('Speculative bitgen has been launched')
+
+    @staticmethod
+    def speculative_runner(explorer: SpeculativeExplorer, config: Dict[str, Any]) -> None:
+        """Perform speculative bitgen until the explorer is finished.
+
+        This is a static method that is supposed to be used for forking explorer threads.
+
+        Args:
+            explorer: The speculative explorer.
+            config: Configuration.
+        """
+
+        try:
+            explorer.run(config['search']['algorithm'])
+        except Exception as err:  # pylint:disable=broad-except
+            log = get_default_logger('DSE')
+            log.error('Encounter error during the speculative bitgen: %s', str(err))
+            log.error(traceback.format_exc())
+
     def launch_accurate(self, points: List[DesignPoint]) -> None:
         """Launch accurate exploration.
 
@@ -484,22 +569,27 @@ class Main():
             self.log.info('Backup mode is set to ALL to keep all P&R results')
             self.evaluator.backup_mode = BackupMode.BACKUP_ALL
 
+        # Keep the speculative bitgen of the target points running and evaluate the others
+        waits: List[Future] = []
+        if self.speculator is not None and self.speculator_proc is not None:
+            points = self.speculator.finish(points)
+            waits.append(self.speculator_proc)
+
         with ThreadPoolExecutor(max_workers=1) as executor:
             proc = executor.submit(self.accurate_runner,
                                    points=points,
                                    db=self.db,
                                    evaluator=self.evaluator,
                                    config=self.config)
+            waits.append(proc)
 
-            timer: float = (time.time() - self.start_time) / 60.0  # in minutes
-            while not proc.done():
-                time.sleep(1)
+            while wait(waits, timeout=1).not_done:
+                timer = (time.time() - self.start_time) / 60.0  # in minutes
                 count = self.db.query('meta-expr-cnt-accurate')
                 try:
                     self.reporter.print_status(timer, int(count), 2)
                 except (TypeError, ValueError):
                     self.reporter.print_status(timer, 0, 2)
-                timer += 0.0167
 
         # Backup database again
         self.db.persist()
@@ -540,6 +630,16 @@ class Main():
     def main(self) -> None:
         """The main function of the DSE flow."""
 
+        try:
+            self.run_flow()
+        finally:
+            # Stop the analysis processes. The evaluator is not built in the fast check mode.
+            if hasattr(self, 'evaluator'):
+                self.evaluator.set_analysis_workers(0)
+
+    def run_flow(self) -> None:
+        """Explore the design space and generate the outputs of the run mode."""
+
         # Compile design space
         self.log.info('Compiling design space')
         ds = compile_design_space(
@@ -568,12 +668,20 @@ class Main():
             self.log.info('Finish checking the design space (fast mode)')
             return
 
+        # Give each partition its own workers in the shared pool unless the size is specified
+        if int(self.config['evaluate']['max-workers']) <= 0:
+            max_workers = len(ds_list) * int(self.config['evaluate']['worker-per-part'])
+            self.log.info('Resizing the evaluator to %d workers', max_workers)
+            self.evaluator.scheduler.set_max_worker(max_workers)
+
         # TODO: profiling and pruning
 
         # Launch exploration
         try:
             if self.args.mode.find('dse') != -1:
                 self.log.info('Start the exploration')
+            if self.args.mode == 'accurate-dse' and self.config['project']['speculative-bitgen']:
+                self.launch_speculative()
             fast_points = self.launch_fast(ds_list)
         except KeyboardInterrupt:
             pass
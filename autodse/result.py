@@ -3,11 +3,28 @@ The definition of evaluation results
 """
 
 from enum import Enum
-from typing import Dict, List, NamedTuple, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
 
 from .parameter import DesignPoint
 
 
+class ResourceUsage(NamedTuple):
+    """The machine resources consumed by a job, including all its descendant processes"""
+    # Elapsed time in seconds
+    wall_time: float
+
+    # CPU time in seconds spent in user and kernel mode
+    cpu_user: float
+    cpu_sys: float
+
+    # Peak resident memory in MB
+    peak_rss: float
+
+    # Bytes read from and written to the file system
+    io_read: int
+    io_write: int
+
+
 class Job(object):
     """The info and properties of a job"""
 
@@ -21,10 +38,34 @@ class Job(object):
         self.point: Optional[DesignPoint] = None
         self.status: Job.Status = Job.Status.INIT
 
+        # The tag of the explorer that owns this job. Workers are fairly shared by tags.
+        self.tag: str = ''
+
+        # The resources consumed by the last run of this job (if available)
+        self.usage: Optional[ResourceUsage] = None
+
+        # The log messages that caused the last run of this job to be aborted early
+        self.reject_msgs: List[str] = []
+
+        # The hash of the source files after applying the design point
+        self.src_hash: Optional[str] = None
+
+        # Keep the job folder after a successful evaluation so that the next evaluation level
+        # can resume from its outputs
+        self.reuse: bool = False
+
+        # Set by the scheduler to stop the job as soon as possible
+        self.cancelled: bool = False
+
 
 class Result(object):
     """The base module of evaluation result"""
 
+    # Results are kept in large numbers by the database and the reporter, so their fields are
+    # slots without an instance dictionary
+    __slots__ = ('point', 'ret_code', 'valid', 'path', 'quality', 'perf', 'res_util',
+                 'eval_time', 'usage')
+
     class RetCode(Enum):
         PASS = 0
         UNAVAILABLE = -1
@@ -32,6 +73,7 @@ class Result(object):
         EARLY_REJECT = -3
         TIMEOUT = -4
         DUPLICATED = -5
+        CANCELLED = -6
 
     def __init__(self, ret_code_str: str = 'PASS'):
 
@@ -69,10 +111,35 @@ class Result(object):
         # Elapsed time for evaluation
         self.eval_time: float = 0.0
 
+        # The resources consumed by the evaluation job (if available)
+        self.usage: Optional[ResourceUsage] = None
+
+    @classmethod
+    def get_fields(cls) -> List[str]:
+        """Get the field names of this result class."""
+        return [name for klass in cls.__mro__ for name in getattr(klass, '__slots__', ())]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Gather the fields as a dictionary, which is also the state of the results pickled
+        before the fields became slots."""
+        return {name: getattr(self, name) for name in self.get_fields() if hasattr(self, name)}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # Results pickled by older versions may miss the fields added later or have the
+        # attributes that are no longer supported
+        fields = self.get_fields()
+        if any([name not in state for name in fields]):
+            type(self).__init__(self)
+        for name, val in state.items():
+            if name in fields:
+                setattr(self, name, val)
+
 
 class MerlinResult(Result):
     """The result after running Merlin transformations"""
 
+    __slots__ = ('criticals', 'code_hash', 'src_hash')
+
     def __init__(self, ret_code_str: str = 'PASS'):
         super(MerlinResult, self).__init__(ret_code_str)
 
@@ -82,6 +149,9 @@ class MerlinResult(Result):
         # The kernel code hash for recognizing duplications
         self.code_hash: Optional[str] = None
 
+        # The hash of the applied source files for recognizing duplications before transform
+        self.src_hash: Optional[str] = None
+
 
 class HierPathNode(NamedTuple):
     """The datastructure of hierarchy path node"""
@@ -93,6 +163,8 @@ class HierPathNode(NamedTuple):
 class HLSResult(Result):
     """The result after running the HLS"""
 
+    __slots__ = ('ordered_paths', )
+
     def __init__(self, ret_code_str: str = 'PASS'):
         super(HLSResult, self).__init__(ret_code_str)
 
@@ -103,6 +175,8 @@ class HLSResult(Result):
 class BitgenResult(Result):
     """The result after bit-stream generation"""
 
+    __slots__ = ('freq', )
+
     def __init__(self, ret_code_str: str = 'PASS'):
         super(BitgenResult, self).__init__(ret_code_str)
 
@@ -14,4 +14,5 @@ setup(
     include_package_data=True,
     platforms='any',
     install_requires=['argparse', 'pickledb', 'jsonpickle', 'redis', 'texttable', 'matplotlib'],
+    extras_require={'fast': ['orjson']},
 )
@@ -0,0 +1,5 @@
+  // Original: #pragma ACCEL parallel factor=8
+int __merlin_tmp_5 = 0;
+merlinL7: for (int i = 0; i < 128; ++i) {
+    a[i] = b[i] + __merlin_tmp_5;
+}
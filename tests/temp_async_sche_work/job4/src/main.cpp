@@ -0,0 +1,13 @@
+
+// WARNING: This case never stops so we can test timeout and interrupt.
+// Do not use this case anywhere else!
+#include <unistd.h>
+
+int main(void) {
+    
+    while (1) {
+        sleep(60);
+    }
+
+    return 0;
+}
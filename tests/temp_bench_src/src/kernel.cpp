@@ -0,0 +1,34 @@
+#define SIZE 4096
+
+#pragma ACCEL kernel
+void synthetic_kernel(float a[SIZE], float b[SIZE], float c[SIZE]) {
+#pragma ACCEL interface variable=a depth=4096 bus_bitwidth=auto{B_A}
+#pragma ACCEL interface variable=b depth=4096 bus_bitwidth=auto{B_B}
+#pragma ACCEL interface variable=c depth=4096 bus_bitwidth=auto{B_C}
+#pragma ACCEL pipeline auto{PIP_0_0}
+#pragma ACCEL parallel factor=auto{PAR_0_0}
+    for (int i0_0 = 0; i0_0 < 64; i0_0++) {
+#pragma ACCEL pipeline auto{PIP_0_1}
+#pragma ACCEL parallel factor=auto{PAR_0_1}
+        for (int i0_1 = 0; i0_1 < 64; i0_1++) {
+#pragma ACCEL pipeline auto{PIP_0_2}
+#pragma ACCEL parallel factor=auto{PAR_0_2}
+            for (int i0_2 = 0; i0_2 < 8; i0_2++) {
+                c[(i0_0 * 64 + i0_2) % SIZE] += a[i0_1] * b[i0_2];
+            }
+        }
+    }
+#pragma ACCEL pipeline auto{PIP_1_0}
+#pragma ACCEL parallel factor=auto{PAR_1_0}
+    for (int i1_0 = 0; i1_0 < 32; i1_0++) {
+#pragma ACCEL pipeline auto{PIP_1_1}
+#pragma ACCEL parallel factor=auto{PAR_1_1}
+        for (int i1_1 = 0; i1_1 < 64; i1_1++) {
+#pragma ACCEL pipeline auto{PIP_1_2}
+#pragma ACCEL parallel factor=auto{PAR_1_2}
+            for (int i1_2 = 0; i1_2 < 64; i1_2++) {
+                c[(i1_0 * 64 + i1_2) % SIZE] += a[i1_1] * b[i1_2];
+            }
+        }
+    }
+}
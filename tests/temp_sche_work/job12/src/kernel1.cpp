@@ -0,0 +1,10 @@
+unsigned int func(unsigned int, unsigned int);
+
+#pragma ACCEL kernel
+void kernel(int N, unsigned int *v1, unsigned int *v2, unsigned int *v3)
+{
+#pragma ACCEL parallel auto{R} factor=auto{PE}	
+	for (int i = 0; i < N; ++i) {
+		v3[i] = func(v1[i], v2[i]);
+	}
+}
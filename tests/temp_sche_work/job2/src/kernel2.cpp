@@ -0,0 +1,3 @@
+unsigned int func(unsigned int a, unsigned int b) {
+	return a + b;
+}
@@ -0,0 +1,26 @@
+
+#define SIZE 4096
+
+void kernel(int N, unsigned int *, unsigned int *, unsigned int *);
+
+int main(void) {
+    
+    unsigned int a[SIZE] = {0};
+    unsigned int b[SIZE] = {0};
+    unsigned int c[SIZE] = {0};
+
+    for (int i = 0; i < SIZE; ++i) {
+        a[i] = i;
+        b[i] = i / 2;
+    }
+
+    kernel(SIZE, a, b, c);
+
+    int err = 0;
+    for (int i = 0; i < SIZE; ++i) {
+        if (c[i] != a[i] + b[i])
+            err++;
+    }
+
+    return (err == 0)? 0: 2;
+}
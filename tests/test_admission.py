@@ -0,0 +1,106 @@
+"""
+The unit test module for admission controller.
+"""
+import os
+import shutil
+
+from autodse import logger
+from autodse.result import Result
+from autodse.util import copy_dir
+from autodse.evaluator.evaluator import Job
+from autodse.evaluator.admission import AdmissionController
+from autodse.evaluator.scheduler import PythonSubprocessScheduler
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_admission_controller(mocker):
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing AdmissionController start')
+
+    # Sample from /proc
+    if os.path.exists('/proc/meminfo'):
+        assert AdmissionController.get_available_mem() > 0
+        assert AdmissionController.get_load() >= 0
+
+    mem = mocker.patch('autodse.evaluator.admission.AdmissionController.get_available_mem',
+                       return_value=4096)
+    mocker.patch('autodse.evaluator.admission.AdmissionController.get_load', return_value=0)
+    ctrl = AdmissionController(min_free_mem=1024, max_load=0, ramp_time=60)
+
+    # Unknown footprint is admitted as long as the memory is enough
+    assert ctrl.reserve('hls')
+    assert ctrl.reserve('hls')
+    mem.return_value = 512
+    assert not ctrl.reserve('hls')
+
+    # Learn the peak memory from finished jobs
+    mem.return_value = 4096
+    ctrl.finish('hls', 1500)
+    assert ctrl.peak_mem['hls'] == 1500
+
+    # The predicted footprint of the new job and the recently launched jobs should fit
+    assert not ctrl.reserve('hls')
+    ctrl.recent = []
+    assert ctrl.reserve('hls')
+    ctrl.cancel('hls')
+    assert ctrl.running == 1
+
+    # Always admit a job when nothing is running
+    ctrl.finish('hls', 100)
+    assert ctrl.peak_mem['hls'] == 1500
+    mem.return_value = 0
+    assert ctrl.reserve('hls')
+    ctrl.finish('hls')
+
+    # Load limit
+    mem.return_value = 4096
+    ctrl = AdmissionController(min_free_mem=1024, max_load=1, ramp_time=0)
+    assert ctrl.reserve('hls')
+    mocker.patch('autodse.evaluator.admission.AdmissionController.get_load', return_value=1.2)
+    assert not ctrl.reserve('hls')
+
+    # Always admit jobs on the hosts without /proc
+    mocker.stopall()
+    mocker.patch('autodse.evaluator.admission.open', side_effect=OSError, create=True)
+    assert AdmissionController.get_available_mem() is None
+    assert AdmissionController.get_load() is None
+    ctrl = AdmissionController(min_free_mem=1e12, max_load=1e-6, ramp_time=60)
+    assert all([ctrl.reserve('hls') for _ in range(4)])
+
+    LOG.debug('=== Testing AdmissionController end')
+
+
+def test_scheduler_admission(test_dir, mocker):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing PythonSubprocessScheduler with admission start')
+
+    work_path = os.path.join(test_dir, 'temp_admission_work')
+    if os.path.exists(work_path):
+        shutil.rmtree(work_path)
+    os.mkdir(work_path)
+
+    jobs = []
+    ref_path = os.path.join(test_dir, 'temp_fixture/eval_src1')
+    for i in range(3):
+        job_path = os.path.join(work_path, 'job{0}'.format(i))
+        copy_dir(ref_path, job_path)
+        job = Job(job_path)
+        job.key = 'job{0}'.format(i)
+        job.status = Job.Status.APPLIED
+        jobs.append(job)
+
+    # The machine can only afford one job at a time
+    mocker.patch('autodse.evaluator.admission.AdmissionController.get_available_mem',
+                 return_value=0)
+    ctrl = AdmissionController(min_free_mem=1024)
+    sche = PythonSubprocessScheduler(4, ctrl)
+    sche.admission_interval = 0.1
+    rets = sche.run(jobs, ['test'], 'make')
+    assert all([ret == Result.RetCode.PASS for _, ret in rets])
+    assert ctrl.running == 0 and sche.pool.used == 0
+    assert ctrl.peak_mem['make'] > 0
+
+    LOG.debug('=== Testing PythonSubprocessScheduler with admission end')
@@ -1,12 +1,13 @@
 """
 The unit test module for analyzer.
 """
+import json
 import os
 import shutil
 
 from autodse import logger
 from autodse.util import copy_dir
-from autodse.evaluator.analyzer import MerlinAnalyzer
+from autodse.evaluator.analyzer import HotspotGraph, MerlinAnalyzer
 from autodse.evaluator.evaluator import Job
 from autodse.result import Result
 
@@ -175,3 +176,132 @@ def test_merlin_analyzer(test_dir):
     assert result.ret_code == Result.RetCode.UNAVAILABLE
 
     LOG.debug('=== Testing MerlinAnalyzer end')
+
+
+def test_merlin_log_summary(test_dir):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing Merlin log summary start')
+
+    work_path = os.path.join(test_dir, 'temp_anal_work')
+    job_path = os.path.join(work_path, 'job_log')
+    if os.path.exists(job_path):
+        shutil.rmtree(job_path)
+    os.makedirs(job_path)
+    job = Job(job_path)
+    assert MerlinAnalyzer.parse_merlin_log(job) is None
+
+    # One line may have multiple critical messages but is only recorded once
+    with open(os.path.join(job_path, 'merlin.log'), 'w') as filep:
+        filep.write("WARNING: [CGPIP-202] Coarse-grained pipelining NOT applied on loop; "
+                    "Coarse-grained parallelization NOT applied\n")
+        filep.write('INFO: [MERCC-1040] Compilation finished successfully\n')
+        filep.write('Total time: 1.50 seconds\n')
+        filep.write('INFO: [MERCC-1026] Estimation successfully.\n')
+        filep.write('Total time: 2.25 seconds\n')
+    summary = MerlinAnalyzer.parse_merlin_log(job)
+    assert summary is not None
+    assert summary.markers == set(['transform', 'hls'])
+    assert summary.eval_time == 3.75
+    assert len(summary.criticals) == 1
+    assert not summary.has_error and summary.freq == 0
+
+    bitgen_log_path = os.path.join(test_dir, 'temp_fixture/anal_rpts1')
+    shutil.copy(os.path.join(bitgen_log_path, 'success.log'), os.path.join(job_path, 'merlin.log'))
+    summary = MerlinAnalyzer.parse_merlin_log(job)
+    assert summary is not None
+    assert summary.markers == set(['transform', 'bitgen'])
+    assert abs(summary.eval_time - 13050.31) < 1e-6
+    assert summary.freq == 132.53
+    assert summary.res_util['total-LUT'] == 228537 and summary.res_util['util-BRAM'] == 0.55
+    assert not summary.has_error
+
+    shutil.copy(os.path.join(bitgen_log_path, 'fail.log'), os.path.join(job_path, 'merlin.log'))
+    summary = MerlinAnalyzer.parse_merlin_log(job)
+    assert summary is not None
+    assert summary.has_error and summary.freq == 0
+
+    LOG.debug('=== Testing Merlin log summary end')
+
+
+def test_merlin_code_hash(test_dir):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing Merlin code hash start')
+
+    job_path = os.path.join(test_dir, 'temp_anal_work', 'job_hash')
+    if os.path.exists(job_path):
+        shutil.rmtree(job_path)
+    lc_path = os.path.join(job_path, '.merlin_prj/run/implement/export/lc')
+    os.makedirs(lc_path)
+    job = Job(job_path)
+    assert MerlinAnalyzer.digest_kernel_code(job) is None
+
+    def digest(code, normalize):
+        with open(os.path.join(lc_path, '__merlinkerneltest.cpp'), 'w') as filep:
+            filep.write(code)
+        return MerlinAnalyzer.digest_kernel_code(job, normalize)
+
+    code1 = ('// Original: #pragma ACCEL parallel factor=4\n'
+             'int __merlin_tmp_3 = 0; /* generated\n'
+             '   buffer */\n'
+             'merlinL12: for (int i = 0; i < 256; ++i) {\n'
+             '    a[i] = b[i] + __merlin_tmp_3;  // copy\n'
+             '}\n')
+    code2 = ('  // Original: #pragma ACCEL parallel factor=8\n'
+             'int __merlin_tmp_5 = 0;\n'
+             'merlinL7: for (int i = 0; i < 256; ++i) {\n'
+             '    a[i] = b[i] + __merlin_tmp_5;\n'
+             '}\n')
+    code3 = code2.replace('256', '128')
+
+    # The digest has a fixed size no matter how large the kernel is
+    assert len(digest(code1 * 100, False)) == 64
+    assert digest(code1, False) != digest(code2, False)
+    assert digest(code1, True) == digest(code2, True)
+    assert digest(code2, True) != digest(code3, True)
+
+    LOG.debug('=== Testing Merlin code hash end')
+
+
+def test_hotspot_graph(test_dir):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing hotspot graph start')
+
+    rpt_path = os.path.join(test_dir, 'temp_fixture/anal_rpts0')
+    topo_path = os.path.join(rpt_path, 'topo_info.json')
+    info_path = os.path.join(rpt_path, 'final_info.json')
+    paths = MerlinAnalyzer.analyze_hotspot(topo_path, info_path)
+    assert len(paths) == 4
+    assert all([len(path) == 3 for path in paths])
+    assert all([node.is_compute_bound for node in paths[0]])
+
+    # Query the top-K paths with the loaded report
+    with open(info_path, 'r') as filep:
+        cycles = json.load(filep)
+    assert MerlinAnalyzer.analyze_hotspot(topo_path, '', cycles, 2) == paths[:2]
+
+    # A sub-function called by many call sites is only converted once
+    func = {'topo_id': 'F_1', 'type': 'function', 'name': 'sub', 'childs': []}
+    cycles = {'F_1': {'CYCLE_TOT': '10', 'CYCLE_UNIT': '10', 'org_identifier': 'F_1'}}
+    for idx in range(100):
+        loop_id = 'L_1_{0}'.format(idx)
+        func['childs'].append({'topo_id': loop_id, 'type': 'loop', 'name': '', 'childs': []})
+        cycles[loop_id] = {'CYCLE_TOT': str(idx), 'CYCLE_UNIT': '1', 'org_identifier': loop_id}
+    kernel = {'topo_id': 'F_0', 'type': 'kernel', 'name': 'top', 'childs': [],
+              'sub_functions': [func]}
+    cycles['F_0'] = {'CYCLE_TOT': '100', 'CYCLE_UNIT': '100', 'org_identifier': 'F_0'}
+    for idx in range(1000):
+        call_id = 'C_{0}'.format(idx)
+        kernel['childs'].append({'topo_id': call_id, 'type': 'callfunction', 'name': 'sub',
+                                 'childs': []})
+        cycles[call_id] = {'CYCLE_TOT': '10', 'CYCLE_UNIT': '10', 'org_identifier': call_id}
+    graph = HotspotGraph(cycles, [kernel])
+    assert len(graph.nodes) == 1 + 1000 + 1 + 100
+
+    # The most critical path goes through the slowest loop of the sub-function
+    path = next(graph.iter_all_paths())
+    assert [node.nid for node in path] == ['L_1_99', 'F_1', 'C_0', 'F_0']
+
+    LOG.debug('=== Testing hotspot graph end')
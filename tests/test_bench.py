@@ -0,0 +1,140 @@
+"""
+The unit test module for the fake Merlin compiler and the benchmark.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+from autodse import logger
+from autodse.bench import fakemerlin
+from autodse.bench.benchmark import gen_synthetic_project, run_benchmark, summarize
+from autodse.bench.redisbench import run_redis_benchmark
+from autodse.config import build_config
+from autodse.database import PickleDatabase
+from autodse.evaluator.analyzer import MerlinAnalyzer
+from autodse.result import Job, Result
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_fake_merlin(test_dir):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing fake Merlin compiler start')
+
+    work_path = os.path.join(test_dir, 'temp_bench_work')
+    if os.path.exists(work_path):
+        shutil.rmtree(work_path)
+    gen_synthetic_project(work_path, 2)
+    with open(os.path.join(work_path, 'config.json'), 'r') as filep:
+        config = build_config(json.load(filep))
+    assert config is not None
+
+    # Apply the default point
+    params = config['design-space']['definition']
+    src_file = os.path.join(work_path, 'src', 'kernel.cpp')
+    with open(src_file, 'r') as filep:
+        code = filep.read()
+    auto_map = {}
+    for idx, line in enumerate(code.split('\n')):
+        autos = re.findall(r'auto{(\w+)}', line)
+        if autos:
+            auto_map['kernel.cpp:{0}'.format(idx + 1)] = autos
+    with open(src_file, 'w') as filep:
+        filep.write(re.sub(r'auto{(\w+)}', lambda m: str(params[m.group(1)]['default']), code))
+
+    kernels = fakemerlin.parse_project(work_path)
+    assert len(kernels) == 1 and len(kernels[0].loops) == 2
+    assert all([len(loop.iter_loops()) == 3 for loop in kernels[0].loops])
+
+    job = Job(work_path)
+    for mode in ['transform', 'hls', 'bitgen']:
+        subprocess.run([sys.executable, fakemerlin.__file__, mode, '--delay', '0'],
+                       cwd=work_path,
+                       check=True)
+    result = MerlinAnalyzer.analyze(job, 'transform', config['evaluate'])
+    assert result is not None and result.valid and result.code_hash
+
+    result = MerlinAnalyzer.analyze(job, 'hls', config['evaluate'])
+    assert result is not None and result.valid and result.perf > 0
+    assert result.ordered_paths
+
+    # Hotspots are mapped to the design parameters of the loops
+    scope_map = MerlinAnalyzer.analyze_scope(job, auto_map)
+    assert scope_map is not None
+    assert all([scope != ['UNKNOWN'] for scope in scope_map.values()])
+    hotspots = set([node.nid for path in result.ordered_paths for node in path])
+    assert set(scope_map['PAR_0_2']) <= hotspots
+
+    result = MerlinAnalyzer.analyze(job, 'bitgen', config['evaluate'])
+    assert result is not None and result.valid and result.freq > 0
+    assert result.ret_code == Result.RetCode.PASS
+
+    LOG.debug('=== Testing fake Merlin compiler end')
+
+
+def test_benchmark(test_dir):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing benchmark start')
+
+    src_path = os.path.join(test_dir, 'temp_bench_src')
+    work_path = os.path.join(test_dir, 'temp_bench_work')
+    if os.path.exists(src_path):
+        shutil.rmtree(src_path)
+    gen_synthetic_project(src_path, 2)
+    with open(os.path.join(src_path, 'config.json'), 'r') as filep:
+        user_config = json.load(filep)
+
+    # Analyze the finished jobs in other processes
+    user_config['evaluate.analysis-workers'] = 2
+    metrics = run_benchmark(src_path, work_path, user_config, 4, 0, 0.05)
+    assert os.path.exists(os.path.join(work_path, 'bench.json'))
+    assert metrics['points'] > 0
+    assert 0 < metrics['worker-utilization'] <= 1
+    assert metrics['best-perf'] is not None and metrics['time-to-best'] is not None
+
+    db = PickleDatabase('bench', os.path.join(work_path, 'result.db'))
+    db.load()
+    lv2_results = [db.query(key) for key in db.query_keys() if key.startswith('lv2:')]
+    assert any([r.ret_code == Result.RetCode.PASS and r.perf > 0 for r in lv2_results])
+
+    # The best quality is reached at its first occurrence
+    trace_path = os.path.join(work_path, 'trace.jsonl')
+    with open(trace_path, 'a') as filep:
+        record = {'mode': 'hls', 'start': 1, 'end': 2, 'perf': 1, 'critical': False}
+        record['util'] = {'LUT': 0.1, 'FF': 0.1, 'BRAM': 0.1, 'DSP': 0.1}
+        filep.write(json.dumps(record) + '\n')
+        record.update({'start': 3, 'end': 5})
+        filep.write(json.dumps(record) + '\n')
+        record.update({'start': 4, 'end': 6, 'perf': 0, 'critical': True})
+        filep.write(json.dumps(record) + '\n')
+    metrics = summarize(trace_path, 1, 11, 1, {'LUT': 0.8})
+    assert metrics['best-perf'] == 1 and metrics['time-to-best'] == 1
+
+    LOG.debug('=== Testing benchmark end')
+
+
+def test_redis_benchmark():
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing Redis benchmark start')
+
+    import redis
+    try:
+        redis.StrictRedis(host='localhost', port=6379).ping()
+    except redis.ConnectionError:
+        LOG.warning('The Redis benchmark is skipped since no Redis server is running.')
+        return
+
+    metrics = run_redis_benchmark(200, batch_size=64)
+
+    # Each operation takes constant round trips regardless of the database size
+    for name in ['commit', 'query', 'query-missing', 'batch_commit', 'batch_query', 'count']:
+        assert metrics[name]['round-trips-per-op'] == 1
+    assert metrics['persist']['round-trips-per-op'] <= 200 / 64 + 1
+
+    LOG.debug('=== Testing Redis benchmark end')
@@ -0,0 +1,96 @@
+"""
+The unit test module for evaluation cache.
+"""
+import os
+
+from autodse import logger
+from autodse.evaluator.cache import EvalCache, digest_tree
+from autodse.evaluator.workspace import CloneMode, clone_tree
+from autodse.result import HLSResult
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_digest_tree(tmpdir):
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing digest_tree start')
+
+    src = os.path.join(str(tmpdir), 'src')
+    os.makedirs(os.path.join(src, 'sub'))
+    for name in ['kernel.cpp', 'sub/data.txt']:
+        with open(os.path.join(src, name), 'w') as filep:
+            filep.write(name)
+
+    digest = digest_tree(src)
+    assert digest == digest_tree(src)
+    assert digest_tree(src, set(['kernel.cpp'])) != digest
+
+    with open(os.path.join(src, 'sub/data.txt'), 'w') as filep:
+        filep.write('changed')
+    assert digest_tree(src) != digest
+
+    LOG.debug('=== Testing digest_tree end')
+
+
+def test_eval_cache(tmpdir):
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing EvalCache start')
+
+    cache_path = os.path.join(str(tmpdir), 'cache')
+    cache = EvalCache(cache_path, max_size=1, tool_version='v1')
+    digest = cache.get_digest('tree', 'make mcc_estimate', 'hls')
+    assert digest != cache.get_digest('tree', 'make mcc_estimate', 'transform')
+    assert digest != EvalCache(cache_path, tool_version='v2').get_digest(
+        'tree', 'make mcc_estimate', 'hls')
+
+    # Store a result with its artifacts
+    job_path = os.path.join(str(tmpdir), 'job')
+    os.makedirs(os.path.join(job_path, 'report'))
+    for name in ['merlin.log', 'report/perf.json', 'kernel.cpp']:
+        with open(os.path.join(job_path, name), 'w') as filep:
+            filep.write(name)
+    result = HLSResult()
+    result.perf = 100
+    assert cache.lookup(digest, job_path) is None
+    assert cache.store(digest, result, job_path, ['merlin.log', 'report'])
+    assert not cache.store(digest, result, job_path, ['merlin.log', 'report'])
+
+    # A new cache instance (e.g., another DSE run) restores the result and artifacts
+    cache = EvalCache(cache_path, max_size=1, tool_version='v1')
+    assert cache.size > 0
+    new_job_path = os.path.join(str(tmpdir), 'new_job')
+    os.makedirs(new_job_path)
+    cached = cache.lookup(digest, new_job_path)
+    assert cached is not None and cached.perf == 100
+    assert os.path.exists(os.path.join(new_job_path, 'merlin.log'))
+    assert os.path.exists(os.path.join(new_job_path, 'report/perf.json'))
+    assert not os.path.exists(os.path.join(new_job_path, 'kernel.cpp'))
+
+    # Evict the least recently used entries when the cache is full
+    digests = [cache.get_digest('tree{0}'.format(i), 'make', 'hls') for i in range(3)]
+    with open(os.path.join(job_path, 'merlin.log'), 'w') as filep:
+        filep.write('x' * 400 * 1024)
+    for idx, new_digest in enumerate(digests):
+        assert cache.store(new_digest, result, job_path, ['merlin.log'])
+        os.utime(cache.get_entry_path(new_digest), (1000000 + idx, 1000000 + idx))
+    assert cache.lookup(digests[0], new_job_path) is None
+    assert cache.lookup(digests[2], new_job_path) is not None
+    assert cache.size <= 1024 * 1024
+
+    # Restoring the artifacts to a hard-linked job does not change the source project
+    src_path = os.path.join(str(tmpdir), 'src')
+    os.makedirs(src_path)
+    with open(os.path.join(src_path, 'merlin.log'), 'w') as filep:
+        filep.write('user log')
+    link_job_path = os.path.join(str(tmpdir), 'link_job')
+    assert clone_tree(src_path, link_job_path, CloneMode.HARDLINK)
+    assert cache.lookup(digests[2], link_job_path) is not None
+    with open(os.path.join(src_path, 'merlin.log'), 'r') as filep:
+        assert filep.read() == 'user log'
+    with open(os.path.join(link_job_path, 'merlin.log'), 'r') as filep:
+        assert filep.read() == 'x' * 400 * 1024
+    assert os.listdir(link_job_path) == ['merlin.log']
+
+    LOG.debug('=== Testing EvalCache end')
@@ -0,0 +1,83 @@
+"""
+The unit test module for the result codec.
+"""
+import copyreg
+import pickle
+
+from autodse import logger
+from autodse.codec import MAGIC, decode_value, encode_value
+from autodse.result import (BitgenResult, HierPathNode, HLSResult, MerlinResult, ResourceUsage,
+                            Result)
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_result_codec():
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing result codec start')
+
+    merlin = MerlinResult('EARLY_REJECT')
+    merlin.point = {'PAR': 4, 'PIP': 'cg', 'FLAG': True, 'BIG': 2**70}
+    merlin.criticals = ['Memory burst NOT inferred']
+    merlin.code_hash = 'abc'
+    merlin.usage = ResourceUsage(1.0, 2.0, 0.5, 128.0, 1024, 2048)
+    try:
+        merlin.key = 'adhoc'
+        assert False
+    except AttributeError:
+        pass
+
+    hls = HLSResult()
+    hls.point = {'PAR': 4, 'PIP': 'cg'}
+    hls.valid = True
+    hls.quality = 0.5
+    hls.perf = 2.0
+    hls.res_util['util-DSP'] = 0.25
+    kernel = HierPathNode('F_0', 100.0, False)
+    hls.ordered_paths = [[HierPathNode('L_0_{0}'.format(idx), idx, True), kernel]
+                         for idx in range(3)]
+
+    bitgen = BitgenResult('TIMEOUT')
+    bitgen.freq = 250.0
+    bitgen.path = '/tmp/job'
+
+    # All fields including ad-hoc attributes are restored
+    for result in [Result('UNAVAILABLE'), merlin, hls, HLSResult(), bitgen]:
+        data = encode_value(result)
+        assert data.startswith(MAGIC)
+        decoded = decode_value(data)
+        assert type(decoded) is type(result)
+        assert decoded.__getstate__() == result.__getstate__()
+
+    # The nodes shared by paths are encoded once and shared after decoding
+    decoded = decode_value(encode_value(hls))
+    assert decoded.ordered_paths[0][1] is decoded.ordered_paths[2][1]
+    assert len(encode_value(hls)) < len(pickle.dumps(hls))
+
+    # Other values and legacy pickled results are read by pickle
+    assert decode_value(encode_value({'P': ['L_0']})) == {'P': ['L_0']}
+    assert decode_value(pickle.dumps(hls)).__getstate__() == hls.__getstate__()
+
+    # Results pickled before the fields became slots may miss fields or have ad-hoc attributes
+    class LegacyResult():
+        #pylint:disable=too-few-public-methods, protected-access
+        def __reduce_ex__(self, protocol):
+            state = {'ret_code': Result.RetCode.PASS, 'valid': True, 'code_hash': 'abc'}
+            state['key'] = 'adhoc'
+            return (copyreg._reconstructor, (MerlinResult, object, None), state)
+
+    legacy = decode_value(pickle.dumps(LegacyResult()))
+    assert isinstance(legacy, MerlinResult) and legacy.valid and legacy.code_hash == 'abc'
+    assert legacy.src_hash is None and legacy.criticals == [] and not hasattr(legacy, 'key')
+
+    # Data from a newer codec or corrupted data are rejected
+    data = encode_value(hls)
+    for bad_data in [data[:2] + bytes([99]) + data[3:], data[:len(data) // 2]]:
+        try:
+            decode_value(bad_data)
+            assert False
+        except ValueError:
+            pass
+
+    LOG.debug('=== Testing result codec end')
@@ -2,8 +2,10 @@
 The unit test module for database.
 """
 import os
+import pickle
 
 from autodse import logger
+from autodse.codec import encode_value
 from autodse.database import PickleDatabase, RedisDatabase
 from autodse.result import HLSResult, Result
 
@@ -28,7 +30,7 @@ def database_tester(db_cls):
 
     # Commit a point
     point = HLSResult()
-    point.key = 'point0'
+    point.path = 'point0'
     point.valid = True
     point.quality = 5
     db.commit('point0', point)
@@ -36,11 +38,11 @@ def database_tester(db_cls):
 
     # Query the point
     point = db.query('point0')
-    assert point and point.key == 'point0'
+    assert point and point.path == 'point0'
 
     # Override a point
     point = HLSResult()
-    point.key = 'point0'
+    point.path = 'point0'
     point.valid = True
     point.quality = 10
     point.ret_code = Result.RetCode.PASS
@@ -51,7 +53,7 @@ def database_tester(db_cls):
 
     # Commit one more point
     point = HLSResult()
-    point.key = 'point1'
+    point.path = 'point1'
     point.valid = True
     point.quality = 20
     point.ret_code = Result.RetCode.PASS
@@ -61,7 +63,7 @@ def database_tester(db_cls):
 
     # Commit another point with the same quality
     point = HLSResult()
-    point.key = 'point2'
+    point.path = 'point2'
     point.valid = True
     point.quality = 20
     point.ret_code = Result.RetCode.PASS
@@ -72,7 +74,7 @@ def database_tester(db_cls):
 
     # Commit an invalid point
     point = HLSResult()
-    point.key = 'point3'
+    point.path = 'point3'
     point.valid = False
     point.quality = 20
     point.ret_code = Result.RetCode.TIMEOUT
@@ -111,6 +113,66 @@ def test_redis_database():
     database_tester(RedisDatabase)
 
 
+def test_redis_round_trips(tmpdir, mocker):
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing Redis round trips start')
+
+    import redis
+    client = mocker.MagicMock()
+    mocker.patch.object(redis, 'StrictRedis', return_value=client)
+    pipe = client.pipeline.return_value.__enter__.return_value
+    db_path = str(tmpdir.join('DB_test.db'))
+    db = RedisDatabase('DB_test', db_path, connection_pool=mocker.MagicMock(), batch_size=2)
+    client.reset_mock()
+
+    def round_trips():
+        # Each command sent by the client and each executed pipeline is a round trip
+        return len([c for c in client.method_calls if c[0] != 'pipeline']) + pipe.execute.call_count
+
+    # A batch is split into chunks that are sent in one pipeline
+    pairs = []
+    for idx in range(5):
+        result = HLSResult()
+        result.perf = idx + 1
+        pairs.append(('lv2:{0}'.format(idx), result))
+    db.batch_commit(pairs)
+    assert round_trips() == 1
+    assert [len(c[1]['mapping']) for c in pipe.hset.call_args_list] == [2, 2, 1]
+    pipe.hset.assert_called_with(db.db_id, mapping={'lv2:4': encode_value(pairs[4][1])})
+
+    client.reset_mock()
+    keys = [key for key, _ in pairs] + ['missing']
+    encoded = [encode_value(result) for _, result in pairs]
+    pipe.execute.return_value = [encoded[0:2], encoded[2:4], [encoded[4], None]]
+    results = db.batch_query(keys)
+    assert round_trips() == 1
+    assert [c[0][1] for c in pipe.hmget.call_args_list] == [keys[0:2], keys[2:4], keys[4:6]]
+    assert [r.perf for r in results[:5]] == [1, 2, 3, 4, 5] and results[5] is None
+
+    # A single query or a count is one command
+    client.reset_mock()
+    client.hget.return_value = encoded[1]
+    client.hlen.return_value = 5
+    assert db.query('lv2:1').perf == 2
+    assert db.count() == 5
+    client.hlen.assert_called_once_with(db.db_id)
+    assert round_trips() == 2
+
+    # Persisting streams the encoded values in chunks without decoding them
+    client.reset_mock()
+    client.hscan_iter.return_value = iter(zip(keys, encoded))
+    assert db.persist()
+    client.hscan_iter.assert_called_once_with(db.db_id, count=2)
+    assert round_trips() == 1
+    with open(db_path, 'rb') as filep:
+        assert pickle.load(filep) == dict(zip(keys, encoded))
+
+    del db
+
+    LOG.debug('=== Testing Redis round trips end')
+
+
 def test_pickle_database():
     #pylint:disable=missing-docstring
 
@@ -4,13 +4,17 @@ The unit test module for evaluator.
 import os
 import re
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 from autodse import database, logger
 from autodse.evaluator import analyzer, scheduler
+from autodse.evaluator.cache import EvalCache
 from autodse.evaluator.evaluator import BackupMode, Evaluator, MerlinEvaluator
-from autodse.result import BitgenResult, HLSResult, MerlinResult, Result
+from autodse.evaluator.timeout import AdaptiveTimeout
+from autodse.result import BitgenResult, HLSResult, MerlinResult, ResourceUsage, Result
 
 LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
 
@@ -19,8 +23,10 @@ LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
 def required_args(mocker):
     #pylint:disable=missing-docstring
 
-    def mock_run(jobs, keep_files, cmd, timeout):
+    def mock_run(jobs, keep_files, cmd, timeout, reject=None):
         #pylint:disable=missing-docstring,unused-argument
+        for job in jobs:
+            job.usage = ResourceUsage(1.0, 0.5, 0.1, 64.0, 0, 4096)
         return [(job.key, Result.RetCode.PASS) for job in jobs]
 
     sche = scheduler.Scheduler()
@@ -34,7 +40,7 @@ def required_args(mocker):
     return args
 
 
-def test_evaluator_phase1(required_args, test_dir, mocker):
+def test_evaluator_phase1(required_args, test_dir, tmpdir, mocker):
     #pylint:disable=redefined-outer-name
     """Test evaluator from initialization to deisgn point application"""
 
@@ -55,6 +61,14 @@ def test_evaluator_phase1(required_args, test_dir, mocker):
     assert len(eval_ins.src_files) == 1 and eval_ins.src_files[0] == 'src/kernel1.cpp'
     assert 'kernel1.cpp:6' in eval_ins.auto_map and len(eval_ins.auto_map['kernel1.cpp:6']) == 2
 
+    # Line numbers only count newlines even if the file has other line separators
+    src_path = tmpdir.mkdir('ff_src')
+    src_path.join('kernel.cpp').write('// page\x0cbreak\n#pragma ACCEL parallel factor=auto{PE}\n')
+    ff_ins = Evaluator(str(src_path), str(tmpdir.join('ff_work')), required_args['db'],
+                       required_args['scheduler'], required_args['analyzer_cls'],
+                       BackupMode.NO_BACKUP, required_args['dse_config'])
+    assert ff_ins.auto_map == {'kernel.cpp:2': ['PE']}
+
     # Create a job
     job = eval_ins.create_job()
     assert job is not None and len([f for _, _, f in os.walk(job.path)]) == 2
@@ -73,14 +87,25 @@ def test_evaluator_phase1(required_args, test_dir, mocker):
     job = eval_ins.create_job()
     point = {'PE': 4}
     assert eval_ins.apply_design_point(job, point)
+    with open('{0}/src/kernel1.cpp'.format(job.path), 'r') as filep:
+        assert re.findall(r'auto{(.*?)}', filep.read(), re.IGNORECASE) == ['R']
+    assert eval_ins.template_params == set(['PE', 'R'])
 
     # Fail to apply design point due to miss parameter in the kernel file
     job = eval_ins.create_job()
     point = {'PE': 4, 'R': '', 'some_param': 1}
     assert not eval_ins.apply_design_point(job, point)
 
+    # The applied source file is a private copy and other files are shared
+    src_path = '{0}/temp_fixture/eval_src1'.format(test_dir)
+    for file_name in os.listdir(job.path):
+        if os.path.isfile(os.path.join(job.path, file_name)):
+            shared = os.path.samefile(os.path.join(job.path, file_name),
+                                      os.path.join(src_path, file_name))
+            assert shared == (file_name not in eval_ins.src_files)
+
     # Fail to create a job due to OS error when copying files
-    mocker.patch('autodse.evaluator.evaluator.copy_dir', return_value=False)
+    mocker.patch('autodse.evaluator.evaluator.clone_tree', return_value=False)
     assert eval_ins.create_job() is None
 
     shutil.rmtree('{0}/temp_eval_work'.format(test_dir))
@@ -139,6 +164,7 @@ def test_evaluator_phase2(required_args, test_dir, mocker):
             eval_ins.apply_design_point(job0, point)
             results = eval_ins.submit([job0], 1)
             assert results[0][1].ret_code == Result.RetCode.PASS
+            assert results[0][1].usage.peak_rss == 64.0
             assert eval_ins.db.count() == 1
 
             job0 = eval_ins.create_job()
@@ -162,6 +188,7 @@ def test_evaluator_phase2(required_args, test_dir, mocker):
             results = eval_ins.submit([job1], 2)
             assert results[0][1].ret_code == Result.RetCode.DUPLICATED
             assert results[0][1].point['R'] == 'reduction=a'
+            assert results[0][1].usage is None
             assert eval_ins.db.count() == 4
 
         with mocker.patch('autodse.evaluator.analyzer.MerlinAnalyzer.analyze_scope',
@@ -306,3 +333,374 @@ def test_evaluator_phase3(required_args, test_dir, mocker):
             assert eval_ins.db.count() == 2
 
     LOG.debug('=== Testing evaluator phase 3 end')
+
+
+def test_evaluator_adaptive_timeout(required_args, test_dir, mocker):
+    #pylint:disable=redefined-outer-name
+    """Test the adaptive timeout learned from evaluation time"""
+
+    LOG.debug('=== Testing evaluator adaptive timeout start')
+
+    eval_ins = MerlinEvaluator('{0}/temp_fixture/eval_src1'.format(test_dir),
+                               '{0}/temp_eval_work'.format(test_dir), required_args['db'],
+                               required_args['scheduler'], required_args['analyzer_cls'],
+                               BackupMode.NO_BACKUP, required_args['dse_config'])
+    eval_ins.set_timeout({'transform': 3, 'hls': 30, 'bitgen': 480})
+    eval_ins.set_command({'transform': 'make mcc_acc'})
+    eval_ins.set_adaptive_timeout(AdaptiveTimeout(multiple=3, min_samples=2))
+
+    def mock_analyze_ok(job, mode, config):
+        #pylint:disable=unused-argument
+        result = MerlinResult()
+        result.valid = True
+        return result
+
+    mocker.patch.object(eval_ins.analyzer, 'desire', return_value=[])
+    mocker.patch.object(eval_ins.analyzer, 'analyze', side_effect=mock_analyze_ok)
+
+    # Use the configured timeout until we have enough samples
+    for pe_val in [1, 2]:
+        assert eval_ins.get_timeout('transform') == 3
+        job = eval_ins.create_job()
+        eval_ins.apply_design_point(job, {'PE': pe_val, 'R': ''})
+        eval_ins.submit([job], 1)
+
+    # The mocked scheduler reports 1 second wall time for each job
+    assert eval_ins.get_timeout('transform') == 3 * 1.0 / 60.0
+    assert eval_ins.get_timeout('hls') == 30
+    assert eval_ins.db.query('meta-eval-time-transform').count == 2
+
+    LOG.debug('=== Testing evaluator adaptive timeout end')
+
+
+def test_evaluator_reuse_job(required_args, test_dir, mocker):
+    #pylint:disable=redefined-outer-name
+    """Test reusing the level 1 job folder for level 2"""
+
+    LOG.debug('=== Testing evaluator job reuse start')
+
+    eval_ins = MerlinEvaluator('{0}/temp_fixture/eval_src1'.format(test_dir),
+                               '{0}/temp_eval_work'.format(test_dir), required_args['db'],
+                               required_args['scheduler'], required_args['analyzer_cls'],
+                               BackupMode.NO_BACKUP, required_args['dse_config'])
+    eval_ins.set_timeout({'transform': 3, 'hls': 30, 'bitgen': 480})
+    eval_ins.set_command({'transform': 'make mcc_acc', 'hls': 'make mcc_estimate'})
+
+    def mock_analyze(job, mode, config):
+        #pylint:disable=unused-argument
+        result = MerlinResult() if mode == 'transform' else HLSResult()
+        result.valid = True
+        return result
+
+    mocker.patch.object(eval_ins.analyzer, 'desire', return_value=[])
+    mocker.patch.object(eval_ins.analyzer, 'analyze', side_effect=mock_analyze)
+
+    # The folder of a successful job is kept for reuse
+    job = eval_ins.create_job()
+    eval_ins.apply_design_point(job, {'PE': 5, 'R': ''})
+    job.reuse = True
+    with open(os.path.join(job.path, 'merlin.log'), 'w') as filep:
+        filep.write('Compilation finished successfully\n')
+    assert eval_ins.submit([job], 1)[0][1].ret_code == Result.RetCode.PASS
+    assert os.path.exists(job.path)
+
+    # The level 1 log is kept aside and the folder is removed afterward
+    job.reuse = False
+    mock_run = mocker.spy(required_args['scheduler'], 'run')
+    assert eval_ins.submit([job], 2)[0][1].ret_code == Result.RetCode.PASS
+    assert mock_run.call_args[0][0] == [job]
+    assert not os.path.exists(job.path)
+
+    LOG.debug('=== Testing evaluator job reuse end')
+
+
+def test_evaluator_inflight_dedup(required_args, test_dir, mocker):
+    #pylint:disable=redefined-outer-name
+    """Test waiting for the running HLS of the same code"""
+
+    LOG.debug('=== Testing evaluator in-flight dedup start')
+
+    eval_ins = MerlinEvaluator('{0}/temp_fixture/eval_src1'.format(test_dir),
+                               '{0}/temp_eval_work'.format(test_dir), required_args['db'],
+                               required_args['scheduler'], required_args['analyzer_cls'],
+                               BackupMode.NO_BACKUP, required_args['dse_config'])
+    eval_ins.set_timeout({'transform': 3, 'hls': 30, 'bitgen': 480})
+    eval_ins.set_command({'hls': 'make mcc_estimate'})
+
+    def mock_analyze(job, mode, config):
+        #pylint:disable=unused-argument
+        result = HLSResult()
+        result.valid = True
+        result.perf = 100
+        return result
+
+    ran_keys = []
+
+    def mock_run(jobs, keep_files, cmd, timeout, reject=None):
+        #pylint:disable=unused-argument
+        ran_keys.extend([job.key for job in jobs])
+        time.sleep(0.5)
+        return [(job.key, Result.RetCode.PASS) for job in jobs]
+
+    mocker.patch.object(eval_ins.analyzer, 'desire', return_value=[])
+    mocker.patch.object(eval_ins.analyzer, 'analyze', side_effect=mock_analyze)
+    mocker.patch.object(eval_ins.scheduler, 'run', side_effect=mock_run)
+
+    # Two points with the same transformed code
+    jobs = []
+    for pe_val in [7, 8]:
+        job = eval_ins.create_job()
+        eval_ins.apply_design_point(job, {'PE': pe_val, 'R': ''})
+        lv1_result = MerlinResult()
+        lv1_result.valid = True
+        lv1_result.code_hash = 'same-code'
+        lv1_result.point = job.point
+        eval_ins.db.commit('lv1:{0}'.format(job.key), lv1_result)
+        jobs.append(job)
+
+    # Submit them from different threads at the same time
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(eval_ins.submit, [job], 2) for job in jobs]
+        rets = [future.result()[0][1] for future in futures]
+
+    assert len(ran_keys) == 1
+    assert sorted([r.ret_code for r in rets], key=lambda c: c.value) == [
+        Result.RetCode.DUPLICATED, Result.RetCode.PASS
+    ]
+    assert all([r.perf == 100 for r in rets])
+    assert set([r.point['PE'] for r in rets]) == set([7, 8])
+    assert not eval_ins.inflight
+
+    # A duplication submitted before the result is committed borrows the result as well
+    jobs = []
+    for pe_val in [9, 10]:
+        job = eval_ins.create_job()
+        eval_ins.apply_design_point(job, {'PE': pe_val, 'R': ''})
+        lv1_result = MerlinResult()
+        lv1_result.valid = True
+        lv1_result.code_hash = 'gap-code'
+        lv1_result.point = job.point
+        eval_ins.db.commit('lv1:{0}'.format(job.key), lv1_result)
+        jobs.append(job)
+
+    gap_rets = []
+    db_commit = eval_ins.db.batch_commit
+
+    def mock_commit(pairs):
+        if not gap_rets and 'lv2:{0}'.format(jobs[0].key) in [key for key, _ in pairs]:
+            gap_rets.append(eval_ins.submit([jobs[1]], 2)[0][1])
+        db_commit(pairs)
+
+    mocker.patch.object(eval_ins.db, 'batch_commit', side_effect=mock_commit)
+    del ran_keys[:]
+    ret = eval_ins.submit([jobs[0]], 2)[0][1]
+    assert ran_keys == [jobs[0].key]
+    assert ret.ret_code == Result.RetCode.PASS
+    assert gap_rets[0].ret_code == Result.RetCode.DUPLICATED and gap_rets[0].perf == 100
+    assert not eval_ins.inflight
+
+    LOG.debug('=== Testing evaluator in-flight dedup end')
+
+
+def test_evaluator_src_dedup(required_args, test_dir, mocker):
+    #pylint:disable=redefined-outer-name
+    """Test skipping transforms of the same applied source code"""
+
+    LOG.debug('=== Testing evaluator source dedup start')
+
+    eval_ins = MerlinEvaluator('{0}/temp_fixture/eval_src1'.format(test_dir),
+                               '{0}/temp_eval_work'.format(test_dir), required_args['db'],
+                               required_args['scheduler'], required_args['analyzer_cls'],
+                               BackupMode.NO_BACKUP, required_args['dse_config'])
+    eval_ins.set_timeout({'transform': 3, 'hls': 30, 'bitgen': 480})
+    eval_ins.set_command({'transform': 'make mcc_acc'})
+
+    def mock_analyze(job, mode, config):
+        #pylint:disable=unused-argument
+        result = MerlinResult()
+        result.valid = True
+        result.code_hash = 'code'
+        return result
+
+    ran_keys = []
+
+    def mock_run(jobs, keep_files, cmd, timeout, reject=None):
+        #pylint:disable=unused-argument
+        ran_keys.extend([job.key for job in jobs])
+        time.sleep(0.5)
+        return [(job.key, Result.RetCode.PASS) for job in jobs]
+
+    mocker.patch.object(eval_ins.analyzer, 'desire', return_value=[])
+    mocker.patch.object(eval_ins.analyzer, 'analyze', side_effect=mock_analyze)
+    mocker.patch.object(eval_ins.scheduler, 'run', side_effect=mock_run)
+
+    # The points only differ in a parameter that is not in the source code
+    jobs = []
+    for unused_val in [1, 2, 3]:
+        job = eval_ins.create_job()
+        eval_ins.apply_design_point(job, {'PE': 7, 'R': '', 'UNUSED': unused_val})
+        jobs.append(job)
+    assert len(set([job.src_hash for job in jobs])) == 1
+
+    # Submit the first two from different threads at the same time
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(eval_ins.submit, [job], 1) for job in jobs[:2]]
+        rets = [future.result()[0][1] for future in futures]
+    assert len(ran_keys) == 1
+    assert all([r.ret_code == Result.RetCode.PASS and r.code_hash == 'code' for r in rets])
+    assert all([r.src_hash == jobs[0].src_hash for r in rets])
+    assert set([r.point['UNUSED'] for r in rets]) == set([1, 2])
+    assert not eval_ins.src_inflight
+
+    # The last one reuses the committed result
+    ret = eval_ins.submit([jobs[2]], 1)[0][1]
+    assert len(ran_keys) == 1
+    assert ret.ret_code == Result.RetCode.PASS and ret.point['UNUSED'] == 3
+
+    # A duplication submitted before the result is committed borrows the result as well
+    jobs = []
+    for unused_val in [1, 2]:
+        job = eval_ins.create_job()
+        eval_ins.apply_design_point(job, {'PE': 8, 'R': '', 'UNUSED': unused_val})
+        jobs.append(job)
+
+    gap_rets = []
+    db_commit = eval_ins.db.batch_commit
+
+    def mock_commit(pairs):
+        if not gap_rets and 'lv1:{0}'.format(jobs[0].key) in [key for key, _ in pairs]:
+            gap_rets.append(eval_ins.submit([jobs[1]], 1)[0][1])
+        db_commit(pairs)
+
+    mocker.patch.object(eval_ins.db, 'batch_commit', side_effect=mock_commit)
+    del ran_keys[:]
+    ret = eval_ins.submit([jobs[0]], 1)[0][1]
+    assert ran_keys == [jobs[0].key]
+    assert ret.ret_code == Result.RetCode.PASS
+    assert gap_rets[0].ret_code == Result.RetCode.PASS and gap_rets[0].point['UNUSED'] == 2
+    assert not eval_ins.src_inflight
+
+    LOG.debug('=== Testing evaluator source dedup end')
+
+
+def test_evaluator_eval_cache(required_args, test_dir, tmpdir, mocker):
+    #pylint:disable=redefined-outer-name
+    """Test reusing results in the evaluation cache across DSE runs"""
+
+    LOG.debug('=== Testing evaluator evaluation cache start')
+
+    ran_keys = []
+
+    def mock_run(jobs, keep_files, cmd, timeout, reject=None):
+        #pylint:disable=unused-argument
+        for job in jobs:
+            ran_keys.append(job.key)
+            with open(os.path.join(job.path, 'merlin.log'), 'w') as filep:
+                filep.write('Compilation finished successfully\n')
+        return [(job.key, Result.RetCode.PASS) for job in jobs]
+
+    def mock_analyze(job, mode, config):
+        #pylint:disable=unused-argument
+        result = HLSResult()
+        result.valid = True
+        result.perf = 100
+        return result
+
+    cache_path = os.path.join(str(tmpdir), 'cache')
+    for run_idx in range(2):
+        # Each run has its own database
+        eval_ins = MerlinEvaluator('{0}/temp_fixture/eval_src1'.format(test_dir),
+                                   '{0}/temp_eval_work'.format(test_dir),
+                                   database.PickleDatabase('cache_test{0}'.format(run_idx)),
+                                   required_args['scheduler'], required_args['analyzer_cls'],
+                                   BackupMode.BACKUP_ALL, required_args['dse_config'])
+        eval_ins.set_timeout({'transform': 3, 'hls': 30, 'bitgen': 480})
+        eval_ins.set_command({'hls': 'make mcc_estimate'})
+        eval_ins.set_eval_cache(EvalCache(cache_path))
+        mocker.patch.object(eval_ins.analyzer, 'desire', return_value=['merlin.log'])
+        mocker.patch.object(eval_ins.analyzer, 'analyze', side_effect=mock_analyze)
+        mocker.patch.object(eval_ins.scheduler, 'run', side_effect=mock_run)
+
+        job = eval_ins.create_job()
+        eval_ins.apply_design_point(job, {'PE': 3, 'R': ''})
+        result = eval_ins.submit([job], 2)[0][1]
+        assert result.ret_code == Result.RetCode.PASS and result.perf == 100
+        assert os.path.exists(os.path.join(job.path, 'merlin.log'))
+
+    # Only the first run evaluated the job
+    assert len(ran_keys) == 1
+
+    LOG.debug('=== Testing evaluator evaluation cache end')
+
+
+def test_evaluator_build_scope_map(required_args, test_dir, mocker):
+    #pylint:disable=redefined-outer-name
+    """Test evaluating the default point when building the scope map"""
+
+    LOG.debug('=== Testing evaluator scope map start')
+
+    eval_ins = MerlinEvaluator('{0}/temp_fixture/eval_src1'.format(test_dir),
+                               '{0}/temp_eval_work'.format(test_dir), required_args['db'],
+                               required_args['scheduler'], required_args['analyzer_cls'],
+                               BackupMode.NO_BACKUP, required_args['dse_config'])
+    eval_ins.set_timeout({'transform': 3, 'hls': 30, 'bitgen': 480})
+    eval_ins.set_command({'hls': 'make mcc_estimate'})
+
+    def mock_analyze(job, mode, config):
+        #pylint:disable=unused-argument
+        result = MerlinResult() if mode == 'transform' else HLSResult()
+        result.valid = True
+        if mode == 'transform':
+            result.code_hash = 'default-code'
+        else:
+            result.perf = 100
+        return result
+
+    mocker.patch.object(eval_ins.analyzer, 'analyze', side_effect=mock_analyze)
+    mocker.patch.object(eval_ins.analyzer, 'analyze_scope', return_value={'PE': ['L0']})
+    mock_run = mocker.spy(required_args['scheduler'], 'run')
+
+    point = {'PE': 1, 'R': ''}
+    assert eval_ins.build_scope_map(point)
+    assert eval_ins.scope_map == {'PE': ['L0']}
+    assert mock_run.call_count == 1
+
+    # The HLS run is the evaluation of the default point
+    key = mock_run.call_args[0][0][0].key
+    lv1_result = eval_ins.db.query('lv1:{0}'.format(key))
+    lv2_result = eval_ins.db.query('lv2:{0}'.format(key))
+    assert lv1_result.code_hash == 'default-code' and lv1_result.point == point
+    assert lv2_result.perf == 100 and lv2_result.point == point
+    assert eval_ins.db.add_code_hash('default-code', 'other') == key
+
+    # The scope map is cached by the source project
+    eval_ins.scope_map = None
+    assert eval_ins.build_scope_map(point)
+    assert eval_ins.scope_map == {'PE': ['L0']}
+    assert mock_run.call_count == 1
+
+    # Fall back to the source code when the HLS run of the point fails
+    eval_ins.db = database.PickleDatabase('pickleDB_scope_test')
+    eval_ins.scope_map = None
+    run_points = []
+
+    def mock_fail_run(jobs, keep_files, cmd, timeout, reject=None):
+        #pylint:disable=unused-argument
+        run_points.extend([(job.path, job.point) for job in jobs])
+        return [(job.key, Result.RetCode.UNAVAILABLE if job.point else Result.RetCode.PASS)
+                for job in jobs]
+
+    mocker.patch.object(eval_ins.scheduler, 'run', side_effect=mock_fail_run)
+    assert eval_ins.build_scope_map(point)
+    assert eval_ins.scope_map == {'PE': ['L0']}
+    assert [p for _, p in run_points] == [point, None]
+    assert not any([os.path.exists(path) for path, _ in run_points])
+    assert eval_ins.db.count() == 1
+
+    # Fall back to the source code when the point cannot be applied
+    eval_ins.db = database.PickleDatabase('pickleDB_scope_test2')
+    del run_points[:]
+    assert eval_ins.build_scope_map({'PE': 1, 'R': '', 'some_param': 1})
+    assert [p for _, p in run_points] == [None]
+
+    LOG.debug('=== Testing evaluator scope map end')
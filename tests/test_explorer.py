@@ -1,14 +1,18 @@
 """
 The unit test module for explorer
 """
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from autodse import logger
 from autodse.database import Database
 from autodse.evaluator import analyzer, scheduler
 from autodse.evaluator.evaluator import BackupMode, Evaluator
 from autodse.explorer.algorithm import SearchAlgorithm
-from autodse.explorer.explorer import AccurateExplorer, FastExplorer
-from autodse.result import Job, Result
+from autodse.explorer.explorer import AccurateExplorer, FastExplorer, SpeculativeExplorer
+from autodse.parameter import gen_key_from_design_point
+from autodse.result import HLSResult, Job, Result
 
 LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
 
@@ -73,6 +77,53 @@ def test_fast_explorer(mocker):
                 assert explr.explored_point > 100, 'Should explore many points'
 
 
+def test_fast_explorer_pipeline(mocker):
+    #pylint:disable=missing-docstring
+
+    with mocker.patch.object(Database, '__init__', return_value=None), \
+         mocker.patch.object(Evaluator, '__init__', return_value=None), \
+         mocker.patch.object(SearchAlgorithm, '__init__', return_value=None):
+
+        # The algorithm generates one batch of two points
+        mock_make = mocker.patch('autodse.explorer.algorithmfactory.AlgorithmFactory.make')
+        mock_make.return_value.gen.return_value.send.side_effect = [[{'A': 1}, {'A': 2}],
+                                                                    StopIteration()]
+        config = {'name': 'exhaustive', 'exhaustive': {'batch-size': 2}}
+
+        def mock_apply(job, point):
+            job.point = point
+            job.key = gen_key_from_design_point(point)
+            return True
+
+        # Level 1 of A-1 is slow
+        events = []
+
+        def mock_submit(jobs, eval_lv):
+            job = jobs[0]
+            if eval_lv == 1 and job.key == 'A-1':
+                time.sleep(0.5)
+            events.append((job.key, eval_lv))
+            result = Result() if eval_lv == 1 else HLSResult()
+            result.point = job.point
+            return [(job.key, result)]
+
+        db = Database('test')
+        mocker.patch.object(db, 'commit', return_value=None)
+        mocker.patch.object(db, 'batch_query', side_effect=lambda keys: [None] * len(keys))
+        mocker.patch.object(Evaluator, 'create_job', side_effect=lambda: Job(''))
+        mocker.patch.object(Evaluator, 'apply_design_point', side_effect=mock_apply)
+        mocker.patch.object(Evaluator, 'submit', side_effect=mock_submit)
+        evaluator = Evaluator('', '', db, scheduler.Scheduler(), analyzer.MerlinAnalyzer,
+                              BackupMode.NO_BACKUP, {})
+        explr = FastExplorer(db, evaluator, 1, 'fast', {})
+        explr.run(config)
+
+        # A-2 goes to level 2 without waiting for level 1 of A-1
+        assert explr.explored_point == 2
+        assert events.index(('A-2', 2)) < events.index(('A-1', 1))
+        assert ('A-1', 2) in events
+
+
 def test_accurate_explorer(mocker):
     #pylint:disable=missing-docstring
 
@@ -95,6 +146,7 @@ def test_accurate_explorer(mocker):
 
         # Test point submission
         with mocker.patch.object(db, 'commit', return_value=None), \
+             mocker.patch.object(db, 'batch_query', return_value=[None] * 8), \
              mocker.patch.object(Evaluator, 'create_job', return_value=Job('')), \
              mocker.patch('autodse.evaluator.evaluator.Evaluator.apply_design_point',
                           return_value=True):
@@ -105,3 +157,96 @@ def test_accurate_explorer(mocker):
                 explr = AccurateExplorer(db, evaluator, 'accurate', points)
                 explr.run(config)
                 assert explr.explored_point == 8
+
+
+def test_speculative_explorer(mocker):
+    #pylint:disable=missing-docstring
+
+    with mocker.patch.object(Database, '__init__', return_value=None), \
+         mocker.patch.object(Evaluator, '__init__', return_value=None):
+
+        def make_result(idx, quality):
+            result = HLSResult()
+            result.valid = True
+            result.quality = quality
+            result.res_util = {'util-BRAM': 0.1}
+            result.point = {'A': idx}
+            return result
+
+        # The HLS results in the database change over time
+        db = Database('test')
+        hls_results = [make_result(1, 10), make_result(2, 5), make_result(3, 1)]
+        lv3_results = {}
+        mocker.patch.object(db, 'query_all', side_effect=lambda: list(hls_results))
+        mocker.patch.object(db, 'batch_query',
+                            side_effect=lambda keys: [lv3_results.get(k) for k in keys])
+
+        def mock_apply(job, point):
+            job.point = point
+            job.key = gen_key_from_design_point(point)
+            return True
+
+        release = threading.Event()
+
+        def mock_submit(jobs, eval_lv):
+            #pylint:disable=unused-argument
+            job = jobs[0]
+            while not job.cancelled and job.key != 'A-2' and not release.is_set():
+                time.sleep(0.05)
+            result = Result('CANCELLED') if job.cancelled else make_result(job.point['A'], 1)
+            lv3_results['lv3:{0}'.format(job.key)] = result
+            return [(job.key, result)]
+
+        mocker.patch.object(Evaluator, 'create_job', side_effect=lambda: Job(''))
+        mocker.patch.object(Evaluator, 'apply_design_point', side_effect=mock_apply)
+        mocker.patch.object(Evaluator, 'submit', side_effect=mock_submit)
+        evaluator = Evaluator('', '', db, scheduler.Scheduler(), analyzer.MerlinAnalyzer,
+                              BackupMode.NO_BACKUP, {})
+        evaluator.scheduler = scheduler.Scheduler()
+        explr = SpeculativeExplorer(db, evaluator, 'speculative', 2, interval=0.1)
+        executor = ThreadPoolExecutor(max_workers=1)
+        proc = executor.submit(explr.run, {})
+        try:
+            time.sleep(0.5)
+            assert 'A-1' in explr.running
+            assert lv3_results['lv3:A-2'].ret_code == Result.RetCode.PASS
+
+            # New better results push A-1 out of the top 2
+            hls_results.extend([make_result(4, 20), make_result(5, 15)])
+            time.sleep(0.5)
+            assert set(explr.running.keys()) == set(['A-4', 'A-5'])
+            assert lv3_results['lv3:A-1'].ret_code == Result.RetCode.CANCELLED
+
+            # The running job of a final point keeps running and the others are left for
+            # the accurate exploration
+            assert explr.finish([{'A': 2}, {'A': 4}, {'A': 1}]) == [{'A': 2}, {'A': 1}]
+        finally:
+            explr.stop_event.set()
+            release.set()
+            proc.result()
+            executor.shutdown()
+        assert lv3_results['lv3:A-4'].ret_code == Result.RetCode.PASS
+        assert lv3_results['lv3:A-5'].ret_code == Result.RetCode.CANCELLED
+        assert explr.explored_point == 4
+
+        # Nothing to be evaluated when no HLS result is wanted
+        explr = SpeculativeExplorer(db, evaluator, 'speculative', 0, interval=0.1)
+        explr.run({})
+        assert explr.finish([{'A': 2}]) == [{'A': 2}] and explr.explored_point == 0
+
+        # A final point whose job was cancelled is left for the accurate exploration once the
+        # job stops, and a job that raises an error is committed as a failed result
+        mock_commit = mocker.patch.object(db, 'commit')
+        explr = SpeculativeExplorer(db, evaluator, 'speculative', 2, interval=0.1)
+        for idx, future in enumerate([Future(), Future()]):
+            job = Job('')
+            job.point = {'A': 6 + idx}
+            explr.running['A-{0}'.format(6 + idx)] = (job, future)
+        explr.running['A-6'][0].cancelled = True
+        threading.Timer(0.2, explr.running['A-6'][1].set_result,
+                        [[('A-6', Result('CANCELLED'))]]).start()
+        explr.running['A-7'][1].set_exception(RuntimeError('bitgen crashed'))
+        assert explr.finish([{'A': 6}, {'A': 7}]) == [{'A': 6}, {'A': 7}]
+        assert not explr.running
+        key, result = mock_commit.call_args[0]
+        assert key == 'lv3:A-7' and result.ret_code == Result.RetCode.UNAVAILABLE
@@ -14,6 +14,25 @@ from autodse.result import BitgenResult, Result
 LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
 
 
+def test_main_fast_check(test_dir, mocker):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    mock_args = mocker.patch('autodse.main.arg_parser').return_value
+    mock_args.disable_animation = False
+    mock_args.src_dir = '{0}/temp_fixture/main_src'.format(test_dir)
+    mock_args.work_dir = '{0}/temp_main_work'.format(test_dir)
+    mock_args.config = '{0}/temp_fixture/main_src/config.json'.format(test_dir)
+    mock_args.db = None
+    mock_args.mode = 'fast-check'
+
+    # The fast check only checks the design space without building the evaluator
+    dse = Main()
+    assert not hasattr(dse, 'evaluator')
+    mock_log = mocker.spy(dse.log, 'info')
+    dse.main()
+    mock_log.assert_called_with('Finish checking the design space (fast mode)')
+
+
 def test_main(test_dir, mocker):
     #pylint:disable=missing-docstring, redefined-outer-name
 
@@ -0,0 +1,59 @@
+"""
+The unit test module for worker pool.
+"""
+from autodse import logger
+from autodse.evaluator.pool import WorkerPool
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_worker_pool():
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing WorkerPool start')
+
+    wakeups = {'part0': 0, 'part1': 0}
+
+    def wakeup0():
+        wakeups['part0'] += 1
+
+    def wakeup1():
+        wakeups['part1'] += 1
+
+    pool = WorkerPool(4)
+
+    # A single client can use all workers
+    pool.add_waiter('part0', wakeup0)
+    assert all([pool.acquire('part0') for _ in range(4)])
+    assert not pool.acquire('part0')
+
+    # Released workers go to the client with the lowest share
+    pool.add_waiter('part1', wakeup1)
+    pool.release('part0')
+    assert wakeups['part0'] == 1 and wakeups['part1'] == 1
+    assert not pool.acquire('part0')
+    assert pool.acquire('part1')
+    pool.release('part0')
+    assert pool.acquire('part1')
+    pool.release('part0')
+    assert not pool.acquire('part1')
+    assert pool.acquire('part0')
+
+    # Weighted share
+    pool.set_weight('part1', 3)
+    pool.release('part0')
+    assert not pool.acquire('part0')
+    assert pool.acquire('part1')
+
+    # Client without pending jobs does not hold back others
+    pool.remove_waiter('part1', wakeup1)
+    pool.release('part1')
+    assert pool.acquire('part0')
+    assert pool.used == 4
+
+    # Resizing the pool wakes up the waiters to take the new slots
+    pool.resize(5)
+    assert wakeups['part0'] > 0 and pool.acquire('part0')
+    assert not pool.acquire('part0')
+
+    LOG.debug('=== Testing WorkerPool end')
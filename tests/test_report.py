@@ -0,0 +1,127 @@
+"""
+The unit test module for report loading.
+"""
+import json
+import os
+import shutil
+
+from autodse import logger
+from autodse.evaluator import report
+from autodse.evaluator.analyzer import HotspotGraph, MerlinAnalyzer
+from autodse.evaluator.report import (HIERARCHY_FIELDS, PERF_EST_FIELDS, TOPO_INFO_FIELDS,
+                                      FieldFilter, ReportCache)
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_field_filter(test_dir, mocker):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing field filter start')
+
+    rpt_path = os.path.join(test_dir, 'temp_fixture/anal_rpts0')
+    info_path = os.path.join(rpt_path, 'final_info.json')
+    with open(info_path, 'r') as filep:
+        full_info = json.load(filep)
+
+    # Scalar fields not in the list are dropped but nested objects are kept
+    field_filter = FieldFilter(['CYCLE_TOT', 'util-*'])
+    obj = {'a': {'CYCLE_TOT': '1', 'util-BRAM': '2', 'messages': 'x', 'b': [{'c': 1}]}}
+    assert field_filter.apply(obj) == {'a': {'CYCLE_TOT': '1', 'util-BRAM': '2', 'b': [{}]}}
+    assert json.loads(json.dumps(obj), object_pairs_hook=field_filter.hook) == obj
+
+    # Both JSON parsers produce the same filtered report
+    mocker.patch.object(report, 'orjson', None)
+    assert report.get_json_backend() == 'json'
+    info = ReportCache().load(info_path, PERF_EST_FIELDS)
+    for topo_id, elt in full_info.items():
+        assert set(info[topo_id].keys()) <= set(elt.keys())
+        assert all([info[topo_id][key] == elt[key] for key in info[topo_id]])
+        assert 'CYCLE_TOT' not in elt or info[topo_id]['CYCLE_TOT'] == elt['CYCLE_TOT']
+    mocker.stopall()
+    assert ReportCache().load(info_path, PERF_EST_FIELDS) == info
+
+    # The filtered reports produce the same analysis results
+    topo_path = os.path.join(rpt_path, 'topo_info.json')
+    with open(topo_path, 'r') as filep:
+        full_topo = json.load(filep)
+    topo = ReportCache().load(topo_path, TOPO_INFO_FIELDS)
+    assert list(HotspotGraph(info, topo).iter_all_paths()) == list(
+        HotspotGraph(full_info, full_topo).iter_all_paths())
+
+    hier_path = os.path.join(rpt_path, 'hierarchy.json')
+    with open(hier_path, 'r') as filep:
+        full_hier = json.load(filep)
+    auto_map = {}
+    pending = [full_hier]
+    while pending:
+        curr = pending.pop()
+        if isinstance(curr, dict):
+            if 'src_filename' in curr and 'src_line' in curr:
+                pos = '{0}:{1}'.format(curr['src_filename'], curr['src_line'])
+                auto_map[pos] = ['P{0}'.format(len(auto_map))]
+            pending += list(curr.values())
+        elif isinstance(curr, list):
+            pending += curr
+    scope_maps = []
+    for hier in [full_hier, ReportCache().load(hier_path, HIERARCHY_FIELDS)]:
+        scope_map = {autos[0]: [] for autos in auto_map.values()}
+        for kernel in hier:
+            MerlinAnalyzer.build_scope_map(kernel, auto_map, scope_map)
+        scope_maps.append(scope_map)
+    assert scope_maps[0] == scope_maps[1]
+
+    LOG.debug('=== Testing field filter end')
+
+
+def test_report_cache(test_dir):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing report cache start')
+
+    work_path = os.path.join(test_dir, 'temp_report_work')
+    if os.path.exists(work_path):
+        shutil.rmtree(work_path)
+    os.makedirs(work_path)
+
+    cache = ReportCache(max_entries=2)
+    rpt_path = os.path.join(work_path, 'perf_est.json')
+    with open(rpt_path, 'w') as filep:
+        json.dump({'F_0': {'CYCLE_TOT': '10', 'messages': 'x'}}, filep)
+
+    # The parsed report is reused until the file is changed
+    rpt = cache.load(rpt_path, PERF_EST_FIELDS)
+    assert rpt == {'F_0': {'CYCLE_TOT': '10'}}
+    assert cache.load(rpt_path, PERF_EST_FIELDS) is rpt
+    assert cache.load(rpt_path)['F_0']['messages'] == 'x'
+
+    with open(rpt_path, 'w') as filep:
+        json.dump({'F_0': {'CYCLE_TOT': '20'}}, filep)
+    stat = os.stat(rpt_path)
+    os.utime(rpt_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert cache.load(rpt_path, PERF_EST_FIELDS) == {'F_0': {'CYCLE_TOT': '20'}}
+    assert len(cache.entries) == 1
+
+    # The least recently used reports are dropped
+    for idx in range(3):
+        other_path = os.path.join(work_path, 'rpt{0}.json'.format(idx))
+        with open(other_path, 'w') as filep:
+            json.dump([idx], filep)
+        assert cache.load(other_path) == [idx]
+    assert len(cache.entries) == 2
+
+    # Errors are raised to the analyzer
+    with open(rpt_path, 'w') as filep:
+        filep.write('{"F_0": ')
+    try:
+        cache.load(rpt_path)
+        assert False
+    except ValueError:
+        pass
+    try:
+        cache.load(os.path.join(work_path, 'not_exist.json'))
+        assert False
+    except OSError:
+        pass
+
+    LOG.debug('=== Testing report cache end')
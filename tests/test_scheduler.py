@@ -1,14 +1,19 @@
 """
 The unit test module for scheduler.
 """
+import asyncio
 import os
 import shutil
+import subprocess
+import threading
+import time
 
 from autodse import logger
 from autodse.result import Result
 from autodse.util import copy_dir
 from autodse.evaluator.evaluator import Job
-from autodse.evaluator.scheduler import PythonSubprocessScheduler
+from autodse.evaluator.scheduler import AsyncSubprocessScheduler, PythonSubprocessScheduler
+from autodse.evaluator.watcher import LogTailer, ProcessWatcher
 
 LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
 
@@ -38,6 +43,7 @@ def test_python_scheduler(test_dir):
     sche = PythonSubprocessScheduler(3)
     sche.run(jobs[:4], ['bin/test'], 'make run; mkdir bin; mv test bin/')
     assert all([os.path.exists(os.path.join(job.path, 'bin/test')) for job in jobs[:4]])
+    assert all([job.usage.wall_time > 0 and job.usage.peak_rss > 0 for job in jobs[:4]])
 
     # Scheduler with dividable workers and keep files with a wildcard
     sche = PythonSubprocessScheduler(4)
@@ -60,6 +66,180 @@ def test_python_scheduler(test_dir):
     rets = sche.run(jobs[:2], ['test'], 'make', 0.05)
     assert all([ret == Result.RetCode.TIMEOUT for _, ret in rets])
 
+    # A job that never finishes only holds its own worker and the others keep going
+    mixed_jobs = [jobs[0]]
+    ref_path = os.path.join(test_dir, 'temp_fixture/eval_src1')
+    for i in range(10, 13):
+        job_path = os.path.join(work_path, 'job{0}'.format(i))
+        copy_dir(ref_path, job_path)
+        job = Job(job_path)
+        job.key = 'job{0}'.format(i)
+        job.status = Job.Status.APPLIED
+        mixed_jobs.append(job)
+    sche = PythonSubprocessScheduler(2)
+    rets = dict(sche.run(mixed_jobs, ['test'], 'make', 0.1))
+    assert rets['job8'] == Result.RetCode.TIMEOUT
+    assert all([rets['job{0}'.format(i)] == Result.RetCode.PASS for i in range(10, 13)])
+
+    # A job is aborted once a rejecting message shows up in its log
+    job = Job(os.path.join(work_path, 'job13'))
+    copy_dir(ref_path, job.path)
+    job.key = 'job13'
+    job.status = Job.Status.APPLIED
+    sche.reject_interval = 0.1
+    timer = time.time()
+    rets = sche.run([job], ['merlin.log'],
+                    'echo "Memory burst NOT inferred" > merlin.log; sleep 30', 1,
+                    ('merlin.log', ['NOT inferred', 'ERROR']))
+    assert rets == [('job13', Result.RetCode.EARLY_REJECT)]
+    assert time.time() - timer < 20
+    assert job.reject_msgs == ['Memory burst NOT inferred']
+    assert os.path.exists(os.path.join(job.path, 'merlin.log'))
+
+    # Cancel a running job and a pending job from another thread
+    cancel_jobs = []
+    for i in range(14, 16):
+        job = Job(os.path.join(work_path, 'job{0}'.format(i)))
+        copy_dir(ref_path, job.path)
+        job.key = 'job{0}'.format(i)
+        job.status = Job.Status.APPLIED
+        cancel_jobs.append(job)
+    sche = PythonSubprocessScheduler(1)
+    timer = time.time()
+    threading.Timer(0.5, lambda: [sche.cancel(job) for job in cancel_jobs]).start()
+    rets = dict(sche.run(cancel_jobs, ['test'], 'sleep 30'))
+    assert all([ret == Result.RetCode.CANCELLED for ret in rets.values()])
+    assert time.time() - timer < 20
+    assert sche.pool.used == 0 and not sche.watchers
+    assert not os.path.exists('{0}_work'.format(cancel_jobs[0].path))
+
     # TODO: keyboard interrupt testing. Have no idea about how to test it.
 
     LOG.debug('=== Testing PythonSubprocessScheduler end')
+
+
+def test_async_scheduler(test_dir):
+    #pylint:disable=missing-docstring, redefined-outer-name
+
+    LOG.debug('=== Testing AsyncSubprocessScheduler start')
+
+    work_path = os.path.join(test_dir, 'temp_async_sche_work')
+    if os.path.exists(work_path):
+        shutil.rmtree(work_path)
+    os.mkdir(work_path)
+
+    def make_jobs(ref_name, ids):
+        jobs = []
+        ref_path = os.path.join(test_dir, 'temp_fixture/{0}'.format(ref_name))
+        for i in ids:
+            job_path = os.path.join(work_path, 'job{0}'.format(i))
+            copy_dir(ref_path, job_path)
+            job = Job(job_path)
+            job.key = 'job{0}'.format(i)
+            job.status = Job.Status.APPLIED
+            jobs.append(job)
+        return jobs
+
+    # Synchronous wrapper with keep files
+    jobs = make_jobs('eval_src1', range(4))
+    sche = AsyncSubprocessScheduler(3)
+    rets = sche.run(jobs, ['bin/test*'], 'make run; mkdir bin; cp test bin/test')
+    assert all([ret == Result.RetCode.PASS for _, ret in rets])
+    assert all([os.path.exists(os.path.join(job.path, 'bin/test')) for job in jobs])
+
+    # Timeout
+    jobs = make_jobs('eval_src2', range(4, 6))
+    rets = sche.run(jobs, ['test'], 'make', 0.05)
+    assert all([ret == Result.RetCode.TIMEOUT for _, ret in rets])
+
+    # Early rejection
+    job = make_jobs('eval_src1', [10])[0]
+    sche.reject_interval = 0.1
+    rets = sche.run([job], ['merlin.log'], 'echo "ERROR: fail" > merlin.log; sleep 30', 1,
+                    ('merlin.log', ['ERROR']))
+    assert rets == [('job10', Result.RetCode.EARLY_REJECT)]
+    assert job.reject_msgs == ['ERROR: fail']
+
+    # Cancellation
+    job = make_jobs('eval_src1', [11])[0]
+    threading.Timer(0.3, sche.cancel, [job]).start()
+    rets = sche.run([job], [], 'sleep 30')
+    assert rets == [('job11', Result.RetCode.CANCELLED)]
+
+    # Stream return codes in the order of completion. The last job has to wait for a slot.
+    async def stream(jobs):
+        return [key async for key, _ in sche.as_completed(jobs, [], 'sleep 1; make')]
+
+    sche = AsyncSubprocessScheduler(2)
+    keys = asyncio.run(stream(make_jobs('eval_src1', range(6, 9))))
+    assert len(keys) == 3 and keys[-1] == 'job8'
+
+    # Run one job as a coroutine
+    job = make_jobs('eval_src1', [9])[0]
+    assert asyncio.run(sche.run_one(job, [], 'make')) == Result.RetCode.PASS
+
+    LOG.debug('=== Testing AsyncSubprocessScheduler end')
+
+
+def test_process_watcher(mocker):
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing ProcessWatcher start')
+
+    def watcher_tester():
+        watcher = ProcessWatcher()
+        procs = [subprocess.Popen(['sleep', str(t)]) for t in [0.2, 30]]
+        for proc in procs:
+            watcher.watch(proc)
+
+        # Only the short process exits and we should be notified right after it
+        timer = time.time()
+        exited = watcher.wait(10)
+        assert exited == [procs[0]]
+        assert time.time() - timer < 5
+        assert procs[0].wait() == 0
+
+        # Wakeup from other threads interrupts the wait
+        watcher.wakeup()
+        assert not watcher.wait(10)
+
+        # Timeout
+        assert not watcher.wait(0.1)
+
+        procs[1].kill()
+        watcher.unwatch(procs[1])
+        procs[1].wait()
+        watcher.close()
+
+    # pidfd
+    watcher_tester()
+
+    # Waiter thread
+    mocker.patch('autodse.evaluator.watcher.os.pidfd_open', side_effect=OSError)
+    watcher_tester()
+
+    LOG.debug('=== Testing ProcessWatcher end')
+
+
+def test_log_tailer(tmpdir):
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing LogTailer start')
+
+    log_path = os.path.join(str(tmpdir), 'merlin.log')
+    tailer = LogTailer(log_path, ['ERROR', 'NOT inferred'])
+
+    # The log does not exist yet
+    assert not tailer.poll()
+
+    with open(log_path, 'w') as filep:
+        filep.write('INFO: start\nERROR: bad')
+    # The unfinished line is not matched until it is finished
+    assert not tailer.poll()
+
+    with open(log_path, 'a') as filep:
+        filep.write(' thing\nMemory burst NOT inferred\nINFO: done\n')
+    assert tailer.poll() == ['ERROR: bad thing', 'Memory burst NOT inferred']
+    assert not tailer.poll()
+
+    LOG.debug('=== Testing LogTailer end')
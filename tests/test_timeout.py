@@ -0,0 +1,59 @@
+"""
+The unit test module for adaptive timeouts.
+"""
+import random
+
+from autodse import logger
+from autodse.evaluator.timeout import AdaptiveTimeout, P2Quantile
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_p2_quantile():
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing P2Quantile start')
+
+    sketch = P2Quantile(0.95)
+    assert sketch.value() is None
+
+    # Exact value with few observations
+    for val in [5, 1, 3]:
+        sketch.add(val)
+    assert sketch.value() == 5
+
+    # Estimate the quantile of a uniform distribution
+    rand = random.Random(0)
+    sketch = P2Quantile(0.95)
+    for _ in range(10000):
+        sketch.add(rand.uniform(0, 100))
+    assert abs(sketch.value() - 95) < 2
+    assert len(sketch.heights) == 5
+
+    LOG.debug('=== Testing P2Quantile end')
+
+
+def test_adaptive_timeout():
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing AdaptiveTimeout start')
+
+    policy = AdaptiveTimeout(multiple=2, min_samples=10)
+    sketch = policy.create_sketch()
+    assert policy.get_timeout(60, None) == 60
+
+    # Not enough samples
+    for _ in range(9):
+        sketch.add(300)
+    assert policy.get_timeout(60, sketch) == 60
+
+    # Cap the timeout to the multiple of the quantile
+    sketch.add(300)
+    assert policy.get_timeout(60, sketch) == 10
+
+    # The configured timeout is the upper bound
+    for _ in range(100):
+        sketch.add(3600)
+    assert policy.get_timeout(60, sketch) == 60
+
+    LOG.debug('=== Testing AdaptiveTimeout end')
@@ -0,0 +1,57 @@
+"""
+The unit test module for workspace.
+"""
+import errno
+import os
+
+from autodse import logger
+from autodse.evaluator.workspace import CloneMode, clone_tree
+
+LOG = logger.get_default_logger('UNIT-TEST', 'DEBUG')
+
+
+def test_clone_tree(tmpdir, mocker):
+    #pylint:disable=missing-docstring
+
+    LOG.debug('=== Testing clone_tree start')
+
+    src = os.path.join(str(tmpdir), 'src')
+    os.makedirs(os.path.join(src, 'sub'))
+    for name in ['kernel.cpp', 'sub/data.txt']:
+        with open(os.path.join(src, name), 'w') as filep:
+            filep.write(name)
+        os.utime(os.path.join(src, name), (1000000, 1000000))
+
+    def check(dest, shared):
+        for name in ['kernel.cpp', 'sub/data.txt']:
+            with open(os.path.join(dest, name), 'r') as filep:
+                assert filep.read() == name
+            assert os.path.getmtime(os.path.join(dest, name)) == 1000000
+            assert os.path.samefile(os.path.join(src, name),
+                                    os.path.join(dest, name)) == (name in shared)
+
+    # Copy
+    dest = os.path.join(str(tmpdir), 'copy')
+    assert clone_tree(src, dest, CloneMode.COPY)
+    check(dest, [])
+
+    # Hard links except for private files
+    dest = os.path.join(str(tmpdir), 'hardlink')
+    assert clone_tree(src, dest, CloneMode.HARDLINK, ['kernel.cpp'])
+    check(dest, ['sub/data.txt'])
+
+    # Reflink (or copy if the file system does not support it)
+    dest = os.path.join(str(tmpdir), 'reflink')
+    assert clone_tree(src, dest, CloneMode.REFLINK)
+    check(dest, [])
+
+    # Fall back to copy
+    mocker.patch('autodse.evaluator.workspace.os.link', side_effect=OSError(errno.EXDEV, ''))
+    dest = os.path.join(str(tmpdir), 'fallback')
+    assert clone_tree(src, dest, CloneMode.HARDLINK)
+    check(dest, [])
+
+    # Missing source
+    assert not clone_tree(os.path.join(str(tmpdir), 'none'), dest)
+
+    LOG.debug('=== Testing clone_tree end')